@@ -0,0 +1,129 @@
+"""
+Benchmark the autotex LaTeX detector over a corpus of message contents.
+
+Usage:
+    python benchmarks/autotex_detector.py [corpus] [--runs N]
+
+The corpus is a text file with one JSON encoded message content per line (so contents may contain newlines),
+or a plain text file with one message per line if the lines are not valid JSON.
+If no corpus is given, a synthetic corpus of mostly ordinary chat with occasional LaTeX is used.
+Reports messages/sec for the pre-filter alone, the full detector, and the detector without the pre-filter.
+"""
+import os
+import sys
+import json
+import time
+import types
+import random
+import argparse
+import importlib
+
+
+__location__ = os.path.dirname(os.path.realpath(__file__))
+
+# Load the detector directly, avoiding the bot module imports
+package = types.ModuleType("texcore")
+package.__path__ = [os.path.join(__location__, "..", "bot", "modules", "Tex", "core")]
+sys.modules["texcore"] = package
+tex_detect = importlib.import_module("texcore.tex_detect")
+tex_utils = importlib.import_module("texcore.tex_utils")
+
+
+def load_corpus(path):
+    corpus = []
+    with open(path, 'r', errors='replace') as corpus_file:
+        for line in corpus_file:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            try:
+                content = json.loads(line)
+            except ValueError:
+                content = line
+            if isinstance(content, str):
+                corpus.append(content)
+    return corpus
+
+
+def synthetic_corpus(size=20000, seed=0):
+    """
+    Generate chat-like messages, with roughly 2% containing LaTeX and a few more mentioning prices.
+    """
+    rng = random.Random(seed)
+    words = ("the", "a", "is", "what", "lol", "ok", "thanks", "integral", "question", "how", "do", "i",
+             "solve", "this", "anyone", "know", "yeah", "no", "maybe", "tomorrow", "exam", "help")
+    tex = (
+        r"$\int_0^1 x^2 dx$",
+        r"$$\sum_{n=1}^\infty \frac{1}{n^2} = \frac{\pi^2}{6}$$",
+        "```tex\n\\begin{align*} a &= b \\\\ c &= d \\end{align*}\n```",
+        r"\(e^{i\pi} + 1 = 0\)",
+    )
+    corpus = []
+    for _ in range(size):
+        content = " ".join(rng.choice(words) for _ in range(rng.randint(2, 25)))
+        roll = rng.random()
+        if roll < 0.02:
+            content = "{} {}".format(content, rng.choice(tex))
+        elif roll < 0.03:
+            content = "{} for $5".format(content)
+        elif roll < 0.06:
+            content = "```py\nprint('{}')\n```".format(content)
+        corpus.append(content)
+    return corpus
+
+
+def unfiltered(content, clean_content):
+    """
+    The detector without the pre-filter, as it ran before.
+    """
+    source = tex_detect.parse_content(clean_content, tex_utils.ParseMode.DOCUMENT)
+    if not source:
+        return (None, None)
+    if ("```tex\n" in content) or ("```latex\n" in content):
+        return (source, tex_utils.AutoTexLevel.CODEBLOCK)
+    elif tex_detect.strict_hastex(source):
+        return (source, tex_utils.AutoTexLevel.STRICT)
+    elif tex_detect.weak_hastex(source):
+        return (source, tex_utils.AutoTexLevel.WEAK)
+    return (None, None)
+
+
+def time_detector(func, corpus, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        for content in corpus:
+            func(content, content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the autotex LaTeX detector.")
+    parser.add_argument("corpus", nargs="?", default=None)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        print("Corpus is empty.")
+        return 1
+
+    # Sanity check that the pre-filter doesn't change the detection results
+    mismatches = sum(tex_detect.detect(c, c) != unfiltered(c, c) for c in corpus)
+    detected = sum(tex_detect.detect(c, c)[1] is not None for c in corpus)
+    passed = sum(tex_detect.may_have_tex(c) for c in corpus)
+
+    print("{} messages, {} passed the pre-filter, {} detected as LaTeX, {} mismatches.".format(
+        len(corpus), passed, detected, mismatches
+    ))
+    print("{:<12} {:12,.0f} messages/sec".format(
+        "prefilter", time_detector(lambda c, _: tex_detect.may_have_tex(c), corpus, args.runs)
+    ))
+    print("{:<12} {:12,.0f} messages/sec".format("detect", time_detector(tex_detect.detect, corpus, args.runs)))
+    print("{:<12} {:12,.0f} messages/sec".format("unfiltered", time_detector(unfiltered, corpus, args.runs)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
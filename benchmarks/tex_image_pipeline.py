@@ -0,0 +1,141 @@
+"""
+Benchmark the LaTeX image post-processing pipeline against the previous ImageMagick shell chain.
+
+Usage:
+    python benchmarks/tex_image_pipeline.py [image.png] [--runs N] [--colour COLOUR] [--nopad]
+
+If no image is given, a synthetic 700dpi-sized render of black text on a transparent background is used.
+The shell chain requires ImageMagick `convert` to be installed, and is skipped otherwise.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import importlib.util
+
+from PIL import Image, ImageDraw
+
+
+__location__ = os.path.dirname(os.path.realpath(__file__))
+
+# Load the pipeline directly, avoiding the bot module imports
+spec = importlib.util.spec_from_file_location(
+    "tex_image",
+    os.path.join(__location__, "..", "bot", "modules", "Tex", "core", "tex_image.py")
+)
+tex_image = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(tex_image)
+
+
+# The previous shell chain, applying the colourscheme and then the padding
+def gencolour(colour, negate=True):
+    return r"convert {{image}} {} -bordercolor transparent -border 50 \
+        -background {} -flatten {{image}}".format("+negate" if negate else "", colour)
+
+
+shell_colourschemes = {
+    "white": gencolour("white", False),
+    "black": gencolour("black"),
+    "light": gencolour("'rgb(223, 223, 233)'", False),
+    "dark": gencolour("'rgb(20, 20, 20)'"),
+    "grey": gencolour("'rgb(49, 51, 56)'"),
+    "darkgrey": gencolour("'rgb(35, 39, 42)'"),
+    "trans_white": r"convert {image} +negate -bordercolor transparent -border 40 {image}",
+    "trans_black": "",
+}
+shell_colourschemes["gray"] = shell_colourschemes["default"] = shell_colourschemes["grey"]
+shell_colourschemes["transparent"] = shell_colourschemes["trans_white"]
+
+pad_script = r"""
+width=`convert {image} -format "%[fx:w]" info:`
+minwidth=1000
+extra=$((minwidth-width))
+
+if [ $extra -gt 0 ]; then
+    convert {image} \
+        -gravity East +antialias -splice ${{extra}}x\
+        -alpha set -background transparent -alpha Background -channel alpha -fx "i>${{width}}-5?0:a" +channel {image}
+fi
+"""
+
+
+def synthetic_image(path):
+    """
+    Draw a transparent image with black text, roughly the size of a one line render at 700dpi.
+    """
+    image = Image.new('RGBA', (900, 180), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for i in range(12):
+        draw.text((20 + 70 * i, 60), "x{}".format(i), fill=(0, 0, 0, 255))
+    draw.line((20, 140, 860, 140), fill=(0, 0, 0, 255), width=6)
+    image.save(path)
+
+
+def time_runs(func, source, workdir, runs):
+    times = []
+    for i in range(runs):
+        target = os.path.join(workdir, "run{}.png".format(i))
+        shutil.copyfile(source, target)
+        start = time.perf_counter()
+        func(target)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name, times):
+    print("{:<10} mean {:8.2f}ms   p50 {:8.2f}ms   min {:8.2f}ms   max {:8.2f}ms".format(
+        name,
+        statistics.mean(times) * 1000,
+        statistics.median(times) * 1000,
+        min(times) * 1000,
+        max(times) * 1000
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LaTeX image post-processing.")
+    parser.add_argument("image", nargs="?", default=None)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--colour", default="default")
+    parser.add_argument("--nopad", action="store_true")
+    args = parser.parse_args()
+
+    pad = not args.nopad
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = args.image
+        if source is None:
+            source = os.path.join(workdir, "source.png")
+            synthetic_image(source)
+
+        def pillow(path):
+            with open(path, 'rb') as image:
+                data = image.read()
+            output = tex_image.process_image(data, args.colour, pad)
+            with open(path, 'wb') as image:
+                image.write(output)
+
+        def shell(path):
+            script = "{}\n{}".format(
+                shell_colourschemes[args.colour],
+                pad_script if pad else ""
+            ).format(image=path)
+            subprocess.run(script, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        print("Processing {} with colour '{}'{}, {} runs.".format(
+            source, args.colour, " and padding" if pad else "", args.runs
+        ))
+        report("pillow", time_runs(pillow, source, workdir, args.runs))
+
+        if shutil.which("convert"):
+            report("convert", time_runs(shell, source, workdir, args.runs))
+        else:
+            print("ImageMagick `convert` not found, skipping the shell chain.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,8 @@ import sys
 import json
 import logging
 import asyncio
+import traceback
+from collections import deque
 from discord import AllowedMentions
 
 from cmdClient.logger import cmd_log_handler
@@ -30,48 +32,139 @@ def log(message, context="GLOBAL", level=logging.INFO, post=True):
         json.dumps(message))
     )
 
-    # Fire and forget to the channel logger, if it is set up
-    if post and _client is not None:
-        asyncio.ensure_future(live_log(message, context, level))
+    # Queue the record for the channel logger, if it is set up
+    if post and level >= logging.INFO and log_shipper.running:
+        log_shipper.submit(message, context, level)
 
 
-# Live logger that posts to the logging channels
-async def live_log(message, context, level):
-    if level >= logging.INFO:
-        log_chid = _client.conf.get("log_channel")
+class LogShipper:
+    """
+    Buffered shipper posting log records to the logging channels.
+    Records are queued by `submit`, and flushed every `flush_interval` seconds,
+    packing as many records as fit into each channel message.
+    When the queue is full, new records are dropped, and the number dropped is reported with the next flush.
+    """
+    # Maximum length of each posted message
+    message_limit = 2000
+
+    def __init__(self, maxsize=1000, flush_interval=5):
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+
+        self._queue = deque()  # (level, context, message)
+        self._task = None
+
+        # Statistics
+        self.shipped = 0
+        self.dropped = 0
+        self._unreported_drops = 0
+
+    @property
+    def running(self):
+        return self._task is not None
+
+    def start(self, maxsize=None, flush_interval=None):
+        if maxsize:
+            self.maxsize = maxsize
+        if flush_interval:
+            self.flush_interval = flush_interval
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._flush_loop())
+
+    def submit(self, message, context, level):
+        """
+        Queue a log record for posting.
+        May be called from any thread.
+        """
+        if len(self._queue) >= self.maxsize:
+            self.dropped += 1
+            self._unreported_drops += 1
+        else:
+            self._queue.append((level, context, message))
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                # Log to the handlers directly, as the error would otherwise be posted again
+                logger.error("Exception while posting queued log records.\n{}".format(traceback.format_exc()))
 
-        # Generate the log messages
+    async def flush(self):
+        """
+        Post the queued log records.
+        """
+        records = []
+        while self._queue:
+            records.append(self._queue.popleft())
+        dropped, self._unreported_drops = self._unreported_drops, 0
+
+        if not records and not dropped:
+            return
+
+        blocks = []  # (level, block)
+        for level, context, message in records:
+            blocks.extend((level, block) for block in self._format(level, context, message))
+        if dropped:
+            blocks.append((
+                logging.WARNING,
+                "```md\n[WARNING][Shard {}][LOGGER]\nLog queue full, dropped {} records.\n```".format(
+                    _client.shard_id, dropped
+                )
+            ))
+
+        log_chid = _client.conf.getint("log_channel")
+        error_chid = _client.conf.getint("error_channel")
+        if log_chid:
+            await self._post(log_chid, [block for _, block in blocks])
+        if error_chid:
+            error_blocks = [block for level, block in blocks if level >= logging.ERROR]
+            if error_blocks:
+                await self._post(error_chid, error_blocks)
+        self.shipped += len(records)
+
+    @staticmethod
+    def _format(level, context, message):
+        """
+        Format a log record as a list of codeblocks, each fitting in a single message.
+        """
         header = "[{}][Shard {}][{}]".format(logging.getLevelName(level), _client.shard_id, str(context))
         if len(message) > 1900:
             blocks = split_text(message, blocksize=1900, code=False)
-        else:
-            blocks = [message]
-
-        if len(blocks) > 1:
-            blocks = [
+            return [
                 "```md\n{}[{}/{}]\n{}\n```".format(header, i+1, len(blocks), block) for i, block in enumerate(blocks)
             ]
         else:
-            blocks = ["```md\n{}\n{}\n```".format(header, blocks[0])]
+            return ["```md\n{}\n{}\n```".format(header, message)]
 
-        # Post the log messages
-        if log_chid:
-            [await mail(_client, log_chid, content=block, allowed_mentions=AllowedMentions.none()) for block in blocks]
+    async def _post(self, channelid, blocks):
+        """
+        Post the formatted blocks, packing as many as possible into each message.
+        """
+        content = ""
+        for block in blocks:
+            if content and len(content) + len(block) + 1 > self.message_limit:
+                await mail(_client, channelid, content=content, allowed_mentions=AllowedMentions.none())
+                content = ""
+            content = "{}\n{}".format(content, block) if content else block
+        if content:
+            await mail(_client, channelid, content=content, allowed_mentions=AllowedMentions.none())
 
-        if level >= logging.ERROR:
-            error_chid = _client.conf.get("error_channel")
-            if error_chid:
-                [
-                    await mail(_client,
-                               error_chid,
-                               content=block,
-                               allowed_mentions=AllowedMentions.none()) for block in blocks
-                ]
+
+log_shipper = LogShipper()
 
 
 def attach_log_client(client):
     """
-    Attach the client to the logger so it can post to the log channels.
+    Attach the client to the logger and start posting to the log channels.
+    Posting may be disabled with the `live_log` option, logging only to the terminal and log file.
     """
     global _client
     _client = client
+
+    if client.conf.getboolean("live_log", True):
+        log_shipper.start(
+            maxsize=client.conf.getint("live_log_queue"),
+            flush_interval=client.conf.getint("live_log_interval")
+        )
@@ -10,11 +10,13 @@ from logger import log, log_fmt, attach_log_client
 from apps import load_app
 from paraArgs import args
 
-from registry.connectors import mysqlConnector, sqliteConnector
-from settings import guild_config
+from registry.connectors import mysqlConnector, mysqlPoolConnector, sqliteConnector
+from settings import guild_config, SettingCache
 
 # Always load modules last
 from paraData import versionModule  # noqa
+from paraTimers import timerModule  # noqa
+from paraInvalidations import invalidationModule  # noqa
 import modules  # noqa
 
 
@@ -99,17 +101,58 @@ load_app(CURRENT_APP or "default", client)
 
 DB_TYPE = conf.get("DB_TYPE")
 
+# Number of worker threads running queries off the event loop
+DB_WORKERS = conf.getint("db_workers")
+
+# Group commit options, committing pending writes every interval (in ms) or number of writes
+DB_COMMIT_INTERVAL = conf.getint("db_commit_interval")
+DB_COMMIT_BATCH = conf.getint("db_commit_batch")
+
+dbargs = {
+    'db_workers': DB_WORKERS,
+    'commit_interval': DB_COMMIT_INTERVAL / 1000 if DB_COMMIT_INTERVAL else None,
+    'commit_batch': DB_COMMIT_BATCH
+}
+
 # Attach the appropriate database connector
 if not DB_TYPE or DB_TYPE.lower() == "sqlite":
-    client.data = sqliteConnector(db_file=conf.get("sqlite_db", "data/paradox.db"))
-elif DB_TYPE.lower() == "mysql":
+    client.data = sqliteConnector(
+        db_file=conf.get("sqlite_db", "data/paradox.db"),
+        journal_mode=conf.get("sqlite_journal_mode"),
+        synchronous=conf.get("sqlite_synchronous"),
+        mmap_size=conf.getint("sqlite_mmap_size"),
+        cache_size=conf.getint("sqlite_cache_size"),
+        read_connections=conf.getint("sqlite_read_connections") or 0,
+        **dbargs
+    )
+elif DB_TYPE.lower() in ("mysql", "mysql_pool"):
     dbopts = {
         'username': conf.get('db_username'),
         'password': conf.get('db_password'),
         'host': conf.get('db_host'),
         'database': conf.get('db_database')
     }
-    client.data = mysqlConnector(**dbopts)
+    if conf.getint('db_connect_timeout'):
+        dbopts['connection_timeout'] = conf.getint('db_connect_timeout')
+
+    if DB_TYPE.lower() == "mysql":
+        client.data = mysqlConnector(
+            prepared=conf.getboolean('db_prepared_statements', False),
+            **dbargs,
+            **dbopts
+        )
+    else:
+        # Timeouts are configured in ms
+        POOL_TIMEOUT = conf.getint('db_pool_timeout')
+        QUERY_TIMEOUT = conf.getint('db_query_timeout')
+        client.data = mysqlPoolConnector(
+            db_workers=DB_WORKERS,
+            pool_size=conf.getint('db_pool_size'),
+            pool_timeout=POOL_TIMEOUT / 1000 if POOL_TIMEOUT else None,
+            query_timeout=QUERY_TIMEOUT / 1000 if QUERY_TIMEOUT else None,
+            health_check_interval=conf.getint('db_health_check_interval'),
+            **dbopts
+        )
 else:
     raise Exception("Unknown data storage type {} in configuration".format(DB_TYPE))
 
@@ -139,6 +182,9 @@ if createdb:
 # Set up the client
 # ------------------------------
 
+# Attach the guild setting cache, optionally bounded
+client.objects["guild_setting_cache"] = SettingCache(maxsize=conf.getint("guild_setting_cache_size"))
+
 # Attach prefix function
 client.objects["user_prefix_cache"] = {}
 client.objects["guild_prefix_cache"] = {}
@@ -188,6 +234,15 @@ async def on_ready():
     client.objects["preamble_channel"] = discord.utils.get(client.get_all_channels(), id=PREAMBLE_CH)
     client.objects["guild_log_channel"] = discord.utils.get(client.get_all_channels(), id=GUILD_LOG_CH)
 
+    # Preload the guild setting cache for the guilds on this shard
+    preloaded = await client.data.run_async(
+        client.objects["guild_setting_cache"].preload,
+        client,
+        [guild.id for guild in client.guilds]
+    )
+    log("Preloaded {} guild settings for {} guilds.".format(preloaded, len(client.guilds)),
+        context="SETTING_CACHE")
+
     # Launch modules
     await client.launch_modules()
 
@@ -1,9 +1,8 @@
-import asyncio
-
 from registry import tableSchema, Column, ColumnType, tableInterface
 from wards import is_master
 from utils.lib import paginate_list
 from utils.interactive import pager  # noqa
+from paraInvalidations import invalidation_bus, invalidation_handler
 
 from .module import bot_admin_module as module
 
@@ -21,7 +20,7 @@ async def blacklist_cmd(ctx, flags):
     Description:
         If a user is on the blacklist, all messages from that user will be ignored before parsing.
 
-        The cached blacklist refreshes every 5 minutes, in case of external changes.
+        Changes are applied on every shard within a few seconds.
         Running this command will also manually refresh the blacklist.
     """
     refresh_blacklist(ctx.client)
@@ -41,12 +40,16 @@ async def blacklist_cmd(ctx, flags):
                 insert_keys=('userid', 'added_by')
             )
             ctx.client.objects['user_blacklist'].update(userids)
+            for userid in userids:
+                invalidation_bus.publish("user_blacklist", targetid=userid)
             await ctx.reply("Users blacklisted.")
         elif flags['remove']:
             blacklist_interface.delete_where(
                 userid=userids
             )
             ctx.client.objects['user_blacklist'].difference_update(userids)
+            for userid in userids:
+                invalidation_bus.publish("user_blacklist", targetid=userid)
             await ctx.reply("Users removed from the blacklist.")
     else:
         blacklist = blacklist_interface.select_where()
@@ -66,20 +69,21 @@ def refresh_blacklist(client):
     )
 
 
-async def autorefresher(client):
-    while True:
-        refresh_blacklist(client)
-        await asyncio.sleep(300)
+@invalidation_handler("user_blacklist")
+async def reload_blacklisted_user(client, invalidation):
+    """
+    Apply a blacklist change made on another shard.
+    """
+    row = await client.data.admin_user_blacklist.select_one_where_async(userid=invalidation.targetid)
+    if row is not None:
+        client.objects['user_blacklist'].add(invalidation.targetid)
+    else:
+        client.objects['user_blacklist'].discard(invalidation.targetid)
 
 
 @module.init_task
 def attach_user_blacklist(client):
-    client.objects['user_blacklist'] = set()
-
-
-@module.launch_task
-async def launch_user_blacklist_monitor(client):
-    asyncio.ensure_future(autorefresher(client))
+    refresh_blacklist(client)
 
 
 schema = tableSchema(
@@ -1,5 +1,6 @@
 from settings import ListData, ChannelList, GuildSetting
 from registry import tableInterface, Column, ColumnType, tableSchema
+from utils.shard_loader import GuildCacheLoader
 
 from .module import guild_admin_module as module
 
@@ -37,17 +38,9 @@ class disabled_channels(ListData, ChannelList, GuildSetting):
         """
         Load the disabled channels into cache.
         """
-        disabled_channels = {}
-        channel_counter = 0
+        channel_counter = disabled_channel_loader.load(client)
+        disabled_channels = client.objects['disabled_guild_channels']
 
-        rows = client.data.guild_disabled_channels.select_where()
-        for row in rows:
-            if row['guildid'] not in disabled_channels:
-                disabled_channels[row['guildid']] = set()
-            disabled_channels[row['guildid']].add(row['channelid'])
-            channel_counter += 1
-
-        client.objects['disabled_guild_channels'] = disabled_channels
         client.log("Read {} guilds with a total of {} disabled channels.".format(
             len(disabled_channels),
             channel_counter),
@@ -55,6 +48,20 @@ class disabled_channels(ListData, ChannelList, GuildSetting):
         )
 
 
+def _build_disabled_channels(rows):
+    disabled_channels = {}
+    for row in rows:
+        if row['guildid'] not in disabled_channels:
+            disabled_channels[row['guildid']] = set()
+        disabled_channels[row['guildid']].add(row['channelid'])
+    return disabled_channels
+
+
+disabled_channel_loader = GuildCacheLoader(
+    "disabled_guild_channels", "guild_disabled_channels", _build_disabled_channels
+)
+
+
 # Define data schema
 schema = tableSchema(
     "guild_disabled_channels",
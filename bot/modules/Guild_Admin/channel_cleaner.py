@@ -1,4 +1,9 @@
+import time
 import asyncio
+import logging
+import traceback
+from collections import deque
+
 import discord
 
 from cmdClient import Context
@@ -7,6 +12,9 @@ from settings import ListData, ChannelList, GuildSetting
 from registry import tableInterface, Column, ColumnType, tableSchema
 
 from wards import guild_manager
+from utils.lib import bulk_delete
+from utils.shard_loader import GuildCacheLoader
+from paraTimers import timer_service, scheduled_action, utc_timestamp
 
 from .module import guild_admin_module as module
 
@@ -117,17 +125,9 @@ class cleaned_channels(ListData, ChannelList, GuildSetting):
         """
         Load the autocleaned channels into cache.
         """
-        cleaned_channels = {}
-        channel_counter = 0
-
-        rows = client.data.guild_cleaned_channels.select_where()
-        for row in rows:
-            if row['guildid'] not in cleaned_channels:
-                cleaned_channels[row['guildid']] = {}
-            cleaned_channels[row['guildid']][row['channelid']] = row['delay']
-            channel_counter += 1
+        channel_counter = cleaned_channel_loader.load(client)
+        cleaned_channels = client.objects['cleaned_guild_channels']
 
-        client.objects['cleaned_guild_channels'] = cleaned_channels
         client.log("Read {} guilds with a total of {} autocleaned channels.".format(
             len(cleaned_channels),
             channel_counter),
@@ -142,21 +142,144 @@ async def autoclean_channel(client, message):
         if channels is not None:
             delay = channels.get(message.channel.id, None)
             if delay is not None:
-                await asyncio.sleep(delay)
-                if not message.pinned:
-                    try:
-                        await message.delete()
-                    except discord.Forbidden:
-                        pass
-                    except discord.NotFound:
-                        pass
+                await timer_service.schedule_async(
+                    "autoclean",
+                    utc_timestamp() + delay,
+                    guildid=message.guild.id,
+                    targetid=message.id,
+                    payload={'channelid': message.channel.id}
+                )
+
+
+@scheduled_action("autoclean")
+async def autoclean_message(client, action):
+    """
+    Scheduled action handler, queueing the autocleaned message for deletion.
+    Waits until the deletion batch containing the message has been flushed.
+    """
+    await deletion_queue.delete(action.payload['channelid'], action.targetid)
+
+
+class DeletionQueue:
+    """
+    Per-channel queues of expired autoclean messages.
+    Messages expiring close together in a channel are gathered and deleted with the bulk-delete endpoint,
+    skipping pinned messages.
+    Messages too old for the bulk-delete endpoint are deleted individually.
+    """
+    # Seconds to gather expiring messages in a channel before flushing them
+    gather_delay = 1
+
+    # Seconds of deletions used to compute the deletion rate
+    rate_window = 60
+
+    def __init__(self):
+        self.client = None
+
+        self._batches = {}  # channelid: (list of messageids, future resolved when flushed)
+
+        # Statistics
+        self.deleted = 0
+        self._recent = deque()  # (timestamp, count) of recent deletions
+
+    @property
+    def depth(self):
+        """
+        Number of messages currently waiting to be deleted.
+        """
+        return sum(len(messageids) for messageids, _ in self._batches.values())
+
+    @property
+    def rate(self):
+        """
+        Messages deleted per second, averaged over the last `rate_window` seconds.
+        """
+        cutoff = time.monotonic() - self.rate_window
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return sum(count for _, count in self._recent) / self.rate_window
+
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'channels': len(self._batches),
+            'deleted': self.deleted,
+            'deletes_per_sec': self.rate,
+        }
+
+    async def delete(self, channelid, messageid):
+        """
+        Queue a message for deletion, and wait until its batch has been flushed.
+        """
+        batch = self._batches.get(channelid, None)
+        if batch is None:
+            batch = self._batches[channelid] = ([], asyncio.get_event_loop().create_future())
+            asyncio.create_task(self._flush(channelid))
+        batch[0].append(messageid)
+        await asyncio.shield(batch[1])
+
+    def _record(self, count):
+        self.deleted += count
+        self._recent.append((time.monotonic(), count))
+
+    async def _flush(self, channelid):
+        await asyncio.sleep(self.gather_delay)
+        messageids, done = self._batches.pop(channelid)
+        try:
+            channel = self.client.get_channel(channelid)
+            if channel is not None:
+                await self._delete_messages(channel, messageids)
+        except discord.Forbidden:
+            pass
+        except Exception:
+            full_traceback = traceback.format_exc()
+            self.client.log(
+                "Caught an unknown exception while flushing autoclean deletions in channel (cid:{}).\n{}".format(
+                    channelid,
+                    '\n'.join('\t' + line for line in full_traceback.splitlines())
+                ),
+                context="AUTOCLEAN",
+                level=logging.ERROR
+            )
+        finally:
+            done.set_result(None)
+
+    async def _delete_messages(self, channel, messageids):
+        # Skip pinned messages, checking the pins only if some messages are no longer cached
+        cached = {message.id: message for message in self.client.cached_messages if message.channel.id == channel.id}
+        pinned = set()
+        if any(messageid not in cached for messageid in messageids):
+            pinned = {message.id for message in await channel.pins()}
+        messageids = [
+            messageid for messageid in messageids
+            if not (cached[messageid].pinned if messageid in cached else messageid in pinned)
+        ]
+
+        await bulk_delete(channel, messageids, concurrency=1, on_deleted=self._record)
+
+
+deletion_queue = DeletionQueue()
 
 
 @module.init_task
 def attach_channel_cleaner(client):
+    deletion_queue.client = client
+    client.objects['autoclean_queue'] = deletion_queue
     client.add_after_event('message', autoclean_channel)
 
 
+def _build_cleaned_channels(rows):
+    cleaned_channels = {}
+    for row in rows:
+        if row['guildid'] not in cleaned_channels:
+            cleaned_channels[row['guildid']] = {}
+        cleaned_channels[row['guildid']][row['channelid']] = row['delay']
+    return cleaned_channels
+
+
+cleaned_channel_loader = GuildCacheLoader("cleaned_guild_channels", "guild_cleaned_channels", _build_cleaned_channels)
+
+
 # Define data schema
 schema = tableSchema(
     "guild_cleaned_channels",
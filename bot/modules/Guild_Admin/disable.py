@@ -2,6 +2,7 @@ from cmdClient.lib import SafeCancellation
 
 from settings import ListData, StringList, GuildSetting
 from registry import tableInterface, Column, ColumnType, tableSchema
+from utils.shard_loader import GuildCacheLoader
 
 from .module import guild_admin_module as module
 
@@ -153,17 +154,9 @@ class disabled_commands(ListData, StringList, GuildSetting):
         """
         Load the disabled commands into cache.
         """
-        disabled_commands = {}
-        command_counter = 0
+        command_counter = disabled_loader.load(client)
+        disabled_commands = client.objects['disabled_guild_commands']
 
-        rows = client.data.guild_disabled_commands.select_where()
-        for row in rows:
-            if row['guildid'] not in disabled_commands:
-                disabled_commands[row['guildid']] = []
-            disabled_commands[row['guildid']].append(row['command_name'])
-            command_counter += 1
-
-        client.objects['disabled_guild_commands'] = disabled_commands
         client.log("Read {} guilds with a total of {} disabled commands".format(
             len(disabled_commands),
             command_counter),
@@ -171,6 +164,18 @@ class disabled_commands(ListData, StringList, GuildSetting):
         )
 
 
+def _build_disabled_commands(rows):
+    disabled_commands = {}
+    for row in rows:
+        if row['guildid'] not in disabled_commands:
+            disabled_commands[row['guildid']] = []
+        disabled_commands[row['guildid']].append(row['command_name'])
+    return disabled_commands
+
+
+disabled_loader = GuildCacheLoader("disabled_guild_commands", "guild_disabled_commands", _build_disabled_commands)
+
+
 # Define data schema
 schema = tableSchema(
     "guild_disabled_commands",
@@ -1,5 +1,6 @@
 from settings import GuildSetting, String, ColumnData
 from registry import tableInterface, tableSchema, Column, ColumnType
+from utils.shard_loader import GuildCacheLoader
 
 from wards import guild_manager
 
@@ -46,13 +47,19 @@ class guild_prefix(ColumnData, String, GuildSetting):
         """
         Load the custom guild prefixes into cache.
         """
-        rows = client.data.guild_prefixes.select_where()
-        client.objects["guild_prefix_cache"] = {row['guildid']: row['prefix'] for row in rows}
+        count = prefix_loader.load(client)
 
-        client.log("Read {} guilds with custom prefixes.".format(len(rows)),
+        client.log("Read {} guilds with custom prefixes.".format(count),
                    context="LOAD_GUILD_PREFIXES")
 
 
+prefix_loader = GuildCacheLoader(
+    "guild_prefix_cache",
+    "guild_prefixes",
+    lambda rows: {row['guildid']: row['prefix'] for row in rows}
+)
+
+
 # Define data schema
 schema = tableSchema(
     "guild_prefixes",
@@ -113,17 +113,17 @@ async def store_roles(client, payload):
         if discord.utils.utcnow().timestamp() - member.joined_at.timestamp() < 10:
             return
 
-    # Delete the stored roles associated to this member
-    client.data.member_stored_roles.delete_where(guildid=payload.guild_id, userid=member.id)
-    # TODO: This is asking for some nasty clashes between different apps
-    # We probably want to make it a db transaction, i.e. lock the table.
-
-    # Insert the new roles if there are any
-    if role_list:
-        client.data.member_stored_roles.insert_many(
-            *((payload.guild_id, member.id, role) for role in role_list),
-            insert_keys=('guildid', 'userid', 'roleid')
-        )
+    # Replace the stored roles associated to this member in a single transaction
+    async with client.data.transaction():
+        # Delete the stored roles associated to this member
+        await client.data.member_stored_roles.delete_where_async(guildid=payload.guild_id, userid=member.id)
+
+        # Insert the new roles if there are any
+        if role_list:
+            await client.data.member_stored_roles.insert_many_async(
+                *((payload.guild_id, member.id, role) for role in role_list),
+                insert_keys=('guildid', 'userid', 'roleid')
+            )
 
 
 async def restore_roles(client, member):
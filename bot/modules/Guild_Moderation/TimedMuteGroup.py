@@ -1,6 +1,4 @@
 from typing import List
-import traceback
-import logging
 import asyncio
 import datetime as dt
 
@@ -10,6 +8,7 @@ from cmdClient.cmdClient import cmdClient
 
 from registry import tableInterface, Column, ColumnType, ForeignKey, ReferenceAction, tableSchema
 from utils.lib import strfdelta
+from paraTimers import timer_service, scheduled_action
 
 from .module import guild_moderation_module as module
 
@@ -20,9 +19,7 @@ from .mute_utils import unmute_memberid
 class TimedMuteGroup:
     __slots__ = (
         'ticket',
-        'memberids',
-        '_task',
-        '_cancelled'
+        'memberids'
     )
     _client: cmdClient = None  # Attached during initialisation
 
@@ -31,13 +28,16 @@ class TimedMuteGroup:
     # Cache associating muted members to timed mute groups
     _member_map = {}  # type: Dict[int, Dict[int, TimedMuteGroup]]
 
+    # Loaded timed mute groups, by ticketid
+    _groups = {}  # type: Dict[int, TimedMuteGroup]
+
+    # Scheduled action type of the group unmute
+    action_type = "timed_unmute"
+
     def __init__(self, timed_mute_ticket: TicketType.TEMPMUTE.Ticket, memberids: List[int]):
         self.ticket = timed_mute_ticket
         self.memberids = memberids
 
-        self._task = None
-        self._cancelled = False
-
     @property
     def guild_mutes(self):
         """
@@ -64,7 +64,7 @@ class TimedMuteGroup:
     async def launch(cls, client):
         """
         Launch task.
-        Populate the caches and schedule the pending mutes.
+        Populate the caches. The pending unmutes are scheduled by the timer service.
         """
         client.log(
             "Populating timed mute cache.",
@@ -77,8 +77,9 @@ class TimedMuteGroup:
                 group_members[row['ticketid']] = []
             group_members[row['ticketid']].append(row['memberid'])
 
-        # Build the tickets
+        # Build the tickets of the guilds on this shard
         tickets = TicketType.TEMPMUTE.Ticket.fetch_tickets_where(
+            shard=(client.shard_count, client.shard_id),
             app=client.app,
             ticketid=list(group_members.keys())
         ) if group_members else []
@@ -111,16 +112,36 @@ class TimedMuteGroup:
                 context="LAUNCH_TIMED_MUTES"
             )
             cls._member_data.delete_where(ticketid=cleanup)
+            for ticketid in cleanup:
+                timer_service.cancel(cls.action_type, ticketid)
             client.log(
                 "Successfully cleaned up {} stale timed mute groups.".format(len(cleanup)),
                 context="LAUNCH_TIMED_MUTES"
             )
 
     # Activation and deactivation of the TimedMuteGroup
+    @classmethod
+    def create(cls, timed_mute_ticket: TicketType.TEMPMUTE.Ticket, memberids: List[int]):
+        """
+        Create a new TimedMuteGroup, saving the group members and scheduling the unmute.
+        Returns the loaded group.
+        """
+        cls._member_data.insert_many(
+            *((timed_mute_ticket.ticketid, memberid) for memberid in memberids),
+            insert_keys=('ticketid', 'memberid')
+        )
+        timer_service.schedule(
+            cls.action_type,
+            timed_mute_ticket.unmute_timestamp,
+            guildid=timed_mute_ticket.guildid,
+            targetid=timed_mute_ticket.ticketid
+        )
+        return cls(timed_mute_ticket, memberids).load()
+
     def load(self):
         """
         Initial activation of a TimedMuteGroup.
-        Removes group members from any other TimedMuteGroups, populates the cache, and schedules the unmute task.
+        Removes group members from any other TimedMuteGroups and populates the cache.
         Returns `self` for easy chaining.
         """
         # Add members to the guild cache, and remove them from any existing mute groups
@@ -129,14 +150,15 @@ class TimedMuteGroup:
                 self.guild_mutes[memberid].remove(memberid)
             self.guild_mutes[memberid] = self
 
-        self._schedule()
+        self._groups[self.ticket.ticketid] = self
         return self
 
     def unload(self):
         """
-        Removes the TimedMuteGroup from the cache and cancels the unmute task.
+        Removes the TimedMuteGroup from the cache and cancels the scheduled unmute.
         """
-        self._cancel()
+        if self._groups.pop(self.ticket.ticketid, None) is not None:
+            timer_service.cancel(self.action_type, self.ticket.ticketid)
 
         # Remove the mute from cache, if it still exists
         for memberid in self.memberids:
@@ -153,7 +175,7 @@ class TimedMuteGroup:
     def remove(self, *memberids):
         """
         Remove a sequence of users from the mute group.
-        If there are no users left, unloads the group and cancels the unmute task.
+        If there are no users left, unloads the group and cancels the scheduled unmute.
         """
         # Remove from internal mute group list
         self.memberids = [memberid for memberid in self.memberids if memberid not in memberids]
@@ -168,53 +190,7 @@ class TimedMuteGroup:
         if not self.memberids:
             self.unload()
 
-    # Internal creation and cancellation of the mute task
-    def _schedule(self):
-        """
-        Create and schedule the unmute task for this group.
-        """
-        # Create the group unmute task as self._task
-        self._task = asyncio.create_task(self._unmute_wrapper())
-
-    def _cancel(self):
-        """
-        Cancel the unmute task, if it is running.
-        """
-        if not self._cancelled and self._task and not self._task.done():
-            self._task.cancel()
-            self._cancelled = True
-
     # Internal unmute system
-    async def _unmute_wrapper(self):
-        """
-        Unmute wrapper which runs `apply_unmutes` at `self.ticket.unmute_timestamp`.
-        """
-        try:
-            # Sleep for the required time
-            await asyncio.sleep(self.ticket.unmute_timestamp - dt.datetime.utcnow().timestamp())
-
-            # Execute the unmutes
-            await self._unmute_members()
-            if self._cancelled:
-                # Wait a moment to catch the cancel, in case it was propogated from inside the unmute
-                await asyncio.sleep(0.1)
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            # Unknown exception!
-            full_traceback = traceback.format_exc()
-
-            self._client.log(
-                ("Caught an unknown exception during schedule unmute with groupid {groupid}."
-                 "{traceback}").format(
-                     groupid=self.ticket.ticketid,
-                     traceback='\n'.join('\t' + line for line in full_traceback.splitlines()),
-                 ),
-                context="tid:{}".format(self.ticket.ticketid),
-                level=logging.ERROR)
-
-            raise e
-
     async def _unmute_members(self):
         """
         Attempt to apply the unmutes.
@@ -247,6 +223,16 @@ class TimedMuteGroup:
         self.destroy()
 
 
+@scheduled_action(TimedMuteGroup.action_type)
+async def timed_unmute(client, action):
+    """
+    Scheduled action handler, running the unmute for the group with the action `targetid`.
+    """
+    group = TimedMuteGroup._groups.get(action.targetid, None)
+    if group is not None:
+        await group._unmute_members()
+
+
 module.init_task(TimedMuteGroup.setup)
 module.launch_task(TimedMuteGroup.launch)
 
@@ -157,7 +157,7 @@ class TimedMuteAction(_MuteTypeAction):
             await ticket.post()
 
             # Create and load timed mute group
-            TimedMuteGroup(ticket, successful).load()
+            TimedMuteGroup.create(ticket, successful)
             self.ticket = ticket
 
         return member_results
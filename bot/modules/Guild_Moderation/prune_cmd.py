@@ -1,3 +1,4 @@
+import time
 import discord
 import asyncio
 # from datetime import datetime
@@ -6,23 +7,29 @@ from cmdClient.lib import ResponseTimedOut, UserCancelled
 
 from wards import guild_moderator, chunk_guild
 from utils import seekers  # noqa
+from utils.lib import bulk_delete
 
 from .module import guild_moderation_module as module
 
 
+# Minimum number of seconds between edits of the progress message
+progress_interval = 2
+
+
 @module.cmd("prune",
             desc="Purges messages matching selected criteria from the current channel.",
             aliases=["purge"],
-            flags=["r==", "bot", "bots", "user", "embed", "file", "me", "from==", "after==", "force"])
+            flags=["r==", "bot", "bots", "user", "embed", "file", "me", "from==", "after==", "before==", "force"])
 @guild_moderator()
 @chunk_guild()
 async def cmd_prune(ctx, flags):
     """
     Usage``:
-        {prefix}prune [number] [flags] [--after <msgid>] [--from <user>] [-r <reason>]
+        {prefix}prune [number] [flags] [--after <msgid>] [--before <msgid>] [--from <user>] [-r <reason>]
     Description:
         Deletes your command message and messages from the given number of messages before that.
         If neither the number nor `after` is given, deletes from the last 100 messages.
+        Large purges report their progress while searching and deleting.
 
         The flags restrict what types of messages are deleted from this collection.
         If there are multiple flags, only messages matching all the criteria will be deleted.
@@ -42,14 +49,15 @@ async def cmd_prune(ctx, flags):
         file: Only messages with uploaded attachements (e.g. images).
         me: Only messages from me ({ctx.client.user.mention}).
         from: Only messages from the given user (interactive lookup).
-        after: Only messages after (not including) the given message id (must be in the last `1000` messages).
+        after: Only messages after (not including) the given message id (must be in the searched messages).
+        before: Only messages before (not including) the given message id.
     Examples``:
         {prefix}prune 100 --file
         {prefix}prune --after {ctx.msg.id}
+        {prefix}prune 5000 --bot --before {ctx.msg.id}
         {prefix}prune 10 --me --embed
         {prefix}prune 10 --from {ctx.author.name} --image --force
     """
-    # TODO: --before
     # TODO: --role? Maybe?
     # TODO: find_user won't work for users not in the server. Construct a collection based on message list.
 
@@ -68,6 +76,14 @@ async def cmd_prune(ctx, flags):
 
         after_msg_id = int(flags['after'])
 
+    # Get the before message id from the flag, if provided
+    before_msg_id = None
+    if flags['before']:
+        if flags['before'] is True or not flags['before'].isdigit():
+            return await ctx.error_reply("**Usage:** {}purge ... --before <msgid> ...".format(ctx.best_prefix()))
+
+        before_msg_id = int(flags['before'])
+
     # Get the maximum number of messages to search
     if not ctx.args:
         number = 1000 if after_msg_id is not None else 100
@@ -117,7 +133,28 @@ async def cmd_prune(ctx, flags):
     message_list = []
     msg_found = False
 
-    async for message in ctx.ch.history(limit=number):
+    # Progress message for long running scans and deletions, posted once the operation takes a while
+    status = None
+    last_update = time.monotonic()
+
+    async def show_progress(text):
+        nonlocal status, last_update
+        last_update = time.monotonic()
+        try:
+            if status is None:
+                status = await ctx.reply(text)
+            else:
+                await status.edit(content=text)
+        except discord.HTTPException:
+            pass
+
+    before = discord.Object(id=before_msg_id) if before_msg_id is not None else None
+    scanned = 0
+    async for message in ctx.ch.history(limit=number, before=before):
+        scanned += 1
+        if time.monotonic() - last_update > progress_interval:
+            await show_progress("Scanned `{}` messages, found `{}` to purge.".format(scanned, len(message_list)))
+
         if message.id == after_msg_id:
             msg_found = True
             break
@@ -139,6 +176,13 @@ async def cmd_prune(ctx, flags):
                                               "name": "{}".format(message.author)}
             listing[message.author.id]["count"] += 1
 
+    if status is not None:
+        try:
+            await status.delete()
+        except discord.HTTPException:
+            pass
+        status = None
+
     if after_msg_id and not msg_found:
         return await ctx.reply("The given message wasn't found in the last {} messages".format(number))
 
@@ -181,33 +225,50 @@ async def cmd_prune(ctx, flags):
                 pass
 
     if not abort:
-        try:
-            if not flags["force"]:
+        if not flags["force"]:
+            try:
                 await out_msg.delete()
+            except discord.HTTPException:
+                pass
 
-            if len(message_list) == 1:
-                await message_list[0].delete()
-            else:
-                msgids = [msg.id for msg in message_list]
-                await ctx.ch.purge(limit=number, check=lambda msg: msg.id in msgids)
+        # Delete the collected messages directly, without fetching the history again
+        deleted = 0
+
+        def on_deleted(count):
+            nonlocal deleted
+            deleted += count
+
+        last_update = time.monotonic()
+        task = asyncio.create_task(bulk_delete(ctx.ch, [msg.id for msg in message_list], on_deleted=on_deleted))
+        while not task.done():
+            await asyncio.wait((task,), timeout=progress_interval)
+            if not task.done():
+                await show_progress("Deleted `{}/{}` messages.".format(deleted, len(message_list)))
+        try:
+            task.result()
         except discord.Forbidden:
-            await ctx.error_reply("I have insufficient permissions to delete these messages.")
+            await ctx.error_reply(
+                "I have insufficient permissions to delete these messages! "
+                "Deleted **{}** messages before stopping.".format(deleted)
+            )
             abort = True
-        except discord.HTTPException:
+        except discord.HTTPException as e:
+            await ctx.error_reply(
+                "Discord rejected a deletion request ({}), deleted **{}** messages before stopping.".format(
+                    e.status, deleted
+                )
+            )
+            abort = True
+
+        if status is not None:
             try:
-                for msg in message_list:
-                    try:
-                        await msg.delete()
-                    except discord.NotFound:
-                        # The message may have been deleted in the meantime
-                        pass
-            except discord.Forbidden:
-                await ctx.reply("I have insufficient permissions to delete these messages.")
-                abort = True
+                await status.delete()
+            except discord.HTTPException:
+                pass
     if abort:
         return
 
-    success = await ctx.reply("Purge complete.")
+    success = await ctx.reply("Purge complete, deleted **{}** messages.".format(deleted))
     try:
         await asyncio.sleep(3)
         await success.delete()
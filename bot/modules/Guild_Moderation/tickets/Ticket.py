@@ -47,9 +47,9 @@ class Ticket:
     ticketid: int
         Global unique integer id for this ticket.
         Generated and retrieved from the database on ticket creation.
-    guild_ticketid: int
+    ticketgid: int
         Guild-local id for this ticket.
-        Derived by the database.
+        Assigned from the guild ticket counter on ticket creation.
     created_at: int
         The utc timestamp of the original action or the ticket creation, depending on the ticket type.
     app: str
@@ -80,6 +80,7 @@ class Ticket:
     # Data interfaces
     _ticket_data: tableInterface = None  # Ticket properties, interface for the raw ticket table
     _member_data: tableInterface = None  # Ticket members, interface for the ticket member table
+    _counter_data: tableInterface = None  # Last guild-local ticket id, interface for the ticket counter table
 
     # Ticket properties with extra properties joined or derived from all ticket types
     _combined_ticket_data: tableInterface = None
@@ -170,6 +171,7 @@ class Ticket:
         cls._client = client
         cls._ticket_data: tableInterface = client.data.guild_mod_tickets  # type: tableInterface
         cls._member_data = client.data.guild_mod_ticket_members  # type: tableInterface
+        cls._counter_data = client.data.guild_mod_ticket_counters  # type: tableInterface
         cls._combined_ticket_data = client.data.guild_mod_tickets_combined  # type: tableInterface
 
     @classmethod
@@ -183,26 +185,31 @@ class Ticket:
         if cls._ticket_type is None:
             raise ValueError("Cannot create a ticket without a ticket type.")
 
-        # Save the ticket data
-        curs = cls._ticket_data.insert(
-            ticket_type=cls._ticket_type.value,
-            app=cls._client.app,
-            guildid=guildid,
-            modid=modid,
-            agentid=agentid,
-            auditid=auditid,
-            reason=reason,
-            created_at=int(dt.utcnow().timestamp())
-        )
+        with cls._client.data.transaction():
+            # Assign the next guild-local ticket id
+            ticketgid = cls._counter_data.increment('last_ticketgid', 'guildid', guildid=guildid)
+
+            # Save the ticket data
+            curs = cls._ticket_data.insert(
+                ticket_type=cls._ticket_type.value,
+                app=cls._client.app,
+                guildid=guildid,
+                ticketgid=ticketgid,
+                modid=modid,
+                agentid=agentid,
+                auditid=auditid,
+                reason=reason,
+                created_at=int(dt.utcnow().timestamp())
+            )
 
-        # Retrieve the ticket id
-        ticketid = curs.lastrowid
+            # Retrieve the ticket id
+            ticketid = curs.lastrowid
 
-        # Save the member data
-        cls._member_data.insert_many(
-            *((ticketid, memberid) for memberid in memberids),
-            insert_keys=('ticketid', 'memberid')
-        )
+            # Save the member data
+            cls._member_data.insert_many(
+                *((ticketid, memberid) for memberid in memberids),
+                insert_keys=('ticketid', 'memberid')
+            )
 
         return cls._create_ticket(ticketid, memberids, **kwargs)
 
@@ -213,7 +220,7 @@ class Ticket:
         return cls(row, memberids)
 
     @classmethod
-    def fetch_tickets_where(cls: Type[T], memberid=None, **kwargs) -> List[T]:
+    def fetch_tickets_where(cls: Type[T], memberid=None, shard=None, **kwargs) -> List[T]:
         """
         Fetch tickets matching the given criteria.
         Additionally filters by the current `_ticket_type`, if set and not given in `kwargs`.
@@ -222,6 +229,8 @@ class Ticket:
         ----------
         memberid: Optional[int]
             Filter for tickets with the given memberid associated.
+        shard: Optional[Tuple[int, int]]
+            Filter for tickets in guilds on the given shard, given as `(shard_count, shard_id)`.
         **kwargs:
             Remaining kwargs must be valid columns of `_combined_ticket_data`.
             Their values will be transparently passed to `select_where()`.
@@ -249,7 +258,10 @@ class Ticket:
         if cls._ticket_type is not None and 'ticket_type' not in kwargs:
             kwargs['ticket_type'] = cls._ticket_type.value
 
-        ticket_rows = cls._combined_ticket_data.select_where(**kwargs)
+        if shard is not None:
+            ticket_rows = cls._combined_ticket_data.select_shard(*shard, **kwargs)
+        else:
+            ticket_rows = cls._combined_ticket_data.select_where(**kwargs)
         if ticket_rows:
             ticketids = [row['ticketid'] for row in ticket_rows]
             member_rows = cls._member_data.select_where(ticketid=ticketids)
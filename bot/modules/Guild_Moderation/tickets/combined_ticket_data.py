@@ -13,6 +13,7 @@ SELECT
     t.ticketid AS ticketid,
     t.ticket_type AS ticket_type,
     t.guildid AS guildid,
+    t.ticketgid AS ticketgid,
     t.modid AS modid,
     t.agentid AS agentid,
     t.app AS app,
@@ -20,7 +21,6 @@ SELECT
     t.auditid AS auditid,
     t.reason AS reason,
     t.created_at AS created_at,
-    row_number() OVER (PARTITION BY t.guildid ORDER BY t.ticketid) AS ticketgid,
     timedmutes.duration AS tmute_duration,
     timedmutes.roleid AS tmute_roleid,
     timedmutes.unmute_timestamp AS tmute_unmute_timestamp
@@ -30,7 +30,6 @@ LEFT JOIN guild_timed_mute_tickets timedmutes ON t.ticketid = timedmutes.ticketi
 """
 combined_columns = (
     *ticket_schema.interface_columns,
-    ('ticketgid', int),
     ('tmute_duration', int),
     ('tmute_roleid', int),
     ('tmute_unmute_timestamp', int)
@@ -1,4 +1,4 @@
-from registry import tableInterface, Column, ColumnType, tableSchema, ForeignKey, ReferenceAction
+from registry import tableInterface, Column, ColumnType, tableSchema, ForeignKey, ReferenceAction, Index
 
 from ..module import guild_moderation_module as module
 
@@ -9,6 +9,7 @@ ticket_schema = tableSchema(
     Column('ticketid', ColumnType.INT, autoincrement=True, primary=True),
     Column('ticket_type', ColumnType.INT, required=True),
     Column('guildid', ColumnType.SNOWFLAKE, required=True),
+    Column('ticketgid', ColumnType.INT, required=True),
     Column('modid', ColumnType.SNOWFLAKE, required=True),
     Column('agentid', ColumnType.SNOWFLAKE, required=True),
     Column('app', ColumnType.SHORTSTRING, required=True),
@@ -16,13 +17,23 @@ ticket_schema = tableSchema(
     Column('auditid', ColumnType.SNOWFLAKE, required=False),
     Column('reason', ColumnType.MSGSTRING, required=False),
     Column('created_at', ColumnType.INT, required=True),
+    Index('guild_moderation_tickets_guild_ticketgid', 'guildid', 'ticketgid', unique=True)
 )
 
 member_schema = tableSchema(
     "guild_moderation_ticket_members",
     Column('ticketid', ColumnType.INT, required=True),
     Column('memberid', ColumnType.SNOWFLAKE, required=True),
-    ForeignKey('ticketid', ticket_schema.name, 'ticketid', on_delete=ReferenceAction.CASCADE)
+    ForeignKey('ticketid', ticket_schema.name, 'ticketid', on_delete=ReferenceAction.CASCADE),
+    Index('guild_moderation_ticket_members_memberid', 'memberid')
+)
+
+# Last guild-local ticket id assigned in each guild
+counter_schema = tableSchema(
+    "guild_moderation_ticket_counters",
+    Column('guildid', ColumnType.SNOWFLAKE, primary=True, required=True),
+    Column('last_ticketgid', ColumnType.INT, required=True),
+    add_timestamp=False
 )
 
 
@@ -38,3 +49,8 @@ def attach_mod_ticket_data(client):
         tableInterface.from_schema(client.data, client.app, member_schema, shared=True),
         "guild_mod_ticket_members"
     )
+
+    client.data.attach_interface(
+        tableInterface.from_schema(client.data, client.app, counter_schema, shared=True),
+        "guild_mod_ticket_counters"
+    )
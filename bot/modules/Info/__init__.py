@@ -1,2 +1,3 @@
 from . import module
 from . import info_cmds
+from . import join_order
@@ -9,6 +9,7 @@ from constants import ParaCC
 from utils.lib import emb_add_fields, paginate_list, strfdelta, prop_tabulate, join_list
 
 from .module import info_module as module
+from .join_order import get_join_order
 
 # Provides serverinfo, userinfo, roleinfo, whohas, avatar
 """
@@ -229,20 +230,15 @@ async def cmd_userinfo(ctx: Context):
     if banner:
         embed.set_image(url=banner)
 
-    if user.joined_at:  # joined_at is Optional
-        joined = sorted((mem for mem in ctx.guild.members if mem.joined_at), key=lambda mem: mem.joined_at)
-        pos = joined.index(user)
+    join_order = get_join_order(ctx.client, ctx.guild)
+    pos = join_order.position(user)
+    if pos is not None:  # joined_at is Optional
         positions = []
-        for i in range(-3, 4):
-            line_pos = pos + i
-            if line_pos < 0:
-                continue
-            if line_pos >= len(joined):
-                break
+        for line_pos, memberid in enumerate(join_order.window(pos - 3, pos + 4), start=max(pos - 3, 0)):
             positions.append(
                 "{:>4}.   {} {}".format(
-                   line_pos + 1, ">" if joined[line_pos] == user else " ",
-                    joined[line_pos]
+                    line_pos + 1, ">" if memberid == user.id else " ",
+                    ctx.guild.get_member(memberid) or memberid
                 )
             )
         join_seq = "```markdown\n{}\n```".format("\n".join(positions))
@@ -0,0 +1,129 @@
+from bisect import bisect_left, insort
+
+from .module import info_module as module
+
+"""
+Per-guild join order index.
+
+Handlers:
+    track_member_join:
+        Adds joining members to the join order index of their guild.
+    track_member_remove:
+        Removes departing members from the join order index of their guild.
+    drop_guild_join_order:
+        Drops the join order index of guilds we leave.
+Client objects:
+    join_orders: Dict[int, JoinOrder]
+        Join order indexes of the guilds they have been built for, indexed by guildid.
+"""
+
+
+class JoinOrder:
+    """
+    Sorted index of the members of a guild by join time.
+    Built from the member cache, so the guild should be chunked,
+    and kept up to date incrementally by the member join and remove handlers.
+    Positions are zero-based.
+    """
+    __slots__ = ('guildid', '_keys', '_missing')
+
+    def __init__(self, guild):
+        self.guildid = guild.id
+
+        self._keys = []  # Sorted list of (join timestamp, memberid)
+        self._missing = 0  # Number of members without a join time, so not indexed
+        self.rebuild(guild)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _key(member):
+        return (member.joined_at.timestamp(), member.id)
+
+    def rebuild(self, guild):
+        members = guild.members
+        self._keys = sorted(self._key(member) for member in members if member.joined_at)
+        self._missing = len(members) - len(self._keys)
+
+    def is_stale(self, guild):
+        """
+        Whether the index has missed joins or departures, e.g. while disconnected.
+        """
+        return guild.member_count is not None and len(self._keys) + self._missing != guild.member_count
+
+    def add(self, member):
+        if member.joined_at:
+            key = self._key(member)
+            pos = bisect_left(self._keys, key)
+            if pos == len(self._keys) or self._keys[pos] != key:
+                insort(self._keys, key, lo=pos)
+        else:
+            self._missing += 1
+
+    def remove(self, member):
+        if member.joined_at:
+            pos = self.position(member)
+            if pos is not None:
+                del self._keys[pos]
+        else:
+            self._missing = max(self._missing - 1, 0)
+
+    def position(self, member):
+        """
+        Position of the given member in the join order, or `None` if they are not indexed.
+        """
+        if not member.joined_at:
+            return None
+        key = self._key(member)
+        pos = bisect_left(self._keys, key)
+        return pos if pos < len(self._keys) and self._keys[pos] == key else None
+
+    def window(self, start, end):
+        """
+        Memberids at the positions in `range(start, end)`, clamped to the index.
+        """
+        return [memberid for _, memberid in self._keys[max(start, 0):max(end, 0)]]
+
+    def joined_between(self, start, end):
+        """
+        Number of indexed members who joined between the given datetimes.
+        """
+        return bisect_left(self._keys, (end.timestamp(),)) - bisect_left(self._keys, (start.timestamp(),))
+
+
+def get_join_order(client, guild):
+    """
+    Retrieve the join order index of the given chunked guild, building or rebuilding it if required.
+    """
+    join_orders = client.objects['join_orders']
+    join_order = join_orders.get(guild.id, None)
+    if join_order is None:
+        join_order = join_orders[guild.id] = JoinOrder(guild)
+    elif join_order.is_stale(guild):
+        join_order.rebuild(guild)
+    return join_order
+
+
+async def track_member_join(client, member):
+    join_order = client.objects['join_orders'].get(member.guild.id, None)
+    if join_order is not None:
+        join_order.add(member)
+
+
+async def track_member_remove(client, member):
+    join_order = client.objects['join_orders'].get(member.guild.id, None)
+    if join_order is not None:
+        join_order.remove(member)
+
+
+async def drop_guild_join_order(client, guild):
+    client.objects['join_orders'].pop(guild.id, None)
+
+
+@module.init_task
+def attach_join_order(client):
+    client.objects['join_orders'] = {}
+    client.add_after_event('member_join', track_member_join)
+    client.add_after_event('member_remove', track_member_remove)
+    client.add_after_event('guild_remove', drop_guild_join_order)
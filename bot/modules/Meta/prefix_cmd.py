@@ -1,3 +1,5 @@
+from paraInvalidations import invalidation_bus
+
 from .module import meta_module as module
 
 from . import userprefix_data  # noqa
@@ -65,6 +67,7 @@ async def cmd_prefix(ctx, flags):
         # Removes the previously-stored prefix
         ctx.client.objects["user_prefix_cache"].pop(ctx.author.id, None)
         ctx.client.data.user_prefixes.delete_where(userid=ctx.author.id)
+        invalidation_bus.publish("user_prefix", targetid=ctx.author.id)
 
         # Inform the user
         await ctx.reply("Your personal command prefix has successfully been removed!\n"
@@ -86,8 +89,9 @@ async def cmd_prefix(ctx, flags):
             prefix=prefix
         )
 
-        # Update the user prefix cache
+        # Update the user prefix cache, here and on the other shards
         ctx.client.objects["user_prefix_cache"][ctx.author.id] = prefix
+        invalidation_bus.publish("user_prefix", targetid=ctx.author.id)
 
         # Inform the user
         await ctx.reply("Your personal command prefix has been set to `{}`.\n"
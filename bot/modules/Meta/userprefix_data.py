@@ -1,4 +1,5 @@
 from registry import tableSchema, Column, ColumnType, tableInterface
+from paraInvalidations import invalidation_handler
 
 from .module import meta_module as module
 
@@ -32,3 +33,15 @@ def load_userprefix_cache(client):
 
     client.log("Read {} users with custom prefixes.".format(len(user_prefixes)),
                context="LOAD_USER_PREFIXES")
+
+
+@invalidation_handler("user_prefix")
+async def reload_user_prefix(client, invalidation):
+    """
+    Reload a user prefix set or removed on another shard.
+    """
+    row = await client.data.user_prefixes.select_one_where_async(userid=invalidation.targetid)
+    if row is not None:
+        client.objects["user_prefix_cache"][invalidation.targetid] = row['prefix']
+    else:
+        client.objects["user_prefix_cache"].pop(invalidation.targetid, None)
@@ -4,13 +4,14 @@ import asyncio
 import re
 
 import discord
+from cachetools import LRUCache
 
 from settings import ColumnData, ListData, String, Integer, Channel, RoleList, GuildSetting
 from registry import tableInterface, Column, ColumnType, tableSchema
 
 from wards import guild_manager
 
-from utils.lib import shard_of
+from utils.shard_loader import GuildCacheLoader
 
 from paraModule import paraModule
 
@@ -26,7 +27,11 @@ class _Starboard:
     """
     starboards = {}  # Global starboard cache
 
-    _slots = ('guildid', 'channelid', 'emoji', 'threshold', 'lock')
+    # Star state of recently starred messages, read from the `message_stars` table on a miss
+    star_messages = LRUCache(10000)  # msgid: starmsgid, or None if the message has no star message
+    star_counts = LRUCache(10000)  # msgid: star count shown on the star message
+
+    _slots = ('guildid', 'channelid', 'emoji', 'threshold')
 
     def __init__(self, guildid: int, channelid: int, emoji: Optional[str] = None, threshold: Optional[int] = None):
         self.guildid = guildid
@@ -34,8 +39,6 @@ class _Starboard:
         self.emoji = emoji
         self.threshold = threshold
 
-        self.lock = asyncio.Lock()
-
 
 # Guild configuration
 @module.guild_setting
@@ -57,6 +60,9 @@ class starboard(ColumnData, Channel, GuildSetting):
     _data_column = "channelid"
     _delete_on_none = False
 
+    # Read from the starboard cache instead
+    _cacheable = False
+
     def write(self, **kwargs):
         """
         Adds a write hook to update the cached guild starboard.
@@ -92,20 +98,22 @@ class starboard(ColumnData, Channel, GuildSetting):
         """
         Load the guilds with starboards
         """
-        starboards = {}
-
-        rows = client.data.guild_starboards.select_where()
-        for row in rows:
-            gid = row['guildid']
-            if row['channelid'] and shard_of(client.shard_count, gid) == client.shard_id:
-                starboards[gid] = _Starboard(gid, row['channelid'], row['emoji'], row['threshold'])
-
-        _Starboard.starboards = starboards
-        client.objects['starboards'] = starboards
+        starboard_loader.load(client)
+        starboards = _Starboard.starboards = client.objects['starboards']
         client.log("Cached {} starboards!".format(len(starboards)),
                    context="LOAD_STARBOARDS")
 
 
+def _build_starboards(rows):
+    return {
+        row['guildid']: _Starboard(row['guildid'], row['channelid'], row['emoji'], row['threshold'])
+        for row in rows if row['channelid']
+    }
+
+
+starboard_loader = GuildCacheLoader("starboards", "guild_starboards", _build_starboards)
+
+
 @module.guild_setting
 class star_emoji(ColumnData, String, GuildSetting):
     attr_name = "star_emoji"
@@ -127,6 +135,9 @@ class star_emoji(ColumnData, String, GuildSetting):
     _data_column = "emoji"
     _delete_on_none = False
 
+    # Read from the starboard cache instead
+    _cacheable = False
+
     def write(self, **kwargs):
         """
         Adds a write hook to update the cached guild starboard.
@@ -165,6 +176,9 @@ class star_threshold(ColumnData, Integer, GuildSetting):
     _data_column = "threshold"
     _delete_on_none = False
 
+    # Read from the starboard cache instead
+    _cacheable = False
+
     def write(self, **kwargs):
         """
         Adds a write hook to update the cached guild starboard.
@@ -245,6 +259,13 @@ async def chunk_guild(client, guild):
     return True
 
 
+# Seconds to gather reaction events on a message before updating its star message
+star_debounce = 2
+
+_pending = {}  # msgid: task waiting to process the message stars
+_message_locks = {}  # msgid: [lock held while updating the message stars, number of users]
+
+
 # Event handler
 async def starboard_listener(client, payload):
     if not payload.guild_id or payload.guild_id not in _Starboard.starboards:
@@ -252,7 +273,7 @@ async def starboard_listener(client, payload):
         return
 
     # Check that the emoji is correct
-    star_emoji = client.guild_config.star_emoji.get(client, payload.guild_id).value
+    star_emoji = (await client.guild_config.star_emoji.fetch(client, payload.guild_id)).value
 
     if payload.emoji.is_unicode_emoji():
         if str(payload.emoji) != star_emoji:
@@ -263,131 +284,184 @@ async def starboard_listener(client, payload):
             return
 
     # Get the guild starboard and make sure it exists
-    starboard = client.guild_config.starboard.get(client, payload.guild_id).value
+    starboard = (await client.guild_config.starboard.fetch(client, payload.guild_id)).value
     if starboard is None:
         return
 
     # We are in a guild with an active starboard, and have received a star reaction event
-    async with _Starboard.starboards[payload.guild_id].lock:
-        # Collect the message data
-        try:
-            message = await client.get_channel(payload.channel_id).fetch_message(payload.message_id)
-            rows = client.data.message_stars.select_where(msgid=payload.message_id)
-            starmsg_id = rows[0]['starmsgid'] if rows else None
-        except discord.NotFound:
-            return
-        except discord.Forbidden:
-            return
-
-        unstar = False
-        # Collect the reaction data
-        reaction = next((reaction for reaction in message.reactions
-                         if reaction.emoji == payload.emoji or str(reaction.emoji) == str(payload.emoji)), None)
-        if reaction is None:
-            unstar = True
-
-        # Check the threshold, if set
-        if not unstar and reaction.count < client.guild_config.star_threshold.get(client, payload.guild_id).value:
-            unstar = True
-
-        # If there are star roles, check them now
-        # Probably add these to the cache?
-        if not unstar:
-            roles = client.guild_config.star_roles.get(client, payload.guild_id).value
-            if roles:
-                # Request chunking so that reaction user roles can be fetched
-                if not message.guild.chunked:
-                    await chunk_guild(client, message.guild)
-
-                users = [user async for user in reaction.users()]
-                if not any(any(role in user.roles for role in roles) for user in users):
-                    # None of the reacting users have a star role
-                    unstar = True
-
-        if unstar:
-            # Remove the message from the starboard, if it exists
-            if starmsg_id:
-                # Remove the star message
-                client.data.message_stars.delete_where(msgid=payload.message_id)
-
-                # Get the star message and delete it if possible
-                try:
-                    message = await starboard.fetch_message(starmsg_id)
-                    await message.delete()
-                except discord.NotFound:
-                    pass
-                except discord.Forbidden:
-                    pass
-            return
+    # Gather the events on this message, processing the message once they stop arriving
+    if payload.message_id not in _pending:
+        _pending[payload.message_id] = asyncio.create_task(_debounced_update(client, payload, starboard))
 
-        # The star reaction event passes the guild threshold and star roles
-        # Build the starboard message
-        header = "{} {} in {}".format(reaction.count, reaction.emoji, message.channel.mention)
-        embed = discord.Embed(colour=discord.Colour.gold(),
-                              description=message.content,
-                              timestamp=message.created_at)
-        embed.set_author(name=message.author.display_name, icon_url=message.author.display_avatar)
-        embed.add_field(name="Message link", value="[Click to jump to message]({})".format(message.jump_url))
-
-        # Check whether the link is marked as a spoiler
-        def link_spoiler(text, link):
-            regex = r"\|\|(.+?)\|\|"
-            spoiler_list = re.findall(regex, text)
-            for spoiler in spoiler_list:
-                if link in spoiler:
-                    return True
-            return False
 
-        # If the starred embed has an image, embed it while respecting spoilers
-        if message.embeds:
-            data = message.embeds[0]
+async def _debounced_update(client, payload, starboard):
+    await asyncio.sleep(star_debounce)
 
-            if data.type == "image" and not link_spoiler(message.content, data.url):
-                embed.set_image(url=data.url)
+    # Later events on the message schedule a new update from here on
+    _pending.pop(payload.message_id, None)
 
-            elif data.type == "image" and link_spoiler(message.content, data.url):
-                embed.add_field(name="Attachment", value=f"||[Image (spoiler)]({data.url})||", inline=False)
+    # Serialise updates of the same message, while different messages are updated in parallel
+    entry = _message_locks.get(payload.message_id, None)
+    if entry is None:
+        entry = _message_locks[payload.message_id] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            await update_stars(client, payload, starboard)
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            _message_locks.pop(payload.message_id, None)
 
-            else:
-                pass
 
-        # If the message has an attachment and it can be displayed, embed it while respecting spoilers
-        elif message.attachments:
-            data = message.attachments[0]
-            filename = discord.utils.escape_markdown(data.filename)
-            spoiler = data.is_spoiler()
-
-            if not spoiler and data.url.lower().endswith(('png', 'jpeg', 'jpg', 'gif', 'webp')):
-                embed.set_image(url=data.url)
+async def get_starmsg_id(client, msgid):
+    """
+    Retrieve the id of the star message of the given message, or `None` if it has not been starred.
+    """
+    star_messages = _Starboard.star_messages
+    if msgid not in star_messages:
+        row = await client.data.message_stars.select_one_where_async(msgid=msgid)
+        star_messages[msgid] = row['starmsgid'] if row is not None else None
+    return star_messages[msgid]
 
-            # Link the file if it has a spoiler as images can't be marked as spoilers in embeds
-            elif spoiler:
-                embed.add_field(name='Attachment', value=f'||[{filename}]({data.url})||', inline=False)
 
-            # Link any file that isn't an image
-            else:
-                embed.add_field(name='Attachment', value=f'[{filename}]({data.url})', inline=False)
+async def update_stars(client, payload, starboard):
+    """
+    Post, update or remove the star message of the message in the reaction event.
+    """
+    star_messages = _Starboard.star_messages
+    star_counts = _Starboard.star_counts
+
+    # Collect the message data
+    starmsg_id = await get_starmsg_id(client, payload.message_id)
+    try:
+        message = await client.get_channel(payload.channel_id).fetch_message(payload.message_id)
+    except discord.NotFound:
+        return
+    except discord.Forbidden:
+        return
 
-        # Send or update the starboard message
-        sent = False
+    unstar = False
+    # Collect the reaction data
+    reaction = next((reaction for reaction in message.reactions
+                     if reaction.emoji == payload.emoji or str(reaction.emoji) == str(payload.emoji)), None)
+    if reaction is None:
+        unstar = True
+
+    # Check the threshold, if set
+    threshold = (await client.guild_config.star_threshold.fetch(client, payload.guild_id)).value
+    if not unstar and reaction.count < threshold:
+        unstar = True
+
+    # If there are star roles, check them now
+    # Probably add these to the cache?
+    if not unstar:
+        roles = (await client.guild_config.star_roles.fetch(client, payload.guild_id)).value
+        if roles:
+            # Request chunking so that reaction user roles can be fetched
+            if not message.guild.chunked:
+                await chunk_guild(client, message.guild)
+
+            users = [user async for user in reaction.users()]
+            if not any(any(role in user.roles for role in roles) for user in users):
+                # None of the reacting users have a star role
+                unstar = True
+
+    if unstar:
+        # Remove the message from the starboard, if it exists
         if starmsg_id:
+            # Remove the star message
+            star_messages[payload.message_id] = None
+            star_counts.pop(payload.message_id, None)
+            await client.data.message_stars.delete_where_async(msgid=payload.message_id)
+
+            # Get the star message and delete it if possible
             try:
-                starmsg = await starboard.fetch_message(starmsg_id)
-                await starmsg.edit(content=header, embed=embed)
-                sent = True
+                message = await starboard.fetch_message(starmsg_id)
+                await message.delete()
             except discord.NotFound:
                 pass
             except discord.Forbidden:
-                return
-
-        if not sent:
-            try:
-                starmsg = await starboard.send(content=header, embed=embed)
-                client.data.message_stars.insert(allow_replace=True, msgid=message.id, starmsgid=starmsg.id)
-            except discord.Forbidden:
-                pass
-            except discord.NotFound:
                 pass
+        return
+
+    # The star reaction event passes the guild threshold and star roles
+    if starmsg_id and star_counts.get(payload.message_id, None) == reaction.count:
+        # The star message is already up to date
+        return
+
+    # Build the starboard message
+    header = "{} {} in {}".format(reaction.count, reaction.emoji, message.channel.mention)
+    embed = discord.Embed(colour=discord.Colour.gold(),
+                          description=message.content,
+                          timestamp=message.created_at)
+    embed.set_author(name=message.author.display_name, icon_url=message.author.display_avatar)
+    embed.add_field(name="Message link", value="[Click to jump to message]({})".format(message.jump_url))
+
+    # Check whether the link is marked as a spoiler
+    def link_spoiler(text, link):
+        regex = r"\|\|(.+?)\|\|"
+        spoiler_list = re.findall(regex, text)
+        for spoiler in spoiler_list:
+            if link in spoiler:
+                return True
+        return False
+
+    # If the starred embed has an image, embed it while respecting spoilers
+    if message.embeds:
+        data = message.embeds[0]
+
+        if data.type == "image" and not link_spoiler(message.content, data.url):
+            embed.set_image(url=data.url)
+
+        elif data.type == "image" and link_spoiler(message.content, data.url):
+            embed.add_field(name="Attachment", value=f"||[Image (spoiler)]({data.url})||", inline=False)
+
+        else:
+            pass
+
+    # If the message has an attachment and it can be displayed, embed it while respecting spoilers
+    elif message.attachments:
+        data = message.attachments[0]
+        filename = discord.utils.escape_markdown(data.filename)
+        spoiler = data.is_spoiler()
+
+        if not spoiler and data.url.lower().endswith(('png', 'jpeg', 'jpg', 'gif', 'webp')):
+            embed.set_image(url=data.url)
+
+        # Link the file if it has a spoiler as images can't be marked as spoilers in embeds
+        elif spoiler:
+            embed.add_field(name='Attachment', value=f'||[{filename}]({data.url})||', inline=False)
+
+        # Link any file that isn't an image
+        else:
+            embed.add_field(name='Attachment', value=f'[{filename}]({data.url})', inline=False)
+
+    # Send or update the starboard message
+    sent = False
+    if starmsg_id:
+        try:
+            starmsg = await starboard.fetch_message(starmsg_id)
+            await starmsg.edit(content=header, embed=embed)
+            star_counts[message.id] = reaction.count
+            sent = True
+        except discord.NotFound:
+            pass
+        except discord.Forbidden:
+            return
+
+    if not sent:
+        try:
+            starmsg = await starboard.send(content=header, embed=embed)
+            star_messages[message.id] = starmsg.id
+            star_counts[message.id] = reaction.count
+            await client.data.message_stars.insert_async(
+                allow_replace=True, msgid=message.id, starmsgid=starmsg.id
+            )
+        except discord.Forbidden:
+            pass
+        except discord.NotFound:
+            pass
 
 
 # Attach event
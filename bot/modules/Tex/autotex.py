@@ -2,6 +2,7 @@ import logging
 import traceback
 import asyncio
 import discord
+from cachetools import LRUCache
 
 from logger import log
 from cmdClient import cmdClient
@@ -11,7 +12,12 @@ from .module import latex_module as module
 from .core.LatexUser import LatexUser
 from .core.LatexGuild import LatexGuild
 from .core.LatexContext import LatexContext
-from .core.tex_utils import ParseMode, AutoTexLevel
+from .core import tex_detect
+
+
+# Detection results of recently seen messages, as messageid: (content, source, level)
+# Allows edit events which do not change the content (e.g. embed updates) to skip detection
+parse_cache = LRUCache(10000)
 
 
 async def latex_message_parser(client, message):
@@ -31,8 +37,24 @@ async def latex_message_parser(client, message):
     if not message.content:
         return
 
+    # Cheap rejection of messages which can't contain latex
+    if not tex_detect.may_have_tex(message.content):
+        return
+
+    # Detect the latex source and level, reusing the previous result if this is an edit with the same content
+    cached = parse_cache.get(message.id, None)
+    if cached is not None and cached[0] == message.content:
+        _, source, level = cached
+    else:
+        source, level = tex_detect.detect(message.content, message.clean_content)
+        parse_cache[message.id] = (message.content, source, level)
+
+    if level is None:
+        # The message doesn't contain any latex, return now
+        return
+
     # Get the latex guild
-    lguild = LatexGuild.get(message.guild.id if message.guild else 0)
+    lguild = await LatexGuild.fetch(message.guild.id if message.guild else 0)
 
     # Check we can write in the channel and we're allowed to send latex there
     if message.guild:
@@ -54,31 +76,13 @@ async def latex_message_parser(client, message):
     if lguild.require_codeblocks and "```" not in message.content:
         return
 
-    # Build the potential latex source
-    source = LatexContext.parse_content(message.clean_content, ParseMode.DOCUMENT)
-
-    # If there's no source (e.g. everything is in a foreign codeblock) return immediately
-    if not source:
-        return
-
-    # Check what latex level we have, if any
-    if ("```tex\n" in message.content) or ("```latex\n" in message.content):
-        level = AutoTexLevel.CODEBLOCK
-    elif LatexContext.strict_hastex(source):
-        level = AutoTexLevel.STRICT
-    elif LatexContext.weak_hastex(source):
-        level = AutoTexLevel.WEAK
-    else:
-        # The message doesn't contain any latex, return now
-        return
-
     # Check whether our latex level is high enough for the guild
     if level < lguild.autotex_level:
         return
 
     # We are now in the (relatively rare) case that a message seems to have LaTeX.
     # Build the latex user
-    luser = LatexUser.get(message.author.id)
+    luser = await LatexUser.fetch(message.author.id)
 
     # Check whether our latex level is high enough for the user
     if level < luser.autotex_level:
@@ -109,7 +113,7 @@ async def latex_message_parser(client, message):
     try:
         # Create the LatexContext
         # TODO: More options
-        lctx = LatexContext(ctx, source, lguild=lguild, luser=luser)
+        lctx = LatexContext(ctx, source, lguild=lguild, luser=luser, auto=True)
 
         # Compile the source
         output_msg = await lctx.make()
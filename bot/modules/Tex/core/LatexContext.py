@@ -1,9 +1,8 @@
-import os
-import re
 import time
 import logging
 import asyncio
 import discord
+from io import BytesIO
 
 from logger import log
 
@@ -11,11 +10,13 @@ from cmdClient import cmdClient, Context
 
 from ..module import latex_module as module
 
-from .tex_utils import ParseMode, TexNameStyle
+from .tex_utils import TexNameStyle
+from . import tex_detect
 from ..resources import default_preamble, failed_image_path
 from .LatexUser import LatexUser
 from .LatexGuild import LatexGuild
 from .tex_compile import makeTeX  # noqa
+from .compile_scheduler import CompilePriority, SchedulerBusy
 
 
 class BucketFull(Exception):
@@ -75,17 +76,13 @@ class Bucket:
 
 class LatexContext:
     __slots__ = (
-        'ctx', 'source', 'lguild', 'luser',
+        'ctx', 'source', 'lguild', 'luser', 'auto',
         '_force_wide', 'wide', 'keepsourcefor', 'preamble', '_errors',
         '_source_message', '_dm_source', '_header_name', '_spoiler_output',
         '_output_message', '_source_shown', '_header_collapsed', '_header_shown',
         '_show_emoji', '_source_deletion_task', '_lifetime_task', '_last_reaction'
     )
 
-    # Compiled regex for the `$` latex content checker
-    single_dollars_pattern = re.compile(r"\$(?=\S)[^$]+(?<=\S)\$")
-    double_dollars_pattern = re.compile(r"\$\$[^$]+\$\$")
-
     # Locks to avoid simultaneous compilation for each user
     user_locks = {}  # userid: Lock
 
@@ -104,9 +101,12 @@ class LatexContext:
     emoji_show_errors = None
     emoji_delete_source = None
 
-    def __init__(self, ctx: Context, source, lguild=None, luser=None, wide=None, spoiler=False):
+    def __init__(self, ctx: Context, source, lguild=None, luser=None, wide=None, spoiler=False, auto=False):
         self.ctx = ctx
         self.source = source
+
+        # Whether the source was automatically detected, rather than explicitly requested
+        self.auto = auto
         self.lguild = lguild or LatexGuild.get(ctx.guild.id if ctx.guild else 0)
         self.luser = luser or LatexUser.get(ctx.author.id)
 
@@ -265,7 +265,11 @@ class LatexContext:
                 return
 
             # Compile the source
-            error = await self.compile()
+            try:
+                image, error = await self.compile()
+            except SchedulerBusy:
+                await ctx.error_reply("I'm too busy to render this right now, please try again in a moment!")
+                return None
             self._errors = error
 
             # Build header messages, presented above LaTeX output image
@@ -299,13 +303,15 @@ class LatexContext:
                 self._source_deletion_task = asyncio.ensure_future(self.delete_source(delay=self.keepsourcefor))
                 self.ctx.tasks.append(self._source_deletion_task)
 
-            # Obtain the output image path, potentially the failed image
-            file_path = "tex/staging/{id}/{id}.png".format(id=luser.id)
-            exists = True if os.path.isfile(file_path) else False
-            file_path = failed_image_path if not exists else file_path
-
-            # Build the file object for sending, possibly spoilered
-            output_file = discord.File(file_path, spoiler=exists and self._spoiler_output)
+            # Build the file object for sending from the output image, possibly spoilered, or the failed image
+            if image is not None:
+                output_file = discord.File(
+                    BytesIO(image),
+                    filename="{}.png".format(luser.id),
+                    spoiler=self._spoiler_output
+                )
+            else:
+                output_file = discord.File(failed_image_path)
 
             # Finally, send the output and start the reaction handler
             try:
@@ -319,13 +325,14 @@ class LatexContext:
 
     async def compile(self):
         """
-        Compile the source
+        Compile the source, returning the output image bytes (or `None`) and any error message.
         """
         return await self.ctx.makeTeX(self.source,
                                       self.luser.id,
                                       self.preamble,
                                       self.luser.colour,
-                                      pad=not self.wide)
+                                      pad=not self.wide,
+                                      priority=CompilePriority.AUTOTEX if self.auto else CompilePriority.COMMAND)
 
     async def activate_reactions(self):
         """
@@ -374,105 +381,11 @@ class LatexContext:
             # Unregister the context
             self.active_contexts.pop(msg.id, None)
 
-    @staticmethod
-    def extract_codeblocks(text):
-        """
-        Extract discord-style codeblocks from provided text.
-        This ignores escaping.
-        """
-        blocks = []
-
-        if "```" in text:
-            splits = text.split("```")
-            content_blocks = [splits[i] for i in range(1, len(splits), 2)]
-            for content_block in content_blocks:
-                splits = content_block.split("\n", maxsplit=1)
-                if len(splits) == 2 and splits[0] and ' ' not in splits[0].strip():
-                    blocks.append((splits[0].strip(), splits[1].strip()))
-                else:
-                    blocks.append((None, content_block.strip()))
-        return blocks
-
-    @classmethod
-    def parse_content(cls, content: str, mode: ParseMode):
-        """
-        Build potential LaTeX from message content, depending on the parse mode.
-        """
-        # Extract codeblocks
-        codeblocks = cls.extract_codeblocks(content)
-        if codeblocks:
-            # Build list of relevant blocks
-            blocks = [block[1] for block in codeblocks if block[0] in ['', 'tex', 'latex']]
-        else:
-            # Strip any wrapping backtics from content
-            if content.startswith('`') and content.endswith('`'):
-                content = content[1:-1]
-
-            # No codeblocks, parse the original content
-            blocks = [content]
-
-        if blocks:
-            # Parse depending on the parse mode
-            if mode == ParseMode.DOCUMENT:
-                source = "\n\n".join(blocks)
-            elif mode == ParseMode.GATHER:
-                source = "\n".join(["\\begin{{gather*}}\n{}\n\\end{{gather*}}".format(block) for block in blocks])
-            elif mode == ParseMode.ALIGN:
-                source = "\n".join(["\\begin{{align*}}\n{}\n\\end{{align*}}".format(block) for block in blocks])
-            elif mode == ParseMode.TIKZ:
-                source = "\n".join(["\\begin{{tikzpicture}}\n{}\n\\end{{tikzpicture}}".format(block) for block in blocks])
-            else:
-                # This should be impossible
-                raise ValueError("Unknown `mode` passed to LaTeX parser.")
-        else:
-            # No content
-            source = None
-
-        return source
-
-    @classmethod
-    def weak_hastex(cls, content):
-        r"""
-        Weak Latex content checker.
-        Checks whether there is a `$\S` followed by `\S$` anywhere in the content.
-        (`\S` is a non-whitespace character).
-        """
-        if not content:
-            return False
-
-        if '$' in content and content.strip('$'):
-            # Regex match for the $ pattern
-            return (cls.single_dollars_pattern.search(content) is not None)
-        else:
-            return False
-
-    @classmethod
-    def strict_hastex(cls, content):
-        r"""
-        Strict Latex content checker.
-        Checks for one of the following conditions:
-            - At least two `$$` in the content.
-            - A latex environment (by `\begin{` and `\end{`).
-            - A latex mathmode macro (i.e. {`\(`, `\)`} and {`\[`, `\]`}).
-        """
-        if not content:
-            return False
-
-        has_tex = False
-
-        # Check for `$$`
-        has_tex = has_tex or (content.count('$$') > 1
-                              and content.strip('$')
-                              and cls.double_dollars_pattern.search(content) is not None)
-
-        # Check for environments
-        has_tex = has_tex or ((r"\begin{" in content) and (r"\end{" in content))
-
-        # Check for mathmode macros
-        has_tex = has_tex or ((r"\(" in content) and (r"\)" in content))
-        has_tex = has_tex or ((r"\[" in content) and (r"\]" in content))
-
-        return has_tex
+    # LaTeX extraction and detection, see `tex_detect`
+    extract_codeblocks = staticmethod(tex_detect.extract_codeblocks)
+    parse_content = staticmethod(tex_detect.parse_content)
+    weak_hastex = staticmethod(tex_detect.weak_hastex)
+    strict_hastex = staticmethod(tex_detect.strict_hastex)
 
 
 async def reaction_listener(client, reaction, user):
@@ -3,6 +3,7 @@ from ..module import latex_module as module
 from .tex_utils import AutoTexLevel
 from . import guild_data  # noqa
 from . import guild_config  # noqa
+from .latex_cache import guild_cache
 
 
 class LatexGuild:
@@ -10,8 +11,8 @@ class LatexGuild:
         'id', 'autotex', 'autotex_level', 'require_codeblocks',
         'latex_channels', 'preamble'
     )
-    # Cache of all guilds the client requests
-    cached_guilds = {}
+    # Cache of recently requested guilds
+    cache = guild_cache
 
     # Stored client for accessing data interfaces
     _client = None
@@ -90,9 +91,21 @@ class LatexGuild:
 
     @classmethod
     def get(cls, id):
-        if id not in cls.cached_guilds:
-            cls.cached_guilds[id] = cls(id)
-        return cls.cached_guilds[id]
+        return cls.cache.get(id, cls)
+
+    @classmethod
+    async def fetch(cls, id):
+        """
+        Awaitable variant of `get`, which loads uncached guilds without blocking the event loop.
+        """
+        return await cls.cache.fetch(id, cls, cls._client.data.run_async)
+
+    @classmethod
+    def invalidate(cls, id):
+        """
+        Drop the cached guild on every shard, to be called after modifying the guild's configuration or preamble.
+        """
+        cls.cache.invalidate(id)
 
 
 module.LatexGuild = LatexGuild
@@ -101,3 +114,7 @@ module.LatexGuild = LatexGuild
 @module.data_init_task
 def attach_latexguild_client(client):
     LatexGuild._client = client
+    LatexGuild.cache.configure(
+        maxsize=client.conf.getint("latex_guild_cache_size"),
+        ttl=client.conf.getint("latex_cache_ttl")
+    )
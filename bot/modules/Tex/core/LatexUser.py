@@ -2,6 +2,7 @@ from ..module import latex_module as module
 
 from . import LatexUserSetting
 from . import user_data  # noqa
+from .latex_cache import user_cache
 
 
 class LatexUser:
@@ -21,6 +22,9 @@ class LatexUser:
     # Stored client for accessing data interfaces
     _client = None
 
+    # Cache of recently requested users
+    cache = user_cache
+
     def __init__(self, id):
         self.id = id
 
@@ -71,9 +75,27 @@ class LatexUser:
 
     @classmethod
     def get(cls, id):
-        return cls(id)
+        return cls.cache.get(id, cls)
+
+    @classmethod
+    async def fetch(cls, id):
+        """
+        Awaitable variant of `get`, which loads uncached users without blocking the event loop.
+        """
+        return await cls.cache.fetch(id, cls, cls._client.data.run_async)
+
+    @classmethod
+    def invalidate(cls, id):
+        """
+        Drop the cached user on every shard, to be called after modifying the user's configuration or preamble.
+        """
+        cls.cache.invalidate(id)
 
 
 @module.data_init_task
 def attach_latexuser_client(client):
     LatexUser._client = client
+    LatexUser.cache.configure(
+        maxsize=client.conf.getint("latex_user_cache_size"),
+        ttl=client.conf.getint("latex_cache_ttl")
+    )
@@ -5,6 +5,7 @@ from utils.lib import prop_tabulate
 
 from .tex_utils import TexNameStyle, AutoTexLevel
 from . import user_data  # noqa
+from .latex_cache import user_cache
 
 from constants import ParaCC
 
@@ -44,7 +45,7 @@ class LatexUserSetting(SettingType):
     @classmethod
     def save(cls, client, userid, data):
         """
-        Uses the appropriate tableInterface to save the data.
+        Uses the appropriate tableInterface to save the data, and invalidates the cached `LatexUser`.
         """
         params = {
             "userid": userid,
@@ -55,6 +56,7 @@ class LatexUserSetting(SettingType):
             constraint=cls._upsert_constraint,
             **params
         )
+        user_cache.invalidate(userid)
 
     @classmethod
     def response(cls, ctx, new_data):
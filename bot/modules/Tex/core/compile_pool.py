@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import shutil
+import asyncio
+import logging
+
+from logger import log
+
+from ..resources import compile_worker_path
+from ..resources.texworker import header_struct
+
+
+class CompileWorker:
+    """
+    Handle to a long-lived sandboxed compile worker process, see `resources/texworker.py`.
+    """
+    def __init__(self, workerid, workdir, command):
+        self.workerid = workerid
+        self.workdir = workdir
+        self.command = command
+
+        self.process = None
+        self.jobs = 0
+
+    async def start(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        os.makedirs(self.workdir)
+        os.chmod(self.workdir, 0o777)
+
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, compile_worker_path, os.path.abspath(self.workdir),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE
+        )
+        self.jobs = 0
+        log("Started LaTeX compile worker {} with pid '{}'.".format(self.workerid, self.process.pid),
+            context="LATEX_WORKERS",
+            level=logging.DEBUG)
+
+    async def stop(self):
+        """
+        Ask the worker to exit by closing its input, terminating it if it does not.
+        """
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        try:
+            process.stdin.close()
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except (asyncio.TimeoutError, ConnectionError):
+            try:
+                process.terminate()
+            except ProcessLookupError:
+                pass
+
+    def discard(self):
+        """
+        Kill the worker immediately, without waiting for it to exit.
+        Used when a job is abandoned mid-exchange, since the worker may still send the replies of that job.
+        """
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        try:
+            # Terminate rather than kill, so `sudo` relays the signal to the worker
+            process.terminate()
+        except ProcessLookupError:
+            pass
+
+    async def _read_frame(self):
+        header = await self.process.stdout.readexactly(header_struct.size)
+        length, = header_struct.unpack(header)
+        return await self.process.stdout.readexactly(length)
+
+    async def compile(self, jobname, source, fmt=None):
+        """
+        Send a compile job to the worker, and return the output PNG bytes (possibly empty) and error text.
+        """
+        job = json.dumps({'jobname': jobname, 'source': source, 'fmt': fmt}).encode()
+        self.process.stdin.write(header_struct.pack(len(job)) + job)
+        await self.process.stdin.drain()
+
+        result = json.loads((await self._read_frame()).decode())
+        png = await self._read_frame()
+        self.jobs += 1
+        return png, result['error']
+
+
+class CompilePool:
+    """
+    Pool of warm compile workers, each with its own working directory.
+    Workers are recycled after `max_jobs` compilations, or when a compilation times out, fails, or is cancelled,
+    so a worker is only returned to the pool with no unread replies.
+    Concurrency is bounded by the compile scheduler, so the pool only needs as many workers as it has slots.
+    """
+    def __init__(self, size=4, path="tex/workers", max_jobs=200, timeout=90, command=None):
+        self.size = size
+        self.path = path
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+
+        # Command used to launch each worker, running it as the sandboxed latex user
+        self.command = command or ['sudo', '-u', 'latex', sys.executable]
+
+        self._idle = None  # type: asyncio.Queue
+        self._workers = []
+
+    @property
+    def started(self):
+        return self._idle is not None
+
+    async def start(self):
+        """
+        Launch the workers.
+        """
+        self._idle = asyncio.Queue()
+        for i in range(self.size):
+            worker = CompileWorker(i, os.path.join(self.path, str(i)), self.command)
+            await worker.start()
+            self._workers.append(worker)
+            self._idle.put_nowait(worker)
+
+    async def close(self):
+        for worker in self._workers:
+            await worker.stop()
+
+    async def compile(self, jobname, source, fmt=None):
+        """
+        Compile the source on the next free worker, returning the PNG bytes (possibly empty) and error text.
+        """
+        worker = await self._idle.get()
+        try:
+            if worker.process is None or worker.process.returncode is not None:
+                await worker.start()
+            try:
+                png, error = await asyncio.wait_for(worker.compile(jobname, source, fmt), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                log("LaTeX compile worker {} timed out, recycling.".format(worker.workerid),
+                    context="LATEX_WORKERS",
+                    level=logging.WARNING)
+                await worker.stop()
+                return b'', "Compilation timed out!"
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+                log("LaTeX compile worker {} failed ({}), recycling.".format(worker.workerid, repr(e)),
+                    context="LATEX_WORKERS",
+                    level=logging.ERROR)
+                await worker.stop()
+                return b'', "Internal compilation error, please try again."
+            except BaseException:
+                # Abandoned mid-exchange, e.g. the caller was cancelled, so the reply may still be unread
+                worker.discard()
+                raise
+
+            if worker.jobs >= self.max_jobs:
+                await worker.stop()
+            return png, error
+        finally:
+            self._idle.put_nowait(worker)
@@ -0,0 +1,158 @@
+import os
+import time
+import asyncio
+import logging
+from enum import IntEnum
+from collections import OrderedDict, deque
+
+from logger import log
+
+
+class CompilePriority(IntEnum):
+    """
+    Scheduling priority of a compilation job, lower values are run first.
+    """
+    COMMAND = 0
+    AUTOTEX = 1
+    BACKGROUND = 2
+
+
+class SchedulerBusy(Exception):
+    """
+    Thrown when a compilation job is rejected because the queue is full.
+    """
+    pass
+
+
+class _Job:
+    __slots__ = ('userid', 'func', 'future', 'queued_at')
+
+    def __init__(self, userid, func, future):
+        self.userid = userid
+        self.func = func
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class CompileScheduler:
+    """
+    Shard-wide scheduler bounding the number of concurrently running compilations.
+    Queued jobs are run in priority order, and round-robin between users within each priority,
+    so a single user cannot monopolise the workers.
+    Once `max_queued` jobs are waiting, new jobs are rejected with `SchedulerBusy`.
+
+    Intended to be used from the event loop only.
+    """
+    # Number of recent wait times used for the wait statistics
+    wait_sample_size = 500
+
+    def __init__(self, workers=None, max_queued=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queued = max_queued if max_queued is not None else self.workers * 8
+
+        # Waiting jobs, as priority: OrderedDict(userid: deque(jobs)), ordered for round-robin
+        self._queues = {priority: OrderedDict() for priority in CompilePriority}
+        self.queued = 0
+        self.active = 0
+
+        # Statistics
+        self.max_seen_queued = 0
+        self.completed = 0
+        self.shed = 0
+        self.waits = deque(maxlen=self.wait_sample_size)
+
+    async def run(self, userid, func, priority=CompilePriority.COMMAND):
+        """
+        Run the coroutine function `func` once a worker is free, returning its result.
+        Raises `SchedulerBusy` if the queue is full.
+        """
+        if self.active < self.workers and not self.queued:
+            # Fast path, run immediately
+            self.waits.append(0)
+            return await self._run(func)
+
+        if self.queued >= self.max_queued:
+            self.shed += 1
+            log("Compile queue full ({} queued, {} active), rejecting compilation for (uid:{}).".format(
+                self.queued, self.active, userid),
+                context="LATEX_SCHEDULER",
+                level=logging.WARNING)
+            raise SchedulerBusy
+
+        job = _Job(userid, func, asyncio.get_event_loop().create_future())
+        self._queues[priority].setdefault(userid, deque()).append(job)
+        self.queued += 1
+        self.max_seen_queued = max(self.max_seen_queued, self.queued)
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            if not job.future.done():
+                # Still queued, mark it to be skipped
+                job.future.cancel()
+            raise
+
+    async def _run(self, func):
+        self.active += 1
+        try:
+            return await func()
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._dispatch()
+
+    def _next_job(self):
+        for priority in CompilePriority:
+            queue = self._queues[priority]
+            while queue:
+                userid, jobs = next(iter(queue.items()))
+                job = jobs.popleft()
+                if jobs:
+                    # Send the user to the back of the rotation
+                    queue.move_to_end(userid)
+                else:
+                    del queue[userid]
+                self.queued -= 1
+
+                if not job.future.done():
+                    return job
+        return None
+
+    def _dispatch(self):
+        while self.active < self.workers:
+            job = self._next_job()
+            if job is None:
+                break
+            self.waits.append(time.monotonic() - job.queued_at)
+            asyncio.ensure_future(self._run_job(job))
+
+    async def _run_job(self, job):
+        try:
+            result = await self._run(job.func)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            # Cancelled or otherwise interrupted, make sure the waiting caller is released
+            if not job.future.done():
+                job.future.cancel()
+
+    def stats(self):
+        """
+        Summary of the scheduler load and recent queue wait times.
+        """
+        waits = sorted(self.waits)
+        return {
+            'workers': self.workers,
+            'active': self.active,
+            'queued': self.queued,
+            'max_queued': self.max_seen_queued,
+            'completed': self.completed,
+            'shed': self.shed,
+            'wait_p50': waits[len(waits) // 2] if waits else 0,
+            'wait_p95': waits[int(len(waits) * 0.95)] if waits else 0,
+            'wait_max': waits[-1] if waits else 0,
+        }
@@ -32,10 +32,10 @@ class autotex(ColumnData, Boolean, GuildSetting):
 
     def write(self, **kwargs):
         """
-        Write data and update stored LatexGuild
+        Write data and invalidate the cached LatexGuild
         """
         super().write(**kwargs)
-        LatexGuild.get(self.guildid).load()
+        LatexGuild.invalidate(self.guildid)
 
 
 @module.guild_setting
@@ -61,10 +61,10 @@ class only_render_codeblocks(ColumnData, Boolean, GuildSetting):
 
     def write(self, **kwargs):
         """
-        Write data and update stored LatexGuild
+        Write data and invalidate the cached LatexGuild
         """
         super().write(**kwargs)
-        LatexGuild.get(self.guildid).load()
+        LatexGuild.invalidate(self.guildid)
 
 
 @module.guild_setting
@@ -102,10 +102,10 @@ class latex_level(ColumnData, IntegerEnum, GuildSetting):
 
     def write(self, **kwargs):
         """
-        Write data and update stored LatexGuild
+        Write data and invalidate the cached LatexGuild
         """
         super().write(**kwargs)
-        LatexGuild.get(self.guildid).load()
+        LatexGuild.invalidate(self.guildid)
 
 
 @module.guild_setting
@@ -123,10 +123,10 @@ class latex_channels(ListData, ChannelList, GuildSetting):
 
     def write(self, **kwargs):
         """
-        Write data and update stored LatexGuild
+        Write data and invalidate the cached LatexGuild
         """
         super().write(**kwargs)
-        LatexGuild.get(self.guildid).load()
+        LatexGuild.invalidate(self.guildid)
 
     @classmethod
     def _format_data(cls, *args, **kwargs):
@@ -0,0 +1,109 @@
+import threading
+
+from cachetools import TTLCache
+
+from paraInvalidations import invalidation_bus, invalidation_handler
+
+
+class LatexCache:
+    """
+    Bounded cache of loaded `LatexUser` or `LatexGuild` objects, keyed by id.
+    Entries expire after `ttl` seconds, and the least recently used entries are evicted past `maxsize`.
+    Writers must call `invalidate` after modifying the underlying data,
+    which also publishes the invalidation to the other shards under the cache `name`.
+    """
+    def __init__(self, name, maxsize=10000, ttl=3600):
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._data = TTLCache(maxsize, ttl)
+
+        # Incremented on every invalidation, used to discard loads which raced a write
+        self.version = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def configure(self, maxsize=None, ttl=None):
+        """
+        Resize the cache or change the entry lifetime, discarding the current entries.
+        """
+        with self._lock:
+            self.version += 1
+            self._data = TTLCache(maxsize or self._data.maxsize, ttl or self._data.ttl)
+
+    def _lookup(self, id):
+        with self._lock:
+            obj = self._data.get(id, None)
+            version = self.version
+
+        if obj is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return obj, version
+
+    def _store(self, id, obj, version):
+        with self._lock:
+            if version == self.version:
+                self._data[id] = obj
+
+    def get(self, id, loader):
+        """
+        Retrieve the object with the given id, loading it with `loader(id)` if it is not cached.
+        """
+        obj, version = self._lookup(id)
+        if obj is None:
+            obj = loader(id)
+            self._store(id, obj, version)
+        return obj
+
+    async def fetch(self, id, loader, run_async):
+        """
+        Awaitable variant of `get`, loading uncached objects through `run_async`.
+        """
+        obj, version = self._lookup(id)
+        if obj is None:
+            obj = await run_async(loader, id)
+            self._store(id, obj, version)
+        return obj
+
+    def drop(self, id):
+        """
+        Remove the object with the given id, so that it is reloaded on the next request.
+        """
+        with self._lock:
+            self.version += 1
+            self._data.pop(id, None)
+
+    def invalidate(self, id):
+        """
+        Remove the object with the given id on this shard, and publish the invalidation to the other shards.
+        """
+        self.drop(id)
+        if invalidation_bus.client is not None:
+            invalidation_bus.publish(self.name, targetid=id)
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+
+
+# Shared caches, defined here so that data writers may invalidate them without circular imports
+user_cache = LatexCache("latex_user")
+guild_cache = LatexCache("latex_guild")
+
+
+@invalidation_handler("latex_user")
+async def drop_latex_user(client, invalidation):
+    user_cache.drop(invalidation.targetid)
+
+
+@invalidation_handler("latex_guild")
+async def drop_latex_guild(client, invalidation):
+    guild_cache.drop(invalidation.targetid)
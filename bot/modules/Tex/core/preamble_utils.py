@@ -12,6 +12,9 @@ from utils.lib import split_text, mail
 from utils import interactive  # noqa
 
 from ..resources import default_preamble, failed_image_path
+from .LatexUser import LatexUser
+from .tex_compile import precompile_preamble
+from .compile_scheduler import SchedulerBusy
 
 
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
@@ -441,13 +444,16 @@ async def approve_submission(ctx, userid, manager, reason=None):
 
     current_info = ctx.client.data.user_latex_preambles.select_where(userid=userid)
     previous_preamble = current_info[0]['preamble'] if current_info else default_preamble
-    ctx.client.data.user_latex_preambles.insert(
-        allow_replace=True,
-        userid=userid,
-        preamble=pending_info[0]['pending_preamble'],
-        previous_preamble=previous_preamble
-    )
-    ctx.client.data.user_pending_preambles.delete_where(userid=userid)
+    with ctx.client.data.transaction():
+        ctx.client.data.user_latex_preambles.insert(
+            allow_replace=True,
+            userid=userid,
+            preamble=pending_info[0]['pending_preamble'],
+            previous_preamble=previous_preamble
+        )
+        ctx.client.data.user_pending_preambles.delete_where(userid=userid)
+    LatexUser.invalidate(userid)
+    precompile_preamble(pending_info[0]['pending_preamble'])
     await resolve_pending_preamble(
         ctx,
         userid,
@@ -606,11 +612,14 @@ async def test_submission(ctx, userid, manager):
     preamble = pending_info[0]['pending_preamble']
 
     # Compile the latex with this preamble
-    log = await ctx.makeTeX(preamble_test_code, testid, preamble=preamble)
+    try:
+        image, log = await ctx.makeTeX(preamble_test_code, testid, preamble=preamble)
+    except SchedulerBusy:
+        await ctx.error_reply("The renderer is too busy to test this preamble right now, please try again in a moment!")
+        return
 
-    file_path = "tex/staging/{id}/{id}.png".format(id=testid)
-    if os.path.isfile(file_path):
-        dfile = discord.File(file_path)
+    if image is not None:
+        dfile = discord.File(BytesIO(image), filename="{}.png".format(testid))
     else:
         dfile = discord.File(failed_image_path)
 
@@ -0,0 +1,181 @@
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+
+from logger import log
+
+
+class RenderCache:
+    """
+    Content addressed on-disk cache of LaTeX render output.
+    Entries are keyed by a hash of every compilation input,
+    and store the final output image (if any) along with the compilation error text.
+    The least recently used entries are evicted once the cache exceeds `max_bytes`.
+    Each shard should use its own cache directory, since the size is only tracked for this process.
+
+    Not thread safe, intended to be used from the event loop only.
+    """
+    # Error messages which depend on the host load rather than the source, and should not be cached
+    transient_errors = (
+        "Compilation timed out!",
+        "Image processing timed out!",
+        "Image processing failed!",
+        "Internal compilation error"
+    )
+
+    # Seconds after which a temporary file is assumed to be left over from an interrupted store
+    stale_tmp_age = 600
+
+    def __init__(self, path="tex/cache", max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        # Cached entries in least to most recently used order, as key: entry size
+        self._entries = OrderedDict()
+        self.size = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return bool(self.max_bytes)
+
+    @staticmethod
+    def key(header, preamble, source, colour, pad):
+        """
+        Compute the cache key for the given compilation inputs.
+        """
+        digest = hashlib.sha256()
+        for part in (header, preamble, source, colour, str(bool(pad))):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _image_path(self, key):
+        return os.path.join(self.path, "{}.png".format(key))
+
+    def _error_path(self, key):
+        return os.path.join(self.path, "{}.err".format(key))
+
+    def load(self):
+        """
+        Create the cache directory, and index any existing entries by last access time.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self._entries.clear()
+        self.size = 0
+
+        entries = []
+        stale_cutoff = time.time() - self.stale_tmp_age
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.err'):
+                key = entry.name[:-4]
+                stat = entry.stat()
+                size = stat.st_size
+                if os.path.isfile(self._image_path(key)):
+                    size += os.path.getsize(self._image_path(key))
+                entries.append((stat.st_mtime, key, size))
+            elif entry.name.endswith('.tmp'):
+                try:
+                    if entry.stat().st_mtime < stale_cutoff:
+                        # Stray temporary file from an interrupted store
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self.size += size
+        self._evict()
+
+        log("Loaded {} cached LaTeX renders ({} bytes).".format(len(self._entries), self.size),
+            context="LATEX_RENDER_CACHE")
+
+    def get(self, key):
+        """
+        Retrieve the image bytes (`None` for a failed render) and error text for the given key,
+        or `None` if it is not cached.
+        """
+        if not self.enabled or key not in self._entries:
+            self.misses += 1
+            return None
+
+        error_path = self._error_path(key)
+        try:
+            with open(error_path, 'r') as error_file:
+                error = error_file.read()
+            image = None
+            if os.path.isfile(self._image_path(key)):
+                with open(self._image_path(key), 'rb') as image_file:
+                    image = image_file.read()
+            # Record the access for ordering across restarts
+            os.utime(error_path)
+        except OSError:
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return image, error
+
+    def store(self, key, image, error):
+        """
+        Add the render output to the cache, evicting old entries as required.
+        `image` should be the image bytes, or `None` if the render failed.
+        Output with a transient error is not cached.
+        """
+        if not self.enabled:
+            return
+        error = error or ""
+        if any(msg in error for msg in self.transient_errors):
+            return
+
+        if key in self._entries:
+            self._discard(key)
+
+        try:
+            # Write the image first, since entries are indexed by their error file
+            if image is not None:
+                self._write(self._image_path(key), image)
+            self._write(self._error_path(key), error.encode('utf-8'))
+        except OSError as e:
+            log("Failed to store LaTeX render in the cache: {}".format(e),
+                context="LATEX_RENDER_CACHE",
+                level=logging.WARNING)
+            self._remove_files(key)
+            return
+
+        size = len(error.encode('utf-8')) + (len(image) if image is not None else 0)
+        self._entries[key] = size
+        self.size += size
+        self._evict()
+
+    @staticmethod
+    def _write(path, data):
+        """
+        Atomically write `data` to `path`.
+        """
+        tmp_path = "{}.tmp".format(path)
+        with open(tmp_path, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        self.size -= self._entries.pop(key, 0)
+        self._remove_files(key)
+
+    def _remove_files(self, key):
+        for path in (self._image_path(key), self._error_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,15 +1,25 @@
 import os
 import shutil
+import asyncio
 import logging
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 
 from cmdClient import Context
 
 from logger import log
+from paraArgs import args
 from utils import ctx_addons  # noqa
 
 from ..module import latex_module as module
 
-from ..resources import default_preamble, failed_image_path, compile_script_path
+from ..resources import default_preamble, compile_script_path
+
+from .render_cache import RenderCache
+from .tex_formats import FormatCache
+from .compile_scheduler import CompileScheduler, CompilePriority
+from .tex_image import process_image
+from .compile_pool import CompilePool
 
 """
 Provides a single context utility to compile LaTeX code from a user and return any error message
@@ -18,46 +28,6 @@ Provides a single context utility to compile LaTeX code from a user and return a
 __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
 
 
-def gencolour(colour, negate=True):
-    """
-    Build the colour conversion command for the provided colour, negating black text if required
-    """
-    return r"convert {{image}} {} -bordercolor transparent -border 50 \
-        -background {} -flatten {{image}}".format("+negate" if negate else "", colour)
-
-
-# Dictionary of valid colours and the associated transformation commands
-colourschemes = {}
-
-colourschemes["white"] = gencolour("white", False)
-colourschemes["black"] = gencolour("black")
-
-colourschemes["light"] = gencolour("'rgb(223, 223, 233)'", False)
-colourschemes["dark"] = gencolour("'rgb(20, 20, 20)'")
-
-colourschemes["gray"] = colourschemes["grey"] = gencolour("'rgb(49, 51, 56)'")
-colourschemes["darkgrey"] = gencolour("'rgb(35, 39, 42)'")
-
-colourschemes["trans_white"] = r"convert {image} +negate -bordercolor transparent -border 40 {image}"
-colourschemes["trans_black"] = None
-colourschemes["transparent"] = colourschemes["trans_white"]
-
-colourschemes["default"] = colourschemes["grey"]
-
-
-# Script which pads images to a minimum width of 1000
-pad_script = r"""
-width=`convert {image} -format "%[fx:w]" info:`
-minwidth=1000
-extra=$((minwidth-width))
-
-if [ $extra -gt 0 ]; then
-    convert {image} \
-        -gravity East +antialias -splice ${{extra}}x\
-        -alpha set -background transparent -alpha Background -channel alpha -fx "i>${{width}}-5?0:a" +channel {image}
-fi
-"""
-
 # Header for every LaTeX source file
 header = "\\documentclass[preview, border=20pt, 12pt]{standalone}\
     \n\\IfFileExists{eggs.sty}{\\usepackage{eggs}}{}\
@@ -71,6 +41,24 @@ header = "\\documentclass[preview, border=20pt, 12pt]{standalone}\
     \n\\nonstopmode"
 """
 
+# Cache of rendered output, configured on initialisation
+render_cache = RenderCache()
+
+# Scheduler bounding the concurrent compilations, configured on initialisation
+scheduler = CompileScheduler()
+
+# Cache of precompiled preamble formats, built on the scheduler, configured on initialisation
+format_cache = FormatCache(scheduler)
+
+# Process pool for image post-processing, created on initialisation
+image_pool = None  # type: ProcessPoolExecutor
+
+# Pool of warm compile workers, started on launch if enabled
+compile_pool = CompilePool()
+
+# Root of the per-target scratch directories, configured on initialisation
+scratch_path = "tex/staging"
+
 # The format of the source to compile
 to_compile = "{header}\
     \n{preamble}\
@@ -80,7 +68,13 @@ to_compile = "{header}\
 
 
 @Context.util
-async def makeTeX(ctx, source, targetid, preamble=default_preamble, colour="default", header=header, pad=True):
+async def makeTeX(ctx, source, targetid, preamble=default_preamble, colour="default", header=header, pad=True,
+                  priority=CompilePriority.COMMAND):
+    """
+    Compile the source, returning the output PNG bytes (or `None` if compilation failed) and any error message.
+    Compilation is queued on the shard compile scheduler with the given `priority`,
+    and raises `SchedulerBusy` if the queue is full.
+    """
     log(
         "Beginning LaTeX compilation for (tid:{targetid}).\n{content}".format(
             targetid=targetid,
@@ -90,42 +84,194 @@ async def makeTeX(ctx, source, targetid, preamble=default_preamble, colour="defa
         context="mid:{}".format(ctx.msg.id) if ctx.msg else "tid:{}".format(targetid)
     )
 
-    # Target's staging directory
-    path = "tex/staging/{}".format(targetid)
+    # Serve identical renders from the cache
+    cache_key = render_cache.key(header, preamble, source, colour, pad)
+    cached = render_cache.get(cache_key)
+    if cached is not None:
+        log("Serving LaTeX compilation for (tid:{}) from the render cache.".format(targetid),
+            level=logging.DEBUG,
+            context="mid:{}".format(ctx.msg.id) if ctx.msg else "tid:{}".format(targetid))
+        return cached
+
+    # Retrieve the precompiled preamble format, if it has been built
+    fmt = format_cache.get(header, preamble)
+
+    full_source = to_compile.format(header=header, preamble=preamble, source=source)
+
+    if compile_pool.started:
+        # Compile on a warm worker
+        fmt_path = format_cache.format_path(fmt) if fmt is not None else None
+        compiler = partial(_compile_pooled, ctx, full_source, targetid, fmt_path, colour, pad)
+    else:
+        # Compile with a fresh shell in the target's scratch directory
+        path = scratch_directory(targetid)
+
+        # Link the format into the scratch directory, where pdflatex will find it
+        if fmt is not None:
+            os.symlink(format_cache.format_path(fmt), os.path.join(path, "{}.fmt".format(fmt)))
+
+        with open(os.path.join(path, "{}.tex".format(targetid)), 'w') as work:
+            work.write(full_source)
+
+        # Build compile script
+        script = "{compile_script} {path} {id} {fmt}".format(
+            compile_script=compile_script_path,
+            path=path, id=targetid, fmt=fmt or ""
+        )
+        compiler = partial(_compile, ctx, script, path, targetid, colour, pad)
+
+    # Run the compilation once a compile worker is free
+    image, error = await scheduler.run(targetid, compiler, priority=priority)
+    render_cache.store(cache_key, image, error)
+    return image, error
+
+
+def scratch_directory(targetid):
+    """
+    Retrieve an empty scratch directory for the given target, reusing the directory from previous compilations.
+    """
+    path = os.path.join(scratch_path, str(targetid))
+    try:
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+    except FileNotFoundError:
+        os.makedirs(path)
+    return path
+
+
+async def _compile(ctx, script, path, targetid, colour, pad):
+    """
+    Run the compile script, and post-process the rasterised output in the image pool.
+    """
+    error = await ctx.run_in_shell(script)
 
-    # Remove the staging directory, if it exists
-    shutil.rmtree(path, ignore_errors=True)
+    # The script only leaves an image if both compilation and rasterisation succeeded
+    image_path = os.path.join(path, "{}.png".format(targetid))
+    if not os.path.isfile(image_path):
+        return None, error
 
-    # Recreate staging directory
-    os.makedirs(path, exist_ok=True)
+    with open(image_path, 'rb') as image_file:
+        image = image_file.read()
+    return await _postprocess(ctx, image, targetid, colour, pad, error)
 
-    fn = "{}/{}.tex".format(path, targetid)
 
-    with open(fn, 'w') as work:
-        work.write(to_compile.format(header=header, preamble=preamble, source=source))
-        work.close()
+async def _compile_pooled(ctx, full_source, targetid, fmt_path, colour, pad):
+    """
+    Compile the source on a warm compile worker, and post-process the output in the image pool.
+    """
+    image, error = await compile_pool.compile(str(targetid), full_source, fmt_path)
+    if not image:
+        return None, error
+    return await _postprocess(ctx, image, targetid, colour, pad, error)
 
-    # Build compile script
-    script = (
-        "{compile_script} {id} || exit;\n"
-        "cd {path}\n"
-        "{colour}\n"
-        "{pad}").format(compile_script=compile_script_path,
-                        id=targetid, path=path,
-                        colour=colourschemes[colour] or "",
-                        pad=pad_script if pad else "").format(image="{}.png".format(targetid))
 
-    # Run the script in an async executor
-    return await ctx.run_in_shell(script)
+async def _postprocess(ctx, image, targetid, colour, pad, error):
+    """
+    Apply the colourscheme and padding to the rasterised output, returning the final image and error text.
+    """
+    try:
+        image = await asyncio.get_event_loop().run_in_executor(image_pool, process_image, image, colour, pad)
+    except Exception as e:
+        log("Image processing failed for (tid:{}): {}".format(targetid, e),
+            context="mid:{}".format(ctx.msg.id) if ctx.msg else "tid:{}".format(targetid),
+            level=logging.ERROR)
+        image = None
+        error = "{}\nImage processing failed!".format(error).strip()
+    return image, error
 
 
 @module.init_task
 def setup_structure(client):
     """
     Set up the initial tex directory structure,
-    including copying the required resources.
+    including the scratch directory, on tmpfs where available.
+    """
+    global scratch_path
+    scratch_path = client.conf.get("latex_scratch_dir") or (
+        "/dev/shm/paradox-tex-{}".format(args.shard or 0) if os.path.isdir("/dev/shm") else "tex/staging"
+    )
+
+    # Delete and recreate the scratch directory, if it exists
+    shutil.rmtree(scratch_path, ignore_errors=True)
+    os.makedirs(scratch_path, exist_ok=True)
+    os.chmod(scratch_path, 0o755)
+
+    compile_pool.path = os.path.join(scratch_path, "workers")
+
+
+@module.init_task
+def setup_render_cache(client):
+    """
+    Configure and index the render cache, and attach it to the client.
+    Each shard caches in its own directory, with an equal share of the configured size.
+    """
+    size = client.conf.getint("latex_render_cache_size")
+    if size is not None:
+        # Configured in MiB, where 0 disables the cache
+        render_cache.max_bytes = size * 1024 * 1024
+    render_cache.max_bytes //= client.shard_count or 1
+    render_cache.path = os.path.join(render_cache.path, "shard_{}".format(client.shard_id or 0))
+    if render_cache.enabled:
+        render_cache.load()
+    client.objects["latex_render_cache"] = render_cache
+
+
+@module.init_task
+def setup_format_cache(client):
+    """
+    Configure the precompiled preamble format cache.
+    """
+    format_cache.enabled = client.conf.getboolean("latex_precompile_preambles", True)
+    format_cache.max_formats = client.conf.getint("latex_format_cache_count") or format_cache.max_formats
+    if format_cache.enabled:
+        format_cache.setup()
+
+
+@module.init_task
+def setup_scheduler(client):
+    """
+    Configure the compile scheduler, and attach it to the client for load reporting.
+    """
+    workers = client.conf.getint("latex_compile_workers")
+    if workers:
+        scheduler.workers = workers
+    max_queued = client.conf.getint("latex_compile_queue")
+    scheduler.max_queued = max_queued if max_queued is not None else scheduler.workers * 8
+    client.objects["latex_compile_scheduler"] = scheduler
+
+
+@module.init_task
+def setup_image_pool(client):
+    """
+    Create the process pool used for image post-processing.
+    """
+    global image_pool
+    image_pool = ProcessPoolExecutor(max_workers=client.conf.getint("latex_image_workers") or scheduler.workers)
+
+
+@module.launch_task
+async def start_compile_pool(client):
+    """
+    Launch the warm compile workers, if enabled.
+    Otherwise, each compilation runs the compile script in a fresh shell.
+    """
+    if compile_pool.started or not client.conf.getboolean("latex_compile_pool", False):
+        return
+
+    compile_pool.size = scheduler.workers
+    compile_pool.max_jobs = client.conf.getint("latex_compile_pool_jobs") or compile_pool.max_jobs
+    compile_pool.timeout = client.conf.getint("latex_compile_timeout") or compile_pool.timeout
+    await compile_pool.start()
+    log("Started {} LaTeX compile workers.".format(compile_pool.size), context="LATEX_WORKERS")
+
+
+def precompile_preamble(preamble):
+    """
+    Build the format for a newly written preamble in the background,
+    so that the first compilation with it does not pay for the build.
     """
-    # Delete and recreate the staging directory, if it exists
-    shutil.rmtree("tex/staging", ignore_errors=True)
-    os.makedirs("tex/staging", exist_ok=True)
-    shutil.copy(failed_image_path, "tex")
+    if preamble:
+        format_cache.prepare(header, preamble)
@@ -0,0 +1,151 @@
+import re
+
+from .tex_utils import ParseMode, AutoTexLevel
+
+"""
+LaTeX source extraction and detection for message content.
+Kept free of bot and discord imports, so the detector may be benchmarked standalone.
+"""
+
+# Compiled regex for the `$` latex content checker
+single_dollars_pattern = re.compile(r"\$(?=\S)[^$]+(?<=\S)\$")
+double_dollars_pattern = re.compile(r"\$\$[^$]+\$\$")
+
+# Pre-filter matching anything that any of the detectors below could accept
+prefilter_pattern = re.compile(r"[$\\]|```(?:la)?tex\n")
+
+
+def may_have_tex(content):
+    """
+    Cheap single-pass check of whether raw message content could contain LaTeX.
+    Messages rejected here are never accepted by `detect`.
+    """
+    return prefilter_pattern.search(content) is not None
+
+
+def extract_codeblocks(text):
+    """
+    Extract discord-style codeblocks from provided text.
+    This ignores escaping.
+    """
+    blocks = []
+
+    if "```" in text:
+        splits = text.split("```")
+        content_blocks = [splits[i] for i in range(1, len(splits), 2)]
+        for content_block in content_blocks:
+            splits = content_block.split("\n", maxsplit=1)
+            if len(splits) == 2 and splits[0] and ' ' not in splits[0].strip():
+                blocks.append((splits[0].strip(), splits[1].strip()))
+            else:
+                blocks.append((None, content_block.strip()))
+    return blocks
+
+
+def parse_content(content: str, mode: ParseMode):
+    """
+    Build potential LaTeX from message content, depending on the parse mode.
+    """
+    # Extract codeblocks
+    codeblocks = extract_codeblocks(content)
+    if codeblocks:
+        # Build list of relevant blocks
+        blocks = [block[1] for block in codeblocks if block[0] in ['', 'tex', 'latex']]
+    else:
+        # Strip any wrapping backtics from content
+        if content.startswith('`') and content.endswith('`'):
+            content = content[1:-1]
+
+        # No codeblocks, parse the original content
+        blocks = [content]
+
+    if blocks:
+        # Parse depending on the parse mode
+        if mode == ParseMode.DOCUMENT:
+            source = "\n\n".join(blocks)
+        elif mode == ParseMode.GATHER:
+            source = "\n".join(["\\begin{{gather*}}\n{}\n\\end{{gather*}}".format(block) for block in blocks])
+        elif mode == ParseMode.ALIGN:
+            source = "\n".join(["\\begin{{align*}}\n{}\n\\end{{align*}}".format(block) for block in blocks])
+        elif mode == ParseMode.TIKZ:
+            source = "\n".join(["\\begin{{tikzpicture}}\n{}\n\\end{{tikzpicture}}".format(block) for block in blocks])
+        else:
+            # This should be impossible
+            raise ValueError("Unknown `mode` passed to LaTeX parser.")
+    else:
+        # No content
+        source = None
+
+    return source
+
+
+def weak_hastex(content):
+    r"""
+    Weak Latex content checker.
+    Checks whether there is a `$\S` followed by `\S$` anywhere in the content.
+    (`\S` is a non-whitespace character).
+    """
+    if not content:
+        return False
+
+    if '$' in content and content.strip('$'):
+        # Regex match for the $ pattern
+        return (single_dollars_pattern.search(content) is not None)
+    else:
+        return False
+
+
+def strict_hastex(content):
+    r"""
+    Strict Latex content checker.
+    Checks for one of the following conditions:
+        - At least two `$$` in the content.
+        - A latex environment (by `\begin{` and `\end{`).
+        - A latex mathmode macro (i.e. {`\(`, `\)`} and {`\[`, `\]`}).
+    """
+    if not content:
+        return False
+
+    has_tex = False
+
+    # Check for `$$`
+    has_tex = has_tex or (content.count('$$') > 1
+                          and content.strip('$')
+                          and double_dollars_pattern.search(content) is not None)
+
+    # Check for environments
+    has_tex = has_tex or ((r"\begin{" in content) and (r"\end{" in content))
+
+    # Check for mathmode macros
+    has_tex = has_tex or ((r"\(" in content) and (r"\)" in content))
+    has_tex = has_tex or ((r"\[" in content) and (r"\]" in content))
+
+    return has_tex
+
+
+def detect(content, clean_content):
+    """
+    Detect LaTeX in a message, given its raw and cleaned content.
+    Returns the parsed source and its `AutoTexLevel`, or `(None, None)` if there is no LaTeX.
+    """
+    if not may_have_tex(content):
+        return (None, None)
+
+    # Build the potential latex source
+    source = parse_content(clean_content, ParseMode.DOCUMENT)
+
+    # If there's no source (e.g. everything is in a foreign codeblock) there is no latex
+    if not source:
+        return (None, None)
+
+    # Check what latex level we have, if any
+    if ("```tex\n" in content) or ("```latex\n" in content):
+        level = AutoTexLevel.CODEBLOCK
+    elif strict_hastex(source):
+        level = AutoTexLevel.STRICT
+    elif weak_hastex(source):
+        level = AutoTexLevel.WEAK
+    else:
+        return (None, None)
+
+    return (source, level)
@@ -0,0 +1,181 @@
+import os
+import time
+import shutil
+import asyncio
+import hashlib
+from functools import partial
+import logging
+
+from logger import log
+
+from .compile_scheduler import CompilePriority, SchedulerBusy
+
+
+# Script building a format from the preamble of `{key}.tex`, dumping everything before `\begin{document}`
+build_script = r"""
+cd {path} || exit 1
+chmod --quiet -R o+rwx .
+sudo -u latex timeout 2m pdflatex -ini -jobname={key} "&pdflatex" mylatexformat.ltx {key}.tex > build.log 2>&1
+chmod --quiet -R o+rx .
+"""
+
+
+class FormatCache:
+    """
+    Cache of precompiled pdflatex formats, one for each distinct compilation header and preamble.
+    Formats are built in the background the first time a preamble is seen (or when it is written),
+    and compilations use the plain preamble until the format is available.
+    Preambles which fail to build are remembered, and always compiled without a format.
+
+    Builds run as background jobs on the compile scheduler, so they share its concurrency limit,
+    and at most one build per scheduler worker is pending at once.
+    The cache directory may be shared between shards, so each build runs in its own directory under `building`,
+    and is moved into place once complete.
+
+    Not thread safe, intended to be used from the event loop only.
+    """
+    # Seconds after which a build directory is assumed abandoned, exceeding the build script timeout
+    build_timeout = 300
+
+    def __init__(self, scheduler, path="tex/formats", max_formats=100, enabled=True):
+        self.scheduler = scheduler
+        self.path = path
+        self.max_formats = max_formats
+        self.enabled = enabled
+
+        # Format builds in progress, as key: Task
+        self._building = {}
+
+        # Keys of preambles which failed to build
+        self._failed = set()
+
+    @staticmethod
+    def key(header, preamble):
+        """
+        Compute the format key for the given header and preamble.
+        """
+        digest = hashlib.sha256()
+        digest.update(header.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(preamble.encode('utf-8'))
+        return "fmt_{}".format(digest.hexdigest()[:32])
+
+    def format_path(self, key):
+        """
+        Absolute path to the format file for the given key.
+        """
+        return os.path.abspath(os.path.join(self.path, key, "{}.fmt".format(key)))
+
+    @property
+    def build_path(self):
+        return os.path.join(self.path, "building")
+
+    def setup(self):
+        """
+        Create the format directory, removing any abandoned builds.
+        Builds in progress on other shards are left alone.
+        """
+        os.makedirs(self.build_path, exist_ok=True)
+        cutoff = time.time() - self.build_timeout
+        for entry in os.scandir(self.build_path):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
+
+    def get(self, header, preamble):
+        """
+        Retrieve the key of the built format for the given header and preamble,
+        scheduling a build and returning `None` if it is not available.
+        """
+        if not self.enabled:
+            return None
+
+        key = self.key(header, preamble)
+        fmt_path = self.format_path(key)
+        if key not in self._building and os.path.isfile(fmt_path):
+            try:
+                # Record the use for eviction on the format directory, since the format file is owned by latex
+                os.utime(os.path.dirname(fmt_path))
+            except OSError:
+                pass
+            return key
+
+        self.prepare(header, preamble)
+        return None
+
+    def prepare(self, header, preamble):
+        """
+        Schedule a build of the format for the given header and preamble, if required.
+        """
+        if not self.enabled:
+            return
+
+        key = self.key(header, preamble)
+        if key in self._building or key in self._failed or os.path.isfile(self.format_path(key)):
+            return
+        if len(self._building) >= self.scheduler.workers:
+            # Enough builds are pending, the format will be requested again on a later compilation
+            return
+
+        self._building[key] = asyncio.ensure_future(self._build(key, header, preamble))
+
+    async def _build(self, key, header, preamble):
+        path = os.path.join(self.build_path, "{}_{}".format(key, os.getpid()))
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+
+            with open(os.path.join(path, "{}.tex".format(key)), 'w') as source:
+                source.write("{}\n{}\n\\begin{{document}}\n\\end{{document}}".format(header, preamble))
+
+            await self.scheduler.run(0, partial(self._run_build, path, key), priority=CompilePriority.BACKGROUND)
+
+            if os.path.isfile(os.path.join(path, "{}.fmt".format(key))):
+                try:
+                    # Move the complete build into place, unless another shard has already done so
+                    os.rename(path, os.path.join(self.path, key))
+                except OSError:
+                    pass
+                else:
+                    log("Built LaTeX format {}.".format(key), context="LATEX_FORMATS", level=logging.DEBUG)
+                    self._prune()
+            else:
+                log("Failed to build LaTeX format {}, compiling without it.".format(key),
+                    context="LATEX_FORMATS",
+                    level=logging.WARNING)
+                self._failed.add(key)
+        except SchedulerBusy:
+            # Not a failure, the build will be requested again on a later compilation
+            pass
+        except Exception as e:
+            log("Exception while building LaTeX format {}: {}".format(key, e),
+                context="LATEX_FORMATS",
+                level=logging.ERROR)
+            self._failed.add(key)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+            self._building.pop(key, None)
+
+    @staticmethod
+    async def _run_build(path, key):
+        process = await asyncio.create_subprocess_shell(build_script.format(path=path, key=key))
+        await process.wait()
+
+    def _prune(self):
+        """
+        Remove the least recently used formats beyond `max_formats`.
+        """
+        formats = []
+        for entry in os.scandir(self.path):
+            if entry.is_dir():
+                try:
+                    if os.path.isfile(self.format_path(entry.name)):
+                        formats.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+
+        formats.sort()
+        for _, path in formats[:max(0, len(formats) - self.max_formats)]:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,103 @@
+from io import BytesIO
+from collections import namedtuple
+
+from PIL import Image, ImageChops, ImageOps
+
+"""
+Post-processing of rasterised LaTeX output, applying the colourscheme and padding in a single pass.
+Intended to be run in a process pool, see `process_image`.
+"""
+
+# Colourscheme transformation.
+# background: Background RGB colour to flatten onto, or None to keep the image transparent
+# negate: Whether to negate the grey (i.e. uncoloured) pixels, turning black text white
+# border: Width of the transparent border added around the image, before flattening
+ColourScheme = namedtuple('ColourScheme', ('background', 'negate', 'border'))
+
+# Dictionary of valid colours and the associated transformations
+colourschemes = {}
+
+colourschemes["white"] = ColourScheme((255, 255, 255), False, 50)
+colourschemes["black"] = ColourScheme((0, 0, 0), True, 50)
+
+colourschemes["light"] = ColourScheme((223, 223, 233), False, 50)
+colourschemes["dark"] = ColourScheme((20, 20, 20), True, 50)
+
+colourschemes["gray"] = colourschemes["grey"] = ColourScheme((49, 51, 56), True, 50)
+colourschemes["darkgrey"] = ColourScheme((35, 39, 42), True, 50)
+
+colourschemes["trans_white"] = ColourScheme(None, True, 40)
+colourschemes["trans_black"] = None
+colourschemes["transparent"] = colourschemes["trans_white"]
+
+colourschemes["default"] = colourschemes["grey"]
+
+# Images narrower than this are padded with transparency on the right
+min_width = 1000
+
+# Number of columns at the right edge of the image made transparent when padding
+pad_blend = 4
+
+
+def _negate_grey(image):
+    """
+    Negate the colour of every grey pixel in an RGBA image, leaving coloured pixels and alpha untouched.
+    """
+    r, g, b, a = image.split()
+
+    # Mask of the pixels with r == g == b
+    difference = ImageChops.lighter(ImageChops.difference(r, g), ImageChops.difference(g, b))
+    grey_mask = difference.point(lambda v: 255 if v == 0 else 0)
+
+    rgb = Image.merge('RGB', (r, g, b))
+    rgb = Image.composite(ImageOps.invert(rgb), rgb, grey_mask)
+    return Image.merge('RGBA', (*rgb.split(), a))
+
+
+def transform(image, colour="default", pad=True):
+    """
+    Apply the colourscheme and padding to a decoded image, returning the new RGBA image.
+    """
+    image = image.convert('RGBA')
+
+    scheme = colourschemes[colour]
+    if scheme is not None:
+        if scheme.negate:
+            image = _negate_grey(image)
+
+        if scheme.border:
+            bordered = Image.new(
+                'RGBA',
+                (image.width + 2 * scheme.border, image.height + 2 * scheme.border),
+                (0, 0, 0, 0)
+            )
+            bordered.paste(image, (scheme.border, scheme.border))
+            image = bordered
+
+        if scheme.background is not None:
+            flattened = Image.new('RGBA', image.size, (*scheme.background, 255))
+            flattened.alpha_composite(image)
+            image = flattened
+
+    if pad and image.width < min_width:
+        width = image.width
+        padded = Image.new('RGBA', (min_width, image.height), (0, 0, 0, 0))
+        padded.paste(image, (0, 0))
+        # Fade out the right edge of the image into the padding
+        padded.paste((0, 0, 0, 0), (max(0, width - pad_blend), 0, width, image.height))
+        image = padded
+
+    return image
+
+
+def process_image(data, colour="default", pad=True):
+    """
+    Decode the PNG `data`, apply the colourscheme and padding, and return the encoded PNG.
+    """
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        output = transform(image, colour, pad)
+
+    buffer = BytesIO()
+    output.save(buffer, format='PNG')
+    return buffer.getvalue()
@@ -6,6 +6,7 @@ from wards import in_guild, guild_admin
 from .module import latex_module as module
 
 from .core.LatexGuild import LatexGuild
+from .core.tex_compile import precompile_preamble
 from .core.preamble_utils import preamblelog, view_preamble, confirm
 from .resources import default_preamble
 
@@ -78,7 +79,7 @@ async def cmd_gpreamble(ctx, flags):
 
         # Now reset the preamble
         guild_preamble_data.delete_where(guildid=ctx.guild.id)
-        lguild.load()
+        LatexGuild.invalidate(ctx.guild.id)
 
         # Logging
         await preamblelog(ctx, "Guild preamble has been reset.", author=log_str)
@@ -199,7 +200,8 @@ async def cmd_gpreamble(ctx, flags):
                 guildid=ctx.guild.id,
                 preamble=new_preamble
             )
-            lguild.load()
+            LatexGuild.invalidate(ctx.guild.id)
+            precompile_preamble(new_preamble)
             await ctx.reply("The guild preamble has been updated.")
             await preamblelog(
                 ctx,
@@ -282,7 +284,8 @@ async def cmd_gpreamble(ctx, flags):
                 guildid=ctx.guild.id,
                 preamble=new_submission
             )
-            lguild.load()
+            LatexGuild.invalidate(ctx.guild.id)
+            precompile_preamble(new_submission)
             await ctx.reply("The guild preamble has been updated.")
             await preamblelog(
                 ctx,
@@ -327,7 +330,8 @@ async def cmd_gpreamble(ctx, flags):
                 guildid=ctx.guild.id,
                 preamble=new_submission
             )
-            lguild.load()
+            LatexGuild.invalidate(ctx.guild.id)
+            precompile_preamble(new_submission)
             await ctx.reply("The guild preamble has been updated.")
             await preamblelog(
                 ctx,
@@ -13,6 +13,7 @@ from utils.lib import substitute_ranges
 from .module import latex_module as module
 
 from .core.LatexGuild import LatexGuild
+from .core.LatexUser import LatexUser
 from .core.preamble_utils import preamblelog, view_preamble, submit_preamble, resolve_pending_preamble, confirm
 from .resources import default_preamble
 
@@ -123,6 +124,7 @@ async def cmd_preamble(ctx, flags):
             preamble=None,
             previous_preamble=current_preamble['preamble']
         )
+        LatexUser.invalidate(ctx.author.id)
 
         # Logging
         await preamblelog(ctx, "Preamble has been reset to the default")
@@ -174,6 +176,7 @@ async def cmd_preamble(ctx, flags):
             preamble=current_preamble['previous_preamble'],
             previous_preamble=current_preamble['preamble']
         )
+        LatexUser.invalidate(ctx.author.id)
 
         # Logging
         await preamblelog(ctx, "Preamble has been reverted.")
@@ -293,6 +296,7 @@ async def cmd_preamble(ctx, flags):
                 preamble=new_preamble,
                 previous_preamble=preamble
             )
+            LatexUser.invalidate(ctx.author.id)
             await ctx.reply("Your preamble has been updated!")
             await preamblelog(ctx, "Material was removed from the preamble. New preamble below.", source=new_preamble)
         return
@@ -417,6 +421,7 @@ async def cmd_preamble(ctx, flags):
                         preamble=new_submission,
                         previous_preamble=preamble
                     )
+                    LatexUser.invalidate(ctx.author.id)
                     await ctx.reply("Your preamble has been updated!")
                     await preamblelog(ctx, "Whitelisted packages were added to the preamble. New preamble below.",
                                       source=new_submission)
@@ -10,6 +10,8 @@ from .module import latex_module as module
 from .core.preamble_utils import view_preamble, judgement_reactions, preamblelog, approve_submission, deny_submission
 from .core.preamble_utils import confirm, resolve_pending_preamble
 from .core.LatexGuild import LatexGuild
+from .core.tex_compile import precompile_preamble
+from .core.LatexUser import LatexUser
 
 
 async def approval_queue(ctx):
@@ -192,6 +194,7 @@ async def user_admin(ctx, userid):
             preamble=preamble,
             previous_preamble=current_preamble['preamble'] if current_preamble else None
         )
+        LatexUser.invalidate(userid)
 
         await ctx.reply("The user's preamble was updated.")
         await preamblelog(ctx, "Manual preamble update",
@@ -210,6 +213,7 @@ async def user_admin(ctx, userid):
             preamble=None,
             previous_preamble=current_preamble['preamble'] if current_preamble else None
         )
+        LatexUser.invalidate(userid)
 
         await resolve_pending_preamble(ctx, userid, "Preamble was reset", colour=discord.Colour.red())
         await ctx.reply("The user's preamble was reset to the default!")
@@ -351,7 +355,8 @@ async def guild_admin(ctx, guildid):
             guildid=guildid,
             preamble=preamble
         )
-        LatexGuild.get(guildid).load()
+        LatexGuild.invalidate(guildid)
+        precompile_preamble(preamble)
 
         await ctx.reply("The guild's preamble was updated.")
         await preamblelog(ctx, "Manual preamble update",
@@ -361,7 +366,7 @@ async def guild_admin(ctx, guildid):
     elif result == 2:
         # Reset the current preamble to the default
         preamble_data.delete_where(guildid=guildid)
-        LatexGuild.get(guildid).load()
+        LatexGuild.invalidate(guildid)
 
         await resolve_pending_preamble(ctx, guildid, "Guild preamble was reset", colour=discord.Colour.red())
         await ctx.reply("The guild's preamble was reset to the default!")
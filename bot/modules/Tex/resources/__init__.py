@@ -16,3 +16,6 @@ failed_image_path = os.path.join(__location__, "failed.png")
 
 # Store the path to the latex compile script
 compile_script_path = os.path.join(__location__, "texcompile.sh")
+
+# Store the path to the long-lived latex compile worker
+compile_worker_path = os.path.join(__location__, "texworker.py")
@@ -1,12 +1,27 @@
-cd tex/staging/$1/
+# Usage: texcompile.sh <scratch directory> <jobname> [format]
+# Compiles <jobname>.tex and rasterises it to <jobname>.png, exiting with an error if either step fails.
+cd $1 || exit 1
+shift
 
 chmod --quiet -R o+rwx .
 
-# find . ! -name "$1.tex" -type f -exec rm -f {} +
+# Use the precompiled preamble format if one was provided
+if [ -n "$2" ] && [ -f "$2.fmt" ];
+then
+  sudo -u latex timeout 1m pdflatex -no-shell-escape -fmt=$2 $1.tex > texout.log 2>&1
+  RET=$?
 
-sudo -u latex timeout 1m pdflatex -no-shell-escape $1.tex > texout.log 2>&1
+  # Fall back to a plain compile if the format could not be loaded
+  if grep -q -e "Fatal format file error" -e "find the format file" texout.log;
+  then
+    sudo -u latex timeout 1m pdflatex -no-shell-escape $1.tex > texout.log 2>&1
+    RET=$?
+  fi
+else
+  sudo -u latex timeout 1m pdflatex -no-shell-escape $1.tex > texout.log 2>&1
+  RET=$?
+fi
 
-RET=$?
 if [ $RET -eq 0 ];
 then
  echo "";
@@ -19,7 +34,6 @@ fi
 
 if [ ! -f $1.pdf ];
 then
-  cp ../../failed.png $1.png
   exit 1
 fi
 
@@ -27,6 +41,6 @@ timeout 20 convert -density 700 -quality 75 -depth 8 -trim +repage $1.pdf -color
 if [ $? -eq 124 ];
 then
  echo "Image processing timed out!";
- cp ../../failed.png $1.png
+ rm -f $1.png
  exit 1
 fi
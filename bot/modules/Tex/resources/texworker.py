@@ -0,0 +1,147 @@
+"""
+Long-lived LaTeX compile worker.
+
+Run as the sandboxed latex user, e.g. `sudo -u latex python3 texworker.py <workdir>`.
+Reads compile jobs from stdin and writes the results to stdout, each as length prefixed frames.
+
+Job: a JSON frame with keys
+    jobname: Name of the source and output files.
+    source: Full LaTeX source to compile.
+    fmt: Absolute path to a precompiled format file to compile with, or null.
+Result: a JSON frame with the key `error`, followed by a frame containing the PNG bytes (empty on failure).
+
+The worker exits cleanly when stdin is closed.
+This script must not import anything from the bot, since it runs in a separate interpreter.
+"""
+import os
+import sys
+import json
+import shutil
+import struct
+import subprocess
+
+
+header_struct = struct.Struct('>I')
+
+
+def read_frame(stream):
+    header = stream.read(header_struct.size)
+    if len(header) < header_struct.size:
+        return None
+    length, = header_struct.unpack(header)
+    return stream.read(length)
+
+
+def write_frame(stream, data):
+    stream.write(header_struct.pack(len(data)))
+    stream.write(data)
+
+
+def clean(workdir):
+    for name in os.listdir(workdir):
+        path = os.path.join(workdir, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+
+def pdflatex(workdir, jobname, fmt=None):
+    args = ['timeout', '1m', 'pdflatex', '-no-shell-escape']
+    if fmt:
+        args.append('-fmt={}'.format(fmt))
+    args.append('{}.tex'.format(jobname))
+
+    with open(os.path.join(workdir, 'texout.log'), 'wb') as out:
+        return subprocess.call(args, cwd=workdir, stdout=out, stderr=subprocess.STDOUT)
+
+
+def first_error(workdir, jobname):
+    """
+    Extract the first error and its context from the LaTeX log, as with `grep -A 10 -m 1 "^!"`.
+    """
+    try:
+        with open(os.path.join(workdir, '{}.log'.format(jobname)), 'r', errors='replace') as log:
+            lines = log.read().splitlines()
+    except OSError:
+        return ""
+
+    for i, line in enumerate(lines):
+        if line.startswith('!'):
+            return "\n".join(lines[i:i + 11])
+    return ""
+
+
+def compile_job(workdir, jobname, source, fmt=None):
+    """
+    Compile and rasterise the provided source, returning the error text and PNG bytes.
+    """
+    clean(workdir)
+    with open(os.path.join(workdir, '{}.tex'.format(jobname)), 'w') as texfile:
+        texfile.write(source)
+
+    fmt_name = None
+    if fmt and os.path.isfile(fmt):
+        # Link the format into the working directory, where pdflatex will find it
+        fmt_name = os.path.splitext(os.path.basename(fmt))[0]
+        os.symlink(fmt, os.path.join(workdir, os.path.basename(fmt)))
+
+    ret = pdflatex(workdir, jobname, fmt_name)
+    if fmt_name:
+        with open(os.path.join(workdir, 'texout.log'), 'r', errors='replace') as out:
+            output = out.read()
+        if "Fatal format file error" in output or "find the format file" in output:
+            # Fall back to a plain compile if the format could not be loaded
+            ret = pdflatex(workdir, jobname)
+
+    if ret == 0:
+        error = ""
+    elif ret == 124:
+        error = "Compilation timed out!"
+    else:
+        error = first_error(workdir, jobname)
+
+    pdf_path = os.path.join(workdir, '{}.pdf'.format(jobname))
+    png_path = os.path.join(workdir, '{}.png'.format(jobname))
+    if not os.path.isfile(pdf_path):
+        return error, b''
+
+    try:
+        subprocess.run(
+            ['convert', '-density', '700', '-quality', '75', '-depth', '8', '-trim', '+repage',
+             pdf_path, '-colorspace', 'sRGB', png_path],
+            cwd=workdir, timeout=20, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    except subprocess.TimeoutExpired:
+        return "{}\nImage processing timed out!".format(error).strip(), b''
+
+    if not os.path.isfile(png_path):
+        return error, b''
+
+    with open(png_path, 'rb') as png:
+        return error, png.read()
+
+
+def main():
+    workdir = sys.argv[1]
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+
+    while True:
+        frame = read_frame(stdin)
+        if frame is None:
+            break
+        job = json.loads(frame.decode())
+
+        try:
+            error, png = compile_job(workdir, job['jobname'], job['source'], job.get('fmt', None))
+        except Exception as e:
+            error, png = "Internal compilation error: {}".format(e), b''
+
+        write_frame(stdout, json.dumps({'error': error}).encode())
+        write_frame(stdout, png)
+        stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -95,8 +95,8 @@ async def cmd_tex(ctx, flags):
         )
 
     # Get latex user and guild
-    lguild = LatexGuild.get(ctx.guild.id if ctx.guild else 0)
-    luser = LatexUser.get(ctx.author.id)
+    lguild = await LatexGuild.fetch(ctx.guild.id if ctx.guild else 0)
+    luser = await LatexUser.fetch(ctx.author.id)
 
     # Determine parse mode and flags
     flags = {}
@@ -480,3 +480,9 @@ async def cmd_colour(ctx, flags):
 def col_invert(color_to_convert):
     table = str.maketrans("0123456789abcdef", "fedcba9876543210")
     return color_to_convert.lower().translate(table).upper()
+
+
+@module.init_task
+def attach_recent_messages(client):
+    # Index the channels of recent messages, checked first when searching for a quoted message
+    seekers.recent_messages.attach(client)
@@ -11,6 +11,7 @@ from wards import chunk_guild
 from .module import utils_module as module
 
 from .countrymap import countries
+from .tz_index import tz_index
 from . import time_data as tdata # noqa
 
 """
@@ -61,7 +62,7 @@ def gen_tz_strings(tzlist):
     """
     Generates blocks of timezone (time) pairs with nice spacing, ready for use in a pager.
     """
-    tzlist = [(tz, get_time(tz).strftime('%I:%M %p')) for tz in tzlist]
+    tzlist = list(zip(tzlist, tz_index.time_strings(tzlist)))
     tz_blocks = [tzlist[i:i + 20] for i in range(0, len(tzlist), 20)]
     max_block_lens = [len(max(list(zip(*tz_block))[0], key=len)) for tz_block in tz_blocks]
     block_strs = [
@@ -77,37 +78,32 @@ async def tz_lookup(ctx, search_str):
     Intelligently Lookup a timezone from a given partial or full string.
     """
     # If the search string already has a valid timezone, great
-    if search_str in all_timezones:
+    if search_str in tz_index.zone_set:
         return search_str
 
     search_str = search_str.lower()
-    # Generate timezone list for searching
-    searchlist = [
-        (tz, "{} {} {}".format(tz, get_time(tz).strftime('%I:%M%p'), get_time(tz).strftime('%H:%M')).lower())
-        for tz in all_timezones
-    ]
 
     options = []
     if ':' in search_str:
         # If it has a colon it's probably a time
         search_str = search_str.replace(' ', '')
 
-        # Look for this time in the search list
-        options = [tz for tz, tzstr in searchlist if search_str in tzstr]
+        # Look for this time in the current zone times
+        options = tz_index.search_time(search_str)
         if not options:
             # Time not found. Try to get the last digit and increase it by one, then look again.
             if search_str[-1].isdigit():
                 search_str = search_str[:-1] + str(int(search_str[-1]) + 1)
-                options = [tz for tz, tzstr in searchlist if search_str in tzstr]
+                options = tz_index.search_time(search_str)
             elif search_str[-3].isdigit():
                 search_str = search_str[:-3] + str(int(search_str[-3]) + 1) + search_str[-2:]
-                options = [tz for tz, tzstr in searchlist if search_str in tzstr]
+                options = tz_index.search_time(search_str)
     else:
         # So it's not a time, just some string.
         search_str = search_str.replace(' ', '_')
 
-        # Look for this in the search list
-        options = [tz for tz, tzstr in searchlist if search_str in tzstr]
+        # Look for this in the zone names and times, and the country names
+        options = tz_index.search_name(search_str)
 
     if options:
         # Yay we found some matches
@@ -0,0 +1,115 @@
+from bisect import bisect_right
+from datetime import datetime
+
+from pytz import timezone, all_timezones, utc
+
+from .countrymap import countries
+
+"""
+Precomputed timezone search index for the time command.
+
+Timezones are grouped by their current UTC offset, so the current time is formatted once per offset,
+rather than once per timezone.
+The groups are rebuilt when any timezone next changes offset, e.g. at a DST transition,
+and the time strings are regenerated when the minute changes.
+"""
+
+
+class TimezoneIndex:
+    """
+    Search index over the tz database names and their current times.
+    """
+    def __init__(self, zones=all_timezones):
+        self.zones = list(zones)
+        self.zone_set = set(self.zones)
+        self.lower_names = [tz.lower() for tz in self.zones]
+
+        # Lowercase country names, codes, and capitals, mapped to their timezones
+        self.countries = {}
+        for country in countries:
+            for key in (country['name'], country['code'], country['capital']):
+                self.countries.setdefault(key.lower().replace(' ', '_'), country['timezones'])
+
+        self._zone_offsets = []  # Current UTC offset of each zone in `zones`
+        self._offset_of = {}  # zone: current UTC offset
+        self._next_transition = None  # Naive UTC datetime at which some zone next changes offset
+
+        self._minute = None  # Naive UTC minute the time strings were generated for
+        self._search_strs = {}  # offset: lowercase current time string, in 12 and 24 hour formats
+        self._display_strs = {}  # offset: current time string for display
+
+    def _refresh(self):
+        now = datetime.utcnow()
+        if self._next_transition is None or now >= self._next_transition:
+            self._regroup(now)
+
+        minute = now.replace(second=0, microsecond=0)
+        if minute != self._minute:
+            self._minute = minute
+            self._search_strs = {}
+            self._display_strs = {}
+            for offset in set(self._zone_offsets):
+                local = now + offset
+                self._search_strs[offset] = "{} {}".format(local.strftime('%I:%M%p'), local.strftime('%H:%M')).lower()
+                self._display_strs[offset] = local.strftime('%I:%M %p')
+
+    def _regroup(self, now):
+        """
+        Recalculate the current offset of every zone, and the time of the next offset change.
+        """
+        aware_now = utc.localize(now)
+        next_transition = datetime.max
+        offsets = []
+        for tz in self.zones:
+            tzinfo = timezone(tz)
+            offsets.append(aware_now.astimezone(tzinfo).utcoffset())
+
+            # pytz only exposes the transition times of zones with DST through this private attribute
+            transitions = getattr(tzinfo, '_utc_transition_times', None)
+            if transitions:
+                i = bisect_right(transitions, now)
+                if i < len(transitions):
+                    next_transition = min(next_transition, transitions[i])
+
+        self._zone_offsets = offsets
+        self._offset_of = dict(zip(self.zones, offsets))
+        self._next_transition = next_transition
+        self._minute = None
+
+    def time_strings(self, zones):
+        """
+        The current times in the given zones, formatted for display.
+        """
+        self._refresh()
+        return [
+            self._display_strs[self._offset_of[tz]] if tz in self._offset_of
+            else datetime.now(timezone(tz)).strftime('%I:%M %p')
+            for tz in zones
+        ]
+
+    def search_time(self, time_str):
+        """
+        Zones where the current time, in `%I:%M%p` or `%H:%M` format, contains the given lowercase string.
+        """
+        self._refresh()
+        matching = {offset for offset, search_str in self._search_strs.items() if time_str in search_str}
+        return [tz for tz, offset in zip(self.zones, self._zone_offsets) if offset in matching]
+
+    def search_name(self, name_str):
+        """
+        Zones where the lowercase name or current time contains the given lowercase string,
+        followed by the zones of any exactly matching country name, code, or capital.
+        """
+        self._refresh()
+        matching = {offset for offset, search_str in self._search_strs.items() if name_str in search_str}
+        options = [
+            tz for tz, lower_name, offset in zip(self.zones, self.lower_names, self._zone_offsets)
+            if name_str in lower_name or offset in matching
+        ]
+        for tz in self.countries.get(name_str, ()):
+            if tz not in options:
+                options.append(tz)
+        return options
+
+
+tz_index = TimezoneIndex()
@@ -0,0 +1,305 @@
+import time
+import asyncio
+import logging
+import traceback
+import datetime as dt
+from collections import namedtuple
+
+from paraModule import paraModule
+from registry import tableInterface, tableSchema, Column, ColumnType, Index
+from registry.Transaction import current_transaction
+from settings import guild_config
+from utils.shard_loader import GuildCacheLoader
+
+"""
+Cross-shard cache invalidation bus.
+
+Each shard process holds its own caches of shared data.
+When cached data is written, the writer publishes an invalidation to the `cache_invalidations` change-log table.
+Every shard polls the table for entries with ids above the last id it has seen,
+and applies the handler registered for the cache of each entry published by another shard.
+Auto-increment ids may be committed out of order, e.g. by concurrent transactions or group commit,
+so ids skipped over are re-read as gaps for `gap_timeout` seconds, in case they are committed late.
+Modules register handlers with `invalidation_handler`, and publish through `invalidation_bus`.
+Entries published on the event loop are batched and inserted on the query workers, so publishing never blocks the loop.
+Handlers are awaited as `handler(client, invalidation)`.
+"""
+
+# Published cache invalidation, as passed to the handlers.
+# cache: Name of the invalidated cache, e.g. `user_prefix`
+# guildid: Guild the invalidated data belongs to, or 0 for no guild
+# targetid: Optional cache specific key, e.g. a userid
+# attr: Optional cache specific attribute, e.g. a guild setting name
+Invalidation = namedtuple('Invalidation', ('invalidationid', 'shard', 'cache', 'guildid', 'targetid', 'attr'))
+
+# Registered invalidation handlers, as cache: coroutine function
+invalidation_handlers = {}
+
+
+def invalidation_handler(cache):
+    """
+    Decorator registering a coroutine function `handler(client, invalidation)` for the given cache.
+    """
+    def decorator(func):
+        invalidation_handlers[cache] = func
+        return func
+    return decorator
+
+
+class InvalidationBus:
+    """
+    Publisher and poller of the cache invalidations shared between shards.
+    """
+    # Seconds between polls of the change-log
+    poll_interval = 2
+
+    # Maximum number of entries to read in each poll
+    poll_limit = 500
+
+    # Seconds to keep published entries for, before the first shard deletes them
+    retention = 3600
+
+    # Seconds to keep re-reading skipped ids for, which must exceed the longest time an insert may be uncommitted
+    gap_timeout = 60
+
+    # Maximum number of skipped ids to track
+    max_gaps = 1000
+
+    def __init__(self):
+        self.client = None
+        self.data = None  # type: tableInterface
+
+        self.last_id = 0
+        self.gaps = {}  # Skipped ids which may still be committed, as invalidationid: time first skipped
+        self._poller = None
+        self._outbox = []  # Entries published on the event loop and not yet inserted
+        self._flusher = None  # Task inserting the outbox
+
+        # Statistics
+        self.published = 0
+        self.applied = 0
+
+    def setup(self, client):
+        """
+        Attach the client and record the current end of the change-log.
+        Run before the caches are loaded, so no invalidation published after loading is missed.
+        """
+        self.client = client
+        self.data = client.data.cache_invalidations
+
+        rows = client.data.execute("SELECT MAX(invalidationid) AS last_id FROM cache_invalidations", (), fetch=True)
+        self.last_id = (rows[0]['last_id'] if rows else None) or 0
+
+    @property
+    def shard(self):
+        return self.client.shard_id or 0
+
+    # Application interface
+    def publish(self, cache, guildid=0, targetid=None, attr=None):
+        """
+        Publish an invalidation of the given cache to the other shards.
+        The publishing shard is expected to have updated its own cache.
+
+        On the event loop, the entry is queued and inserted on the query workers,
+        together with every other entry published before the flush runs.
+        Otherwise (e.g. on a query worker) it is inserted immediately.
+        """
+        entry = (
+            self.client.app, self.shard, cache, guildid or 0, targetid, attr,
+            int(dt.datetime.utcnow().timestamp())
+        )
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._insert([entry])
+        else:
+            self._outbox.append(entry)
+            if self._flusher is None:
+                self._flusher = asyncio.ensure_future(self._flush())
+
+    async def publish_async(self, cache, guildid=0, targetid=None, attr=None):
+        """
+        Awaitable variant of `publish`, which waits until the entry has been inserted.
+        """
+        self.publish(cache, guildid=guildid, targetid=targetid, attr=attr)
+        if self._flusher is not None:
+            await asyncio.shield(self._flusher)
+
+    def _insert(self, entries):
+        self.data.insert_many(
+            *entries,
+            insert_keys=('app', 'shard', 'cache', 'guildid', 'targetid', 'attr', 'created_at')
+        )
+        self.published += len(entries)
+
+    async def _flush(self):
+        # The task inherits the context of the first publisher, so leave any transaction it owns
+        current_transaction.set(None)
+        try:
+            while self._outbox:
+                entries, self._outbox = self._outbox, []
+                try:
+                    await self.client.data.run_async(self._insert, entries)
+                except Exception:
+                    full_traceback = traceback.format_exc()
+                    self.client.log(
+                        "Caught an unknown exception while publishing {} cache invalidations.\n{}".format(
+                            len(entries),
+                            '\n'.join('\t' + line for line in full_traceback.splitlines())
+                        ),
+                        context="INVALIDATIONS",
+                        level=logging.ERROR
+                    )
+        finally:
+            self._flusher = None
+
+    # Polling
+    def launch(self):
+        if self._poller is None:
+            self._poller = asyncio.create_task(self._poll_loop())
+
+    def _read(self):
+        # Entries of every app are read, so the ids of other apps are not mistaken for gaps
+        replace_char = self.client.data.replace_char
+        gaps = list(self.gaps)
+        gap_str = " OR invalidationid IN ({})".format(", ".join([replace_char] * len(gaps))) if gaps else ""
+        query = (
+            "SELECT * FROM cache_invalidations WHERE invalidationid > {0}{1} "
+            "ORDER BY invalidationid LIMIT {2}"
+        ).format(replace_char, gap_str, int(self.poll_limit))
+        return self.client.data.execute(query, (self.last_id, *gaps), fetch=True)
+
+    def _receive(self, rows):
+        """
+        Advance past the read entries, recording any skipped ids as gaps,
+        and return the entries to apply.
+        """
+        now = time.monotonic()
+        received = []
+        for row in rows:
+            invalidationid = row['invalidationid']
+            if self.gaps.pop(invalidationid, None) is None:
+                if invalidationid <= self.last_id:
+                    continue
+                for gapid in range(max(invalidationid - self.max_gaps, self.last_id + 1), invalidationid):
+                    self.gaps[gapid] = now
+                self.last_id = invalidationid
+            if row['app'] == self.client.app and row['shard'] != self.shard:
+                received.append(row)
+
+        # Forget gaps which have been skipped for too long, or are in excess
+        expired = [gapid for gapid, skipped_at in self.gaps.items() if now - skipped_at > self.gap_timeout]
+        expired.extend(sorted(self.gaps)[:max(len(self.gaps) - self.max_gaps, 0)])
+        for gapid in expired:
+            self.gaps.pop(gapid, None)
+        return received
+
+    def _prune(self):
+        cutoff = int(dt.datetime.utcnow().timestamp()) - self.retention
+        query = "DELETE FROM cache_invalidations WHERE created_at < {}".format(self.client.data.replace_char)
+        self.client.data.execute(query, (cutoff,), write=True)
+
+    async def _poll_loop(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                rows = await self.client.data.run_async(self._read)
+                for row in self._receive(rows):
+                    await self._apply(Invalidation(
+                        row['invalidationid'], row['shard'], row['cache'],
+                        row['guildid'], row['targetid'], row['attr']
+                    ))
+
+                polls += 1
+                if self.shard == 0 and polls * self.poll_interval >= self.retention / 10:
+                    polls = 0
+                    await self.client.data.run_async(self._prune)
+            except Exception:
+                full_traceback = traceback.format_exc()
+                self.client.log(
+                    "Caught an unknown exception while polling cache invalidations.\n{}".format(
+                        '\n'.join('\t' + line for line in full_traceback.splitlines())
+                    ),
+                    context="INVALIDATIONS",
+                    level=logging.ERROR
+                )
+
+    async def _apply(self, invalidation):
+        handler = invalidation_handlers.get(invalidation.cache, None)
+        if handler is None:
+            return
+
+        try:
+            await handler(self.client, invalidation)
+            self.applied += 1
+        except Exception:
+            full_traceback = traceback.format_exc()
+            self.client.log(
+                "Caught an unknown exception while applying invalidation {} of cache '{}'.\n{}".format(
+                    invalidation.invalidationid, invalidation.cache,
+                    '\n'.join('\t' + line for line in full_traceback.splitlines())
+                ),
+                context="INVALIDATIONS",
+                level=logging.ERROR
+            )
+
+
+invalidation_bus = InvalidationBus()
+
+
+@invalidation_handler("guild_settings")
+async def invalidate_guild_setting(client, invalidation):
+    """
+    Drop the cached data of a guild setting written on another shard,
+    and reload the guild caches, if the guild is on this shard.
+    """
+    if client.get_guild(invalidation.guildid) is None:
+        return
+
+    setting = guild_config.settings.get(invalidation.attr, None)
+    if setting is not None:
+        setting._invalidate_cache(client, invalidation.guildid)
+    GuildCacheLoader.request_reload(client, invalidation.guildid)
+
+
+# ------------------------------
+# Invalidation bus module
+# ------------------------------
+invalidationModule = paraModule(
+    "cache_invalidations",
+    description="Skeleton module which publishes and applies the cross-shard cache invalidations."
+)
+
+schema = tableSchema(
+    "cache_invalidations",
+    Column('invalidationid', ColumnType.INT, autoincrement=True, primary=True),
+    Column('app', ColumnType.SHORTSTRING, required=True),
+    Column('shard', ColumnType.INT, required=True),
+    Column('cache', ColumnType.SHORTSTRING, required=True),
+    Column('guildid', ColumnType.SNOWFLAKE, required=True),
+    Column('targetid', ColumnType.SNOWFLAKE),
+    Column('attr', ColumnType.SHORTSTRING),
+    Column('created_at', ColumnType.INT, required=True),
+    Index('cache_invalidations_created_at', 'created_at'),
+    add_timestamp=False
+)
+
+
+@invalidationModule.data_init_task
+def attach_invalidation_data(client):
+    client.data.attach_interface(
+        tableInterface.from_schema(client.data, client.app, schema, shared=True),
+        "cache_invalidations"
+    )
+
+
+@invalidationModule.init_task
+def setup_invalidation_bus(client):
+    invalidation_bus.setup(client)
+    client.objects["invalidation_bus"] = invalidation_bus
+
+
+@invalidationModule.launch_task
+async def launch_invalidation_bus(client):
+    invalidation_bus.launch()
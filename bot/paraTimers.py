@@ -0,0 +1,306 @@
+import json
+import heapq
+import asyncio
+import logging
+import traceback
+import datetime as dt
+from collections import namedtuple
+
+from paraModule import paraModule
+from registry import tableInterface, tableSchema, Column, ColumnType, Index
+
+"""
+Shared persistent timer service for scheduled bot actions.
+
+Actions are stored in the `scheduled_actions` table and kept in a single in-memory min-heap per shard,
+served by one dispatcher task.
+Modules register a handler for each action type with `scheduled_action`,
+and schedule or cancel actions through `timer_service`.
+Handlers are awaited as `handler(client, action)`, and the action is removed once the handler completes.
+"""
+
+# Scheduled action, as passed to the action handlers.
+# guildid: Guild the action belongs to, used to assign the action to a shard, or 0 for no guild
+# targetid: Optional action specific key, e.g. a ticketid or a messageid, used to cancel the action
+# due_at: UTC timestamp at which the action is due
+# payload: Action specific JSON compatible data
+ScheduledAction = namedtuple(
+    'ScheduledAction',
+    ('actionid', 'action_type', 'guildid', 'targetid', 'due_at', 'payload')
+)
+
+# Registered action handlers, as action_type: coroutine function
+action_handlers = {}
+
+
+def scheduled_action(action_type):
+    """
+    Decorator registering a coroutine function `handler(client, action)` for the given action type.
+    """
+    def decorator(func):
+        action_handlers[action_type] = func
+        return func
+    return decorator
+
+
+def utc_timestamp():
+    return dt.datetime.utcnow().timestamp()
+
+
+class TimerService:
+    """
+    Persistent scheduler for the actions of the guilds on the current shard.
+    Scheduling and cancellation are intended to be done from the event loop.
+    """
+    # Number of guilds to load the actions of in each query on launch
+    load_batch_size = 500
+
+    # Seconds to collect completed actions for before deleting them together
+    completion_delay = 1
+
+    def __init__(self):
+        self.client = None
+        self.data = None  # type: tableInterface
+
+        self._heap = []  # List of (due_at, actionid)
+        self._pending = {}  # actionid: ScheduledAction
+        self._targets = {}  # (action_type, targetid): set(actionids)
+
+        self._completed = []  # List of actionids completed and awaiting deletion
+        self._completion_task = None
+
+        self._wakeup = None  # type: asyncio.Event
+        self._dispatcher = None
+
+    def setup(self, client):
+        self.client = client
+        self.data = client.data.scheduled_actions
+
+    @property
+    def launched(self):
+        return self._dispatcher is not None
+
+    def _on_shard(self, guildid):
+        """
+        Whether actions for the given guild are dispatched by this shard.
+        Actions without a guild are dispatched by the first shard.
+        """
+        shard_id = self.client.shard_id or 0
+        if not guildid:
+            return shard_id == 0
+        return (guildid >> 22) % (self.client.shard_count or 1) == shard_id
+
+    def _push(self, action):
+        self._pending[action.actionid] = action
+        if action.targetid is not None:
+            self._targets.setdefault((action.action_type, action.targetid), set()).add(action.actionid)
+        heapq.heappush(self._heap, (action.due_at, action.actionid))
+
+        if self._wakeup is not None and self._heap[0][1] == action.actionid:
+            # New earliest action, wake the dispatcher to recalculate its sleep
+            self._wakeup.set()
+
+    def _forget(self, action):
+        self._pending.pop(action.actionid, None)
+        if action.targetid is not None:
+            key = (action.action_type, action.targetid)
+            actionids = self._targets.get(key, None)
+            if actionids is not None:
+                actionids.discard(action.actionid)
+                if not actionids:
+                    self._targets.pop(key)
+
+    @staticmethod
+    def _from_row(row):
+        return ScheduledAction(
+            row['actionid'],
+            row['action_type'],
+            row['guildid'],
+            row['targetid'],
+            row['due_at'],
+            json.loads(row['payload']) if row['payload'] else None
+        )
+
+    # Application interface
+    def schedule(self, action_type, due_at, guildid=0, targetid=None, payload=None):
+        """
+        Persist and schedule a new action, returning the `ScheduledAction`.
+        """
+        curs = self.data.insert(
+            app=self.client.app,
+            action_type=action_type,
+            guildid=guildid or 0,
+            targetid=targetid,
+            due_at=int(due_at),
+            payload=json.dumps(payload) if payload is not None else None
+        )
+        return self._scheduled(curs.lastrowid, action_type, due_at, guildid, targetid, payload)
+
+    async def schedule_async(self, action_type, due_at, guildid=0, targetid=None, payload=None):
+        """
+        Awaitable variant of `schedule`, running the insert on the query workers.
+        """
+        curs = await self.data.insert_async(
+            app=self.client.app,
+            action_type=action_type,
+            guildid=guildid or 0,
+            targetid=targetid,
+            due_at=int(due_at),
+            payload=json.dumps(payload) if payload is not None else None
+        )
+        return self._scheduled(curs.lastrowid, action_type, due_at, guildid, targetid, payload)
+
+    def _scheduled(self, actionid, action_type, due_at, guildid, targetid, payload):
+        action = ScheduledAction(actionid, action_type, guildid or 0, targetid, int(due_at), payload)
+        if self._on_shard(action.guildid):
+            self._push(action)
+        return action
+
+    def cancel(self, action_type, targetid):
+        """
+        Cancel and delete every pending action of the given type with the given `targetid`.
+        """
+        for actionid in self._targets.pop((action_type, targetid), ()):
+            # The heap entry is skipped when it is reached
+            self._pending.pop(actionid, None)
+        self.data.delete_where(app=self.client.app, action_type=action_type, targetid=targetid)
+
+    # Launch and dispatch
+    async def launch(self):
+        """
+        Load the pending actions for the guilds on this shard, in batches, and start the dispatcher.
+        """
+        self._wakeup = asyncio.Event()
+
+        guildids = [guild.id for guild in self.client.guilds]
+        if self._on_shard(0):
+            guildids.append(0)
+
+        count = 0
+        for i in range(0, len(guildids), self.load_batch_size):
+            rows = await self.data.select_where_async(
+                app=self.client.app,
+                guildid=guildids[i:i+self.load_batch_size]
+            )
+            for row in rows:
+                if row['actionid'] not in self._pending:
+                    self._push(self._from_row(row))
+                    count += 1
+
+        self.client.log(
+            "Loaded {} scheduled actions.".format(count),
+            context="LAUNCH_TIMERS"
+        )
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def _dispatch_loop(self):
+        # Wait until the modules have loaded the state their handlers depend on
+        while not all(module.ready for module in self.client.modules if module.enabled):
+            await asyncio.sleep(1)
+
+        while True:
+            now = utc_timestamp()
+            while self._heap and self._heap[0][0] <= now:
+                _, actionid = heapq.heappop(self._heap)
+                action = self._pending.get(actionid, None)
+                if action is None:
+                    # Cancelled action
+                    continue
+                self._forget(action)
+                asyncio.create_task(self._run(action))
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, action):
+        handler = action_handlers.get(action.action_type, None)
+        if handler is None:
+            # Leave the action in data, for when the handling module is enabled again
+            self.client.log(
+                "No handler registered for scheduled action {} of type '{}'.".format(
+                    action.actionid, action.action_type
+                ),
+                context="TIMERS",
+                level=logging.WARNING
+            )
+            return
+
+        try:
+            await handler(self.client, action)
+        except Exception:
+            full_traceback = traceback.format_exc()
+            self.client.log(
+                "Caught an unknown exception while running scheduled action {} of type '{}'.\n{}".format(
+                    action.actionid, action.action_type,
+                    '\n'.join('\t' + line for line in full_traceback.splitlines())
+                ),
+                context="TIMERS",
+                level=logging.ERROR
+            )
+        finally:
+            self._completed.append(action.actionid)
+            if self._completion_task is None:
+                self._completion_task = asyncio.create_task(self._delete_completed())
+
+    async def _delete_completed(self):
+        """
+        Delete the recently completed actions with a single query.
+        """
+        try:
+            await asyncio.sleep(self.completion_delay)
+            completed, self._completed = self._completed, []
+            await self.data.delete_where_async(actionid=completed)
+        finally:
+            self._completion_task = None
+            if self._completed:
+                self._completion_task = asyncio.create_task(self._delete_completed())
+
+
+timer_service = TimerService()
+
+
+# ------------------------------
+# Timer service module
+# ------------------------------
+timerModule = paraModule(
+    "scheduled_actions",
+    description="Skeleton module which loads and dispatches the persistent scheduled actions."
+)
+
+schema = tableSchema(
+    "scheduled_actions",
+    Column('actionid', ColumnType.INT, autoincrement=True, primary=True),
+    Column('app', ColumnType.SHORTSTRING, required=True),
+    Column('action_type', ColumnType.SHORTSTRING, required=True),
+    Column('guildid', ColumnType.SNOWFLAKE, required=True),
+    Column('targetid', ColumnType.SNOWFLAKE),
+    Column('due_at', ColumnType.INT, required=True),
+    Column('payload', ColumnType.TEXT),
+    Index('scheduled_actions_guildid', 'app', 'guildid'),
+    Index('scheduled_actions_targetid', 'action_type', 'targetid'),
+    add_timestamp=False
+)
+
+
+@timerModule.data_init_task
+def attach_scheduled_action_data(client):
+    client.data.attach_interface(
+        tableInterface.from_schema(client.data, client.app, schema, shared=True),
+        "scheduled_actions"
+    )
+
+
+@timerModule.init_task
+def setup_timer_service(client):
+    timer_service.setup(client)
+    client.objects["timer_service"] = timer_service
+
+
+@timerModule.launch_task
+async def launch_timer_service(client):
+    if not timer_service.launched:
+        await timer_service.launch()
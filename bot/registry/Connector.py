@@ -1,7 +1,16 @@
+import asyncio
+import functools
+import threading
 from itertools import chain
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import LRUCache
 
 from logger import log
 
+from .Transaction import Transaction, current_transaction
+
 
 # TODO: Versioning
 # TODO: is not null
@@ -19,16 +28,191 @@ class Connector:
     # Arguments to pass to each cursor
     cursor_args = {}
 
-    def __init__(self, **dbopts):
+    # Default number of worker threads used to run queries off the event loop
+    db_workers = 1
+
+    # Maximum number of distinct query shapes to keep built query text for
+    query_cache_size = 1024
+
+    def __init__(self, db_workers=None, commit_interval=None, commit_batch=None, **dbopts):
         self.interfaces = {}  # Dict of attached data interfaces
         self.conn = None
 
+        # Lock serialising access to the connection across the worker threads
+        self.lock = threading.RLock()
+
+        # Built query text, keyed by query shape
+        self.query_cache = LRUCache(self.query_cache_size)
+        self.query_lock = threading.Lock()
+
+        # Number of times each query has been executed, for profiling
+        self.query_counts = Counter()
+
+        # Executor running the awaitable query variants
+        self.executor = ThreadPoolExecutor(
+            max_workers=db_workers or self.db_workers,
+            thread_name_prefix="db_worker"
+        )
+
+        # Transaction state
+        self.transactions = []  # Stack of open transactions holding the lock, the outermost first
+        self.async_transactions = set()  # Open asynchronous transactions, queueing their writes
+
+        # Group commit state, committing writes every `commit_interval` seconds or `commit_batch` writes
+        self.commit_interval = commit_interval
+        self.commit_batch = commit_batch
+        self.group_commit = bool(commit_interval or commit_batch)
+        self.pending_writes = 0
+
+        self._flusher_stop = threading.Event()
+        self._flusher = None
+        if commit_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, name="db_flusher", daemon=True)
+            self._flusher.start()
+
     def close(self):
         """
-        Close the connection
+        Close the connection and shut down the query workers
         """
+        self._flusher_stop.set()
+        self.executor.shutdown(wait=True)
+        self.flush()
         self.conn.close()
 
+    # Transaction and commit handling
+    def transaction(self):
+        """
+        Context manager grouping the enclosed statements into a single atomic commit.
+        May be used with either `with` or `async with`.
+        """
+        return Transaction(self)
+
+    def begin(self):
+        """
+        Explicitly start a transaction on the connection, if required by the database.
+        """
+        pass
+
+    @property
+    def transaction_depth(self):
+        return len(self.transactions)
+
+    def owns_transaction(self, transaction):
+        """
+        Whether the given transaction is open on this connector.
+        """
+        return transaction in self.transactions or transaction in self.async_transactions
+
+    def caller_transaction(self):
+        """
+        The open transaction on this connector owned by the caller, if any.
+        """
+        transaction = current_transaction.get()
+        if transaction is not None and transaction.connector is self and self.owns_transaction(transaction):
+            return transaction
+        return None
+
+    def enter_transaction(self, transaction, blocking=True):
+        """
+        Take ownership of the connection and open the given transaction.
+        Returns whether the transaction was entered, which may only fail when not `blocking`.
+        """
+        if not self.lock.acquire(blocking=blocking):
+            return False
+        try:
+            if not self.transactions:
+                # Flush any pending group commit, so a rollback only discards our statements
+                self.flush()
+                self.begin()
+            self.transactions.append(transaction)
+        except Exception:
+            self.lock.release()
+            raise
+        return True
+
+    def exit_transaction(self, transaction, exc_type=None):
+        """
+        Close the given transaction, committing or rolling back its statements.
+        """
+        try:
+            self.transactions.remove(transaction)
+            if not self.transactions:
+                if exc_type is None:
+                    self.conn.commit()
+                else:
+                    self.conn.rollback()
+        finally:
+            self.lock.release()
+
+    async def enter_transaction_async(self, transaction):
+        """
+        Open the given asynchronous transaction.
+        The connection is shared with the rest of the event loop, so it may not be held across awaits.
+        Instead, the writes of the transaction are queued, and executed together when it closes.
+        """
+        transaction.statements = []
+        self.async_transactions.add(transaction)
+
+    async def exit_transaction_async(self, transaction, exc_type=None):
+        """
+        Close the given asynchronous transaction,
+        atomically executing its queued writes on the query workers, unless it failed.
+        """
+        self.async_transactions.discard(transaction)
+        statements, transaction.statements = transaction.statements, None
+        if exc_type is None and statements:
+            await self.run_async(self._execute_statements, statements)
+
+    def queues_writes(self):
+        """
+        Whether writes by the caller are currently queued by an asynchronous transaction.
+        """
+        transaction = self.caller_transaction()
+        return transaction is not None and transaction.statements is not None
+
+    def _execute_statements(self, statements):
+        with self.transaction():
+            for query, values in statements:
+                self.execute(query, values, write=True)
+
+    def flush(self):
+        """
+        Commit any writes pending a group commit.
+        """
+        with self.lock:
+            if self.pending_writes and not self.transaction_depth:
+                self.conn.commit()
+                self.pending_writes = 0
+
+    def _flush_loop(self):
+        """
+        Group commit flusher, periodically committing pending writes until the connector is closed.
+        """
+        while not self._flusher_stop.wait(self.commit_interval):
+            self.flush()
+
+    def _before_write(self):
+        """
+        Prepare the connection for a write.
+        Must be called while holding the lock.
+        """
+        if self.group_commit and not self.transaction_depth and not self.pending_writes:
+            self.begin()
+
+    def _after_write(self):
+        """
+        Commit a write, unless it is part of a transaction or pending a group commit.
+        Must be called while holding the lock.
+        """
+        if self.transaction_depth:
+            return
+        elif self.group_commit:
+            self.pending_writes += 1
+            if self.commit_batch and self.pending_writes >= self.commit_batch:
+                self.flush()
+        else:
+            self.conn.commit()
+
     def attach_interface(self, interface, name):
         """
         Attach a data interface to this connector.
@@ -105,58 +289,148 @@ class Connector:
         value_str = "({})".format(", ".join(self.replace_char for value in values))
         return (value_str, values)
 
+    def format_condition_shape(self, conditions):
+        """
+        Extracts the shape of a dictionary of conditions, along with the flattened condition values.
+        The shape is a hashable description of the conditional string built by `format_conditions`.
+        """
+        shape = []
+        values = []
+        for key, item in conditions.items():
+            if isinstance(item, (list, tuple)):
+                shape.append((key, len(item)))
+                values.extend(item)
+            else:
+                shape.append((key, None))
+                values.append(item)
+        return (tuple(shape), values)
+
+    def get_query(self, shape, builder, *args):
+        """
+        Retrieve the query text for the given query shape from the query cache,
+        building it with `builder(*args)` if it has not been seen before.
+        Also counts the query for profiling.
+        """
+        with self.query_lock:
+            query = self.query_cache.get(shape, None)
+            if query is None:
+                query = self.query_cache[shape] = builder(*args)
+            self.query_counts[query] += 1
+        return query
+
+    def get_cursor(self, query):
+        """
+        Retrieve a cursor to execute the provided query with.
+        """
+        return self.conn.cursor(**self.cursor_args)
+
+    def execute(self, query, values, cursor=None, write=False, fetch=False):
+        """
+        Execute a built query on the connection, handling locking and commits.
+        Returns the fetched rows if `fetch` is set, otherwise the cursor.
+        Writes from within an asynchronous transaction are queued instead, returning `None`.
+        """
+        if write and self.queues_writes():
+            self.caller_transaction().statements.append((query, values))
+            return None
+
+        with self.lock:
+            cursor = cursor or self.get_cursor(query)
+            if write:
+                self._before_write()
+            cursor.execute(query, values)
+            if write:
+                self._after_write()
+            return cursor.fetchall() if fetch else cursor
+
+    def _build_select(self, table, select_columns, conditions):
+        criteria, _ = self.format_conditions(conditions)
+        col_str = self.format_selectkeys(select_columns)
+        where_str = "WHERE {}".format(criteria) if conditions else ""
+        return 'SELECT {} FROM {} {}'.format(col_str, table, where_str)
+
+    def format_shard_condition(self, column, shard_count, shard_id):
+        """
+        Formats a condition selecting the rows whose snowflake `column` belongs to the given shard.
+        Uses the Discord shard assignment, `(guildid >> 22) % shard_count`.
+        """
+        return "(({} >> 22) % {}) = {}".format(column, int(shard_count), int(shard_id))
+
+    def _build_select_shard(self, table, select_columns, shard_column, shard_count, shard_id, conditions):
+        criteria, _ = self.format_conditions(conditions)
+        shard_criteria = self.format_shard_condition(shard_column, shard_count, shard_id)
+        col_str = self.format_selectkeys(select_columns)
+        where_str = "WHERE {} AND {}".format(criteria, shard_criteria) if conditions else "WHERE {}".format(
+            shard_criteria
+        )
+        return 'SELECT {} FROM {} {}'.format(col_str, table, where_str)
+
+    def _build_update(self, table, valuedict, conditions):
+        key_str, _ = self.format_updatestr(valuedict)
+        criteria, _ = self.format_conditions(conditions)
+        where_str = "WHERE {}".format(criteria) if conditions else ""
+        return 'UPDATE {} SET {} {}'.format(table, key_str, where_str)
+
+    def _build_delete(self, table, conditions):
+        criteria, _ = self.format_conditions(conditions)
+        return 'DELETE FROM {} WHERE {}'.format(table, criteria)
+
+    def _build_insert(self, action, table, keys, values):
+        key_str = self.format_insertkeys(keys)
+        value_str, _ = self.format_insertvalues(values)
+        return '{} INTO {} {} VALUES {}'.format(action, table, key_str, value_str)
+
+    def _build_insert_many(self, table, insert_keys, value_tuples):
+        key_str = self.format_insertkeys(insert_keys)
+        value_str = ", ".join(self.format_insertvalues(value_tuple)[0] for value_tuple in value_tuples)
+        return 'INSERT INTO {} {} VALUES {}'.format(table, key_str, value_str)
+
     def select_where(self, table, select_columns=None, cursor=None, **conditions):
         """
         Select rows from the given table matching the conditions
         """
-        criteria, criteria_values = self.format_conditions(conditions)
-        col_str = self.format_selectkeys(select_columns)
+        shape, criteria_values = self.format_condition_shape(conditions)
+        shape = ('SELECT', table, tuple(select_columns) if select_columns else None, shape)
 
-        if conditions:
-            where_str = "WHERE {}".format(criteria)
-        else:
-            where_str = ""
+        query = self.get_query(shape, self._build_select, table, select_columns, conditions)
+        return self.execute(query, criteria_values, cursor=cursor, fetch=True)
 
-        cursor = cursor or self.conn.cursor(**self.cursor_args)
-        cursor.execute(
-            'SELECT {} FROM {} {}'.format(col_str, table, where_str),
-            criteria_values
+    def select_shard(self, table, shard_count, shard_id, shard_column='guildid', select_columns=None, cursor=None,
+                     **conditions):
+        """
+        Select rows from the given table matching the conditions,
+        for which the snowflake `shard_column` belongs to the given shard.
+        """
+        shape, criteria_values = self.format_condition_shape(conditions)
+        shape = (
+            'SELECT_SHARD', table, tuple(select_columns) if select_columns else None,
+            shard_column, shard_count, shard_id, shape
+        )
+
+        query = self.get_query(
+            shape, self._build_select_shard, table, select_columns, shard_column, shard_count, shard_id, conditions
         )
-        return cursor.fetchall()
+        return self.execute(query, criteria_values, cursor=cursor, fetch=True)
 
     def update_where(self, table, valuedict, cursor=None, **conditions):
         """
         Update rows in the given table matching the conditions
         """
-        key_str, key_values = self.format_updatestr(valuedict)
-        criteria, criteria_values = self.format_conditions(conditions)
+        shape, criteria_values = self.format_condition_shape(conditions)
+        shape = ('UPDATE', table, tuple(valuedict.keys()), shape)
 
-        if conditions:
-            where_str = "WHERE {}".format(criteria)
-        else:
-            where_str = ""
-
-        cursor = cursor or self.conn.cursor(**self.cursor_args)
-        cursor.execute(
-            'UPDATE {} SET {} {}'.format(table, key_str, where_str),
-            tuple((*key_values, *criteria_values))
-        )
-        self.conn.commit()
-        return cursor
+        query = self.get_query(shape, self._build_update, table, valuedict, conditions)
+        return self.execute(query, tuple((*valuedict.values(), *criteria_values)), cursor=cursor, write=True)
 
     def delete_where(self, table, cursor=None, **conditions):
         """
         Delete rows in the given table matching the conditions
         """
-        criteria, criteria_values = self.format_conditions(conditions)
+        shape, criteria_values = self.format_condition_shape(conditions)
+        shape = ('DELETE', table, shape)
 
-        cursor = cursor or self.conn.cursor(**self.cursor_args)
-        cursor.execute(
-            'DELETE FROM {} WHERE {}'.format(table, criteria),
-            criteria_values
-        )
-        self.conn.commit()
-        return cursor
+        query = self.get_query(shape, self._build_delete, table, conditions)
+        return self.execute(query, criteria_values, cursor=cursor, write=True)
 
     def insert(self, table, cursor=None, allow_replace=False, **values):
         """
@@ -164,36 +438,25 @@ class Connector:
         """
         keys, values = zip(*values.items())
 
-        key_str = self.format_insertkeys(keys)
-        value_str, values = self.format_insertvalues(values)
-
         action = 'REPLACE' if allow_replace else 'INSERT'
+        shape = (action, table, keys)
 
-        cursor = cursor or self.conn.cursor(**self.cursor_args)
-        cursor.execute(
-            '{} INTO {} {} VALUES {}'.format(action, table, key_str, value_str),
-            values
-        )
-        self.conn.commit()
-        return cursor
+        query = self.get_query(shape, self._build_insert, action, table, keys, values)
+        return self.execute(query, values, cursor=cursor, write=True)
 
     def insert_many(self, table, *value_tuples, insert_keys=None, cursor=None):
         """
         Insert all the given values into the table
         """
-        key_str = self.format_insertkeys(insert_keys)
-        value_strs, value_tuples = zip(*(self.format_insertvalues(value_tuple) for value_tuple in value_tuples))
-
-        value_str = ", ".join(value_strs)
         values = tuple(chain(*value_tuples))
-
-        cursor = cursor or self.conn.cursor(**self.cursor_args)
-        cursor.execute(
-            'INSERT INTO {} {} VALUES {}'.format(table, key_str, value_str),
-            values
+        shape = (
+            'INSERT_MANY', table,
+            tuple(insert_keys) if insert_keys else None,
+            tuple(len(value_tuple) for value_tuple in value_tuples)
         )
-        self.conn.commit()
-        return cursor
+
+        query = self.get_query(shape, self._build_insert_many, table, insert_keys, value_tuples)
+        return self.execute(query, values, cursor=cursor, write=True)
 
     def upsert(self, table, constraint, cursor=None, **values):
         """
@@ -205,8 +468,88 @@ class Connector:
         """
         raise NotImplementedError
 
+    def increment(self, table, column, constraint, cursor=None, **keys):
+        """
+        Atomically increment the integer `column` of the row identified by `keys`,
+        inserting the row with value `1` if it does not exist.
+        Returns the new value.
+        `constraint` is the constraint which fails, as in `upsert`.
+        """
+        raise NotImplementedError
+
     def create_database(self):
         """
         Creates the database using the given schema.
         """
         raise NotImplementedError
+
+    # Awaitable query variants
+    def run_async(self, func, *args, **kwargs):
+        """
+        Run a blocking function on the query workers, returning an awaitable future.
+        Intended for running (possibly several) synchronous queries without blocking the event loop.
+        """
+        loop = asyncio.get_event_loop()
+
+        if self.caller_transaction() is not None:
+            # Run inline within our transaction, so that its writes are queued or run on its connection
+            future = loop.create_future()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        return loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def select_where_async(self, table, select_columns=None, **conditions):
+        """
+        Awaitable variant of `select_where`.
+        """
+        return await self.run_async(self.select_where, table, select_columns=select_columns, **conditions)
+
+    async def select_shard_async(self, table, shard_count, shard_id, shard_column='guildid', select_columns=None,
+                                 **conditions):
+        """
+        Awaitable variant of `select_shard`.
+        """
+        return await self.run_async(
+            self.select_shard, table, shard_count, shard_id,
+            shard_column=shard_column, select_columns=select_columns, **conditions
+        )
+
+    async def update_where_async(self, table, valuedict, **conditions):
+        """
+        Awaitable variant of `update_where`.
+        """
+        return await self.run_async(self.update_where, table, valuedict, **conditions)
+
+    async def delete_where_async(self, table, **conditions):
+        """
+        Awaitable variant of `delete_where`.
+        """
+        return await self.run_async(self.delete_where, table, **conditions)
+
+    async def insert_async(self, table, allow_replace=False, **values):
+        """
+        Awaitable variant of `insert`.
+        """
+        return await self.run_async(self.insert, table, allow_replace=allow_replace, **values)
+
+    async def insert_many_async(self, table, *value_tuples, insert_keys=None):
+        """
+        Awaitable variant of `insert_many`.
+        """
+        return await self.run_async(self.insert_many, table, *value_tuples, insert_keys=insert_keys)
+
+    async def upsert_async(self, table, constraint, **values):
+        """
+        Awaitable variant of `upsert`.
+        """
+        return await self.run_async(self.upsert, table, constraint, **values)
+
+    async def increment_async(self, table, column, constraint, **keys):
+        """
+        Awaitable variant of `increment`.
+        """
+        return await self.run_async(self.increment, table, column, constraint, **keys)
@@ -0,0 +1,58 @@
+import contextvars
+
+
+# The transaction owned by the current thread or asynchronous context, if any
+current_transaction = contextvars.ContextVar("current_transaction", default=None)
+
+
+class Transaction:
+    """
+    Context manager grouping the statements executed on a connector into a single atomic commit.
+    Supports both `with` (from synchronous code) and `async with` (from coroutines).
+
+    Ownership of a transaction is recorded by the transaction itself, in `current_transaction`,
+    so it belongs to the thread or task which opened it (and any tasks created within it).
+    A nested transaction joins the open transaction only when the caller owns it,
+    otherwise it opens a transaction of its own.
+    Statements from callers which do not own the transaction never run within it.
+
+    A synchronous transaction holds the connection until it closes.
+    On connectors with a single connection, an asynchronous transaction may not hold the connection across awaits,
+    since the rest of the event loop would either join it or block the loop waiting for it.
+    Its writes are instead queued, and executed atomically on the query workers when it closes,
+    so they are not visible to reads within the transaction, and writes return `None` rather than a cursor.
+    Connectors with a connection pool run each asynchronous transaction on its own connection.
+    """
+    # Seconds between attempts to take the connection without blocking the event loop
+    poll_interval = 0.005
+
+    def __init__(self, connector):
+        self.connector = connector
+
+        self.outer = None  # Open transaction of the caller joined by this transaction, if any
+        self.statements = None  # Writes queued by an asynchronous transaction, as (query, values)
+        self._token = None
+
+    def __enter__(self):
+        self.outer = self.connector.caller_transaction()
+        if self.outer is None:
+            self.connector.enter_transaction(self)
+            self._token = current_transaction.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.outer is None:
+            current_transaction.reset(self._token)
+            self.connector.exit_transaction(self, exc_type)
+
+    async def __aenter__(self):
+        self.outer = self.connector.caller_transaction()
+        if self.outer is None:
+            await self.connector.enter_transaction_async(self)
+            self._token = current_transaction.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self.outer is None:
+            current_transaction.reset(self._token)
+            await self.connector.exit_transaction_async(self, exc_type)
@@ -1,4 +1,5 @@
 from .Connector import Connector
+from .Transaction import Transaction
 
 from .Interface import Interface
 from .propInterface import propInterface
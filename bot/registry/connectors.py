@@ -1,4 +1,8 @@
+import time
+import queue
+import asyncio
 import sqlite3 as sq
+from contextlib import contextmanager
 
 try:
     import mysql.connector
@@ -14,15 +18,59 @@ class mysqlConnector(Connector):
     replace_char = '%s'
     cursor_args = {"dictionary": True}
 
-    def __init__(self, **dbopts):
-        super().__init__(**dbopts)
+    # Maximum number of server-side prepared statements to hold open
+    prepared_cache_size = 256
+
+    def __init__(self, db_workers=None, commit_interval=None, commit_batch=None, prepared=False, **dbopts):
+        super().__init__(db_workers=db_workers, commit_interval=commit_interval, commit_batch=commit_batch)
 
         if not MYSQL:
             raise ImportError("No MySQL connector available in your system, please install MySQL.")
 
+        # Whether to execute queries through reusable server-side prepared cursors
+        self.prepared = prepared
+        self.prepared_cursors = {}  # query: MySQLCursorPreparedDict
+
         self.conn = mysql.connector.connect(**dbopts)
         self.conn.autocommit = True
 
+    def get_cursor(self, query):
+        """
+        Retrieve a cursor to execute the provided query with.
+        When using prepared statements, reuses the prepared cursor for this query if it exists.
+        """
+        if not self.prepared:
+            return self.conn.cursor(**self.cursor_args)
+
+        cursor = self.prepared_cursors.get(query, None)
+        if cursor is None:
+            if len(self.prepared_cursors) >= self.prepared_cache_size:
+                # Deallocate the existing statements rather than growing without bound
+                for old_cursor in self.prepared_cursors.values():
+                    old_cursor.close()
+                self.prepared_cursors.clear()
+            cursor = self.prepared_cursors[query] = self.conn.cursor(prepared=True, **self.cursor_args)
+        return cursor
+
+    def begin(self):
+        """
+        Explicitly start a transaction, since the connection otherwise autocommits.
+        """
+        if not self.conn.in_transaction:
+            self.conn.start_transaction()
+
+    def format_shard_condition(self, column, shard_count, shard_id):
+        # Avoid the `%` operator, which the connector may treat as a parameter marker
+        return "MOD({} >> 22, {}) = {}".format(column, int(shard_count), int(shard_id))
+
+    def _build_upsert(self, table, keys, values, valuedict):
+        key_str = self.format_insertkeys(keys)
+        value_str, _ = self.format_insertvalues(values)
+        update_key_str, _ = self.format_updatestr(valuedict)
+        return 'INSERT INTO {} {} VALUES {} ON DUPLICATE KEY UPDATE {}'.format(
+            table, key_str, value_str, update_key_str
+        )
+
     def upsert(self, table, constraint, cursor=None, **values):
         """
         Insert or on conflict update.
@@ -30,20 +78,225 @@ class mysqlConnector(Connector):
         """
         valuedict = values
         keys, values = zip(*values.items())
+        shape = ('UPSERT', table, keys)
 
-        key_str = self.format_insertkeys(keys)
-        value_str, values = self.format_insertvalues(values)
-        update_key_str, update_key_values = self.format_updatestr(valuedict)
-
-        cursor = cursor or self.conn.cursor(**self.cursor_args)
-        cursor.execute(
-            'INSERT INTO {} {} VALUES {} ON DUPLICATE KEY UPDATE {}'.format(
-                table, key_str, value_str, update_key_str
-            ),
-            tuple((*values, *update_key_values))
+        query = self.get_query(shape, self._build_upsert, table, keys, values, valuedict)
+        return self.execute(query, tuple((*values, *values)), cursor=cursor, write=True)
+
+    def _build_increment(self, table, column, keys):
+        key_str = self.format_insertkeys((*keys, column))
+        value_str = "({}, LAST_INSERT_ID(1))".format(", ".join(self.replace_char for key in keys))
+        return 'INSERT INTO {} {} VALUES {} ON DUPLICATE KEY UPDATE {col} = LAST_INSERT_ID({col} + 1)'.format(
+            table, key_str, value_str, col=column
         )
-        self.conn.commit()
-        return cursor
+
+    def increment(self, table, column, constraint, cursor=None, **keys):
+        """
+        Atomically increment a counter column, returning the new value.
+        Ignores the provided constraint.
+        The new value is passed back through `LAST_INSERT_ID`, so no second query is required.
+        """
+        if self.queues_writes():
+            raise ValueError("Increments return their new value, so may not be queued by an asynchronous transaction.")
+        keys, values = zip(*keys.items())
+        shape = ('INCREMENT', table, column, keys)
+
+        query = self.get_query(shape, self._build_increment, table, column, keys)
+        return self.execute(query, values, cursor=cursor, write=True).lastrowid
+
+
+class mysqlPoolConnector(mysqlConnector):
+    """
+    MySQL connector executing queries on a pool of connections,
+    so that concurrent queries from the query workers run in parallel.
+    Connections are health checked when idle and transparently reconnected when lost.
+    Group commit is not supported, since every pooled connection autocommits.
+    """
+    # Default number of pooled connections
+    pool_size = 4
+
+    # Seconds a connection may be idle before it is health checked on checkout
+    health_check_interval = 60
+
+    # Number of attempts made when reconnecting a lost connection
+    reconnect_attempts = 3
+
+    # Default seconds to wait for a free connection before failing
+    pool_timeout = 5
+
+    def __init__(self, db_workers=None, pool_size=None, pool_timeout=None, query_timeout=None,
+                 health_check_interval=None, **dbopts):
+        pool_size = pool_size or self.pool_size
+        Connector.__init__(self, db_workers=db_workers or pool_size)
+
+        if not MYSQL:
+            raise ImportError("No MySQL connector available in your system, please install MySQL.")
+
+        self.prepared = False
+        self.dbopts = dbopts
+
+        if pool_timeout is not None:
+            self.pool_timeout = pool_timeout
+
+        # Maximum execution time of each query in seconds, enforced by the server for `SELECT`s
+        self.query_timeout = query_timeout
+
+        if health_check_interval is not None:
+            self.health_check_interval = health_check_interval
+
+        # Pool of idle connections, as (connection, last_used) pairs
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put((self._connect(), time.monotonic()))
+
+        # Connections pinned to the open transactions, as transaction: connection
+        self.pinned = {}
+
+    def _connect(self):
+        """
+        Open and configure a new pooled connection.
+        """
+        conn = mysql.connector.connect(**self.dbopts)
+        self._configure(conn)
+        return conn
+
+    def _configure(self, conn):
+        """
+        Apply the session options to a new or reconnected connection.
+        """
+        conn.autocommit = True
+        if self.query_timeout:
+            cursor = conn.cursor()
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = {}".format(int(self.query_timeout * 1000)))
+            cursor.close()
+
+    def _checkout(self, blocking=True):
+        """
+        Take an idle connection from the pool, health checking and reconnecting it if required.
+        Returns None if not `blocking` and no connection is free.
+        """
+        try:
+            conn, last_used = self.pool.get(block=blocking, timeout=self.pool_timeout if blocking else None)
+        except queue.Empty:
+            if blocking:
+                raise TimeoutError("Timed out waiting for a free database connection.")
+            return None
+
+        if time.monotonic() - last_used > self.health_check_interval:
+            try:
+                conn.ping()
+            except mysql.connector.Error:
+                try:
+                    conn = self._replace(conn)
+                except Exception:
+                    # Keep the pool size, returning the broken connection to be replaced on a later checkout
+                    self.pool.put((conn, float('-inf')))
+                    raise
+        return conn
+
+    def _checkin(self, conn):
+        """
+        Return a connection to the pool.
+        """
+        self.pool.put((conn, time.monotonic()))
+
+    def _replace(self, conn):
+        """
+        Discard a broken connection and open a new one in its place.
+        """
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+        return self._connect()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager providing a connection for the caller.
+        Uses the pinned connection if the caller has an open transaction.
+        """
+        transaction = self.caller_transaction()
+        if transaction is not None:
+            yield self.pinned[transaction]
+        else:
+            conn = self._checkout()
+            try:
+                yield conn
+            finally:
+                self._checkin(conn)
+
+    def execute(self, query, values, cursor=None, write=False, fetch=False):
+        """
+        Execute a built query on a pooled connection.
+        Retries once on a fresh connection if the connection was lost outside a transaction.
+        """
+        pinned = self.caller_transaction() is not None
+        with self.connection() as conn:
+            for attempt in (0, 1):
+                try:
+                    cur = cursor or conn.cursor(**self.cursor_args)
+                    cur.execute(query, values)
+                    return cur.fetchall() if fetch else cur
+                except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+                    if attempt or cursor is not None or pinned:
+                        raise
+                    conn.reconnect(attempts=self.reconnect_attempts, delay=1)
+                    self._configure(conn)
+
+    def owns_transaction(self, transaction):
+        return transaction in self.pinned
+
+    def enter_transaction(self, transaction, blocking=True):
+        """
+        Open the given transaction, pinning a pooled connection to it.
+        Transactions of different callers run on different connections, so are isolated from each other.
+        """
+        conn = self._checkout(blocking=blocking)
+        if conn is None:
+            return False
+        try:
+            conn.start_transaction()
+        except Exception:
+            self._checkin(conn)
+            raise
+        self.pinned[transaction] = conn
+        return True
+
+    async def enter_transaction_async(self, transaction):
+        """
+        Open the given transaction without blocking the event loop, waiting for a free connection.
+        Asynchronous transactions run concurrently on their own connections.
+        """
+        while not self.enter_transaction(transaction, blocking=False):
+            await asyncio.sleep(transaction.poll_interval)
+
+    async def exit_transaction_async(self, transaction, exc_type=None):
+        self.exit_transaction(transaction, exc_type)
+
+    def exit_transaction(self, transaction, exc_type=None):
+        """
+        Close the given transaction, committing or rolling back and unpinning its connection.
+        """
+        conn = self.pinned.pop(transaction)
+        try:
+            if exc_type is None:
+                conn.commit()
+            else:
+                conn.rollback()
+        finally:
+            self._checkin(conn)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """
+        Shut down the query workers and close every pooled connection.
+        """
+        self.executor.shutdown(wait=True)
+        while not self.pool.empty():
+            self.pool.get_nowait()[0].close()
 
 
 class sqliteConnector(Connector):
@@ -51,12 +304,88 @@ class sqliteConnector(Connector):
     replace_char = '?'
     timeout = 20
 
-    def __init__(self, **dbopts):
-        super().__init__(**dbopts)
+    def __init__(self, db_workers=None, commit_interval=None, commit_batch=None,
+                 journal_mode=None, synchronous=None, mmap_size=None, cache_size=None, read_connections=0,
+                 **dbopts):
+        super().__init__(db_workers=db_workers, commit_interval=commit_interval, commit_batch=commit_batch)
+
+        self.data_file = dbopts.get("db_file")
+        self.timeout = dbopts.get("timeout", self.timeout)
+
+        # Connection tuning, applied to every connection
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+
+        # Writer connection, also used for reads within transactions or with pending writes
+        self.conn = self._connect(self.data_file)
+        if journal_mode:
+            self.conn.execute("PRAGMA journal_mode={}".format(journal_mode))
+        if synchronous:
+            self.conn.execute("PRAGMA synchronous={}".format(synchronous))
+
+        # Pool of read-only connections for concurrent reads, not supported for in-memory databases
+        self.read_pool = None
+        if read_connections and self.data_file != ':memory:':
+            self.read_pool = queue.Queue()
+            for _ in range(read_connections):
+                reader = self._connect("file:{}?mode=ro".format(self.data_file), uri=True)
+                reader.execute("PRAGMA query_only=ON")
+                self.read_pool.put(reader)
 
-        data_file = dbopts.get("db_file")
-        self.conn = sq.connect(data_file, timeout=dbopts.get("timeout", self.timeout))
-        self.conn.row_factory = sq.Row
+    def _connect(self, database, **kwargs):
+        """
+        Open and tune a new connection to the database.
+        """
+        conn = sq.connect(
+            database,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.query_cache_size,
+            **kwargs
+        )
+        conn.row_factory = sq.Row
+        if self.mmap_size is not None:
+            conn.execute("PRAGMA mmap_size={}".format(int(self.mmap_size)))
+        if self.cache_size is not None:
+            conn.execute("PRAGMA cache_size={}".format(int(self.cache_size)))
+        return conn
+
+    def close(self):
+        """
+        Close the writer and read connections.
+        """
+        super().close()
+        if self.read_pool is not None:
+            while not self.read_pool.empty():
+                self.read_pool.get_nowait().close()
+
+    def execute(self, query, values, cursor=None, write=False, fetch=False):
+        """
+        Execute a built query.
+        Reads use a pooled read connection when available,
+        unless the caller has an open transaction or there are uncommitted writes to read.
+        """
+        if (write
+                or not fetch
+                or cursor is not None
+                or self.read_pool is None
+                or self.pending_writes
+                or self.caller_transaction() is not None):
+            return super().execute(query, values, cursor=cursor, write=write, fetch=fetch)
+
+        reader = self.read_pool.get()
+        try:
+            return reader.execute(query, values).fetchall()
+        finally:
+            self.read_pool.put(reader)
+
+    def _build_upsert(self, table, constraint, keys, values, valuedict):
+        key_str = self.format_insertkeys(keys)
+        value_str, _ = self.format_insertvalues(values)
+        update_key_str, _ = self.format_updatestr(valuedict)
+        return 'INSERT INTO {} {} VALUES {} ON CONFLICT({}) DO UPDATE SET {}'.format(
+            table, key_str, value_str, constraint, update_key_str
+        )
 
     def upsert(self, table, constraint, cursor=None, **values):
         """
@@ -65,27 +394,53 @@ class sqliteConnector(Connector):
         valuedict = values
         keys, values = zip(*values.items())
 
-        key_str = self.format_insertkeys(keys)
-        value_str, values = self.format_insertvalues(values)
-        update_key_str, update_key_values = self.format_updatestr(valuedict)
+        if not isinstance(constraint, str):
+            constraint = ", ".join(constraint)
+
+        shape = ('UPSERT', table, constraint, keys)
+
+        query = self.get_query(shape, self._build_upsert, table, constraint, keys, values, valuedict)
+        return self.execute(query, tuple((*values, *values)), cursor=cursor, write=True)
+
+    def _build_increment(self, table, column, constraint, keys):
+        key_str = self.format_insertkeys((*keys, column))
+        value_str = "({}, 1)".format(", ".join(self.replace_char for key in keys))
+        return 'INSERT INTO {} {} VALUES {} ON CONFLICT({}) DO UPDATE SET {col} = {col} + 1'.format(
+            table, key_str, value_str, constraint, col=column
+        )
+
+    def increment(self, table, column, constraint, cursor=None, **keys):
+        """
+        Atomically increment a counter column, returning the new value.
+        The value is read back on the writer connection while holding the lock,
+        so no other write may intervene.
+        """
+        if self.queues_writes():
+            raise ValueError("Increments return their new value, so may not be queued by an asynchronous transaction.")
+        keys, values = zip(*keys.items())
 
         if not isinstance(constraint, str):
             constraint = ", ".join(constraint)
 
-        cursor = cursor or self.conn.cursor(**self.cursor_args)
-        cursor.execute(
-            'INSERT INTO {} {} VALUES {} ON CONFLICT({}) DO UPDATE SET {}'.format(
-                table, key_str, value_str, constraint, update_key_str
-            ),
-            tuple((*values, *update_key_values))
+        shape = ('INCREMENT', table, column, constraint, keys)
+        query = self.get_query(shape, self._build_increment, table, column, constraint, keys)
+
+        select_shape, _ = self.format_condition_shape(dict(zip(keys, values)))
+        select_shape = ('SELECT', table, (column,), select_shape)
+        select_query = self.get_query(
+            select_shape, self._build_select, table, (column,), dict(zip(keys, values))
         )
-        self.conn.commit()
-        return cursor
+
+        with self.lock:
+            self.execute(query, values, cursor=cursor, write=True)
+            row = super().execute(select_query, values, fetch=True)[0]
+        return row[column]
 
     def create_database(self):
         """
         Create the database from the schema.
         This will of course only work once.
         """
-        self.conn.executescript(self.get_schema())
-        self.conn.commit()
+        with self.lock:
+            self.conn.executescript(self.get_schema())
+            self.conn.commit()
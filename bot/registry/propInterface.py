@@ -223,3 +223,34 @@ class propInterface(Interface):
         Pass-through interface to `self.conn.select_where`.
         """
         return self.conn.select_where(self.table, **kwargs)
+
+    # Awaitable variants
+    async def get_async(self, *args):
+        """
+        Awaitable variant of `get`.
+        """
+        return await self.conn.run_async(self.get, *args)
+
+    async def set_async(self, *args):
+        """
+        Awaitable variant of `set`.
+        """
+        return await self.conn.run_async(self.set, *args)
+
+    async def unset_async(self, *args):
+        """
+        Awaitable variant of `unset`.
+        """
+        return await self.conn.run_async(self.unset, *args)
+
+    async def get_all_with_async(self, prop):
+        """
+        Awaitable variant of `get_all_with`.
+        """
+        return await self.conn.run_async(self.get_all_with, prop)
+
+    async def select_where_async(self, **kwargs):
+        """
+        Awaitable variant of `select_where`.
+        """
+        return await self.conn.select_where_async(self.table, **kwargs)
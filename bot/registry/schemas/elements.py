@@ -132,14 +132,16 @@ class ForeignKey(tableElement):
 
 
 class Index(tableElement):
-    def __init__(self, name, *keys):
+    def __init__(self, name, *keys, unique=False):
         super().__init__()
         self.name = name
         self.keys = keys
+        self.unique = unique
 
     @property
     def for_mysql(self):
-        return "CREATE INDEX {} ON {}({});".format(
+        return "CREATE {}INDEX {} ON {}({});".format(
+            "UNIQUE " if self.unique else "",
             self.name,
             self.table,
             ','.join(self.keys)
@@ -147,7 +149,8 @@ class Index(tableElement):
 
     @property
     def for_sqlite(self):
-        return "CREATE INDEX {} ON {}({});".format(
+        return "CREATE {}INDEX {} ON {}({});".format(
+            "UNIQUE " if self.unique else "",
             self.name,
             self.table,
             ','.join(self.keys)
@@ -83,6 +83,17 @@ class tableInterface(Interface):
         self.add_app(conditions)
         return self.conn.select_where(self.table, select_columns=select_columns, **conditions)
 
+    def select_shard(self, shard_count, shard_id, shard_column='guildid', select_columns=None, **conditions):
+        """
+        Select the rows matching the conditions, for which the snowflake `shard_column` belongs to the given shard.
+        """
+        self.check_keys(conditions)
+        self.add_app(conditions)
+        return self.conn.select_shard(
+            self.table, shard_count or 1, shard_id or 0,
+            shard_column=shard_column, select_columns=select_columns, **conditions
+        )
+
     def select_one_where(self, *args, **kwargs):
         rows = self.select_where(*args, **kwargs)
         return rows[0] if rows else None
@@ -129,3 +140,52 @@ class tableInterface(Interface):
                 constraint = (*constraint, self.app_column)
 
         return self.conn.upsert(self.table, constraint, **values)
+
+    def increment(self, column, constraint, add_app_constraint=True, **keys):
+        """
+        Atomically increment the integer `column` of the row with the given `keys`, returning the new value.
+        """
+        self.check_keys(keys)
+        self.add_app(keys)
+        if add_app_constraint and not self.shared and self.app_column_primary:
+            if isinstance(constraint, str):
+                constraint = (constraint, self.app_column)
+            else:
+                constraint = (*constraint, self.app_column)
+
+        return self.conn.increment(self.table, column, constraint, **keys)
+
+    # Awaitable variants
+    async def select_where_async(self, select_columns=None, **conditions):
+        return await self.conn.run_async(self.select_where, select_columns=select_columns, **conditions)
+
+    async def select_shard_async(self, shard_count, shard_id, shard_column='guildid', select_columns=None,
+                                 **conditions):
+        return await self.conn.run_async(
+            self.select_shard, shard_count, shard_id,
+            shard_column=shard_column, select_columns=select_columns, **conditions
+        )
+
+    async def select_one_where_async(self, *args, **kwargs):
+        rows = await self.select_where_async(*args, **kwargs)
+        return rows[0] if rows else None
+
+    async def update_where_async(self, valuedict, **conditions):
+        return await self.conn.run_async(self.update_where, valuedict, **conditions)
+
+    async def delete_where_async(self, **conditions):
+        return await self.conn.run_async(self.delete_where, **conditions)
+
+    async def insert_async(self, allow_replace=False, **values):
+        return await self.conn.run_async(self.insert, allow_replace=allow_replace, **values)
+
+    async def insert_many_async(self, *value_tuples, insert_keys=None):
+        return await self.conn.run_async(self.insert_many, *value_tuples, insert_keys=insert_keys)
+
+    async def upsert_async(self, constraint, add_app_constraint=True, **values):
+        return await self.conn.run_async(self.upsert, constraint, add_app_constraint=add_app_constraint, **values)
+
+    async def increment_async(self, column, constraint, add_app_constraint=True, **keys):
+        return await self.conn.run_async(
+            self.increment, column, constraint, add_app_constraint=add_app_constraint, **keys
+        )
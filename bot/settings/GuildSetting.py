@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, List
 import discord
 
 from cmdClient import cmdClient, Context
@@ -6,6 +6,8 @@ from cmdClient.Check import Check
 
 from utils.lib import prop_tabulate
 
+from .config import guild_config
+
 
 class GuildSetting:
     """
@@ -19,6 +21,10 @@ class GuildSetting:
     attr_name: str = None  # Internal name for the setting
     _default: Any = None  # Default data value for the setting.. this may be None if the setting overrides 'default'.
 
+    # Whether the setting data may be stored in the client guild setting cache.
+    # Settings which already read from memory, or are written outside `write`, should disable this.
+    _cacheable: bool = True
+
     # Read and write checks.
     # These are not guaranteed to be checked internally, and should be handled by the caller
     read_check: Check = None  # Check that needs to be passed to read the setting
@@ -77,7 +83,31 @@ class GuildSetting:
         """
         Return a setting instance initialised from the stored value.
         """
-        data = cls._reader(client, guildid, **kwargs)
+        cache = cls._get_cache(client) if not kwargs else None
+        if cache is None:
+            data = cls._reader(client, guildid, **kwargs)
+        else:
+            data = cache.get(cls.attr_name, guildid)
+            if data is cache.missing:
+                version = cache.version
+                data = cls._reader(client, guildid)
+                cache.set(cls.attr_name, guildid, data, version=version)
+        return cls(client, guildid, data, **kwargs)
+
+    @classmethod
+    async def fetch(cls, client: cmdClient, guildid: int, **kwargs):
+        """
+        Awaitable variant of `get`, which reads the stored value without blocking the event loop.
+        """
+        cache = cls._get_cache(client) if not kwargs else None
+        if cache is None:
+            data = await client.data.run_async(cls._reader, client, guildid, **kwargs)
+        else:
+            data = cache.get(cls.attr_name, guildid)
+            if data is cache.missing:
+                version = cache.version
+                data = await client.data.run_async(cls._reader, client, guildid)
+                cache.set(cls.attr_name, guildid, data, version=version)
         return cls(client, guildid, data, **kwargs)
 
     @classmethod
@@ -141,6 +171,8 @@ class GuildSetting:
         ensure you handle deletion of values when internal data is None.
         """
         self._writer(self.client, self.guildid, self._data, **kwargs)
+        self._invalidate_cache(self.client, self.guildid)
+        self._publish_invalidation(self.client, self.guildid)
 
     # Raw converters
     @classmethod
@@ -195,6 +227,50 @@ class GuildSetting:
         """
         raise NotImplementedError
 
+    @classmethod
+    def _bulk_reader(cls, client: cmdClient, guildids: List[int], **kwargs):
+        """
+        Read the setting for each of the provided guilds from storage.
+        Returns a dictionary of setting data indexed by guildid, where missing guilds have data None.
+        May be overriden by the setting to support preloading the setting cache.
+        """
+        raise NotImplementedError
+
+    # Setting cache methods
+    @classmethod
+    def _get_cache(cls, client: cmdClient):
+        """
+        Retrieve the client guild setting cache, if the setting is cacheable and the cache exists.
+        """
+        return client.objects.get("guild_setting_cache", None) if cls._cacheable else None
+
+    @classmethod
+    def _invalidate_cache(cls, client: cmdClient, guildid: int):
+        """
+        Invalidate the cached data for this setting in the given guild.
+        Settings may share storage (and a write may delete a shared row),
+        so the cached data of settings using the same table are also invalidated.
+        """
+        cache = client.objects.get("guild_setting_cache", None)
+        if cache is not None:
+            attr_names = {cls.attr_name}
+            table_name = getattr(cls, '_table_interface_name', None)
+            if table_name is not None:
+                attr_names.update(
+                    setting.attr_name for setting in guild_config.settings.values()
+                    if getattr(setting, '_table_interface_name', None) == table_name
+                )
+            cache.invalidate(guildid, *attr_names)
+
+    @classmethod
+    def _publish_invalidation(cls, client: cmdClient, guildid: int):
+        """
+        Notify the other shards that this setting was written in the given guild, if the invalidation bus exists.
+        """
+        bus = client.objects.get("invalidation_bus", None)
+        if bus is not None:
+            bus.publish("guild_settings", guildid=guildid, attr=cls.attr_name)
+
     # Helper methods for external use
     @classmethod
     def initialise(cls, client: cmdClient, **kwargs):
@@ -1,4 +1,5 @@
 from .config import guild_config
+from .cache import SettingCache
 from . import ctx_guildsetting
 from .errors import BadUserInput
 from .GuildSetting import GuildSetting
@@ -0,0 +1,104 @@
+import threading
+
+from cachetools import LRUCache
+
+from .config import guild_config
+
+
+class SettingCache:
+    """
+    Per-shard cache of guild setting data, keyed by `(attr_name, guildid)`.
+    Stores the raw setting data as returned by the setting `_reader`,
+    so that reading a cached setting requires no database access.
+
+    Parameters
+    ----------
+    maxsize: Optional[int]
+        Maximum number of cached entries, after which the least recently used entries are evicted.
+        If not provided, the cache is unbounded.
+    """
+    # Sentinel marking a missing cache entry, since `None` is valid setting data
+    missing = object()
+
+    # Number of guildids to request in each bulk query when preloading
+    preload_chunk = 500
+
+    def __init__(self, maxsize=None):
+        self._data = LRUCache(maxsize) if maxsize else {}
+        self._lock = threading.Lock()
+
+        # Incremented on every invalidation, used to discard reads which raced a write
+        self.version = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, attr_name, guildid):
+        """
+        Retrieve the cached data for the given setting and guild, or `missing` if it isn't cached.
+        """
+        with self._lock:
+            data = self._data.get((attr_name, guildid), self.missing)
+
+        if data is self.missing:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def set(self, attr_name, guildid, data, version=None):
+        """
+        Cache the data for the given setting and guild.
+        If `version` is provided and the cache has been invalidated since, the data is discarded.
+        """
+        with self._lock:
+            if version is None or version == self.version:
+                self._data[(attr_name, guildid)] = data
+
+    def invalidate(self, guildid, *attr_names):
+        """
+        Remove the cached data for the given guild and settings.
+        """
+        with self._lock:
+            self.version += 1
+            for attr_name in attr_names:
+                self._data.pop((attr_name, guildid), None)
+
+    def clear(self):
+        """
+        Remove all cached data.
+        """
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+
+    def preload(self, client, guildids):
+        """
+        Bulk load the data for every cacheable setting in the given guilds.
+        Settings which do not support bulk reading are skipped, and will be cached on first read.
+        This is blocking, and should be run through `client.data.run_async` from the event loop.
+        Returns the number of settings preloaded.
+        """
+        guildids = list(guildids)
+        count = 0
+        for setting in list(guild_config.settings.values()):
+            if not setting._cacheable:
+                continue
+
+            for i in range(0, len(guildids), self.preload_chunk):
+                chunk = guildids[i:i + self.preload_chunk]
+                version = self.version
+                try:
+                    bulk_data = setting._bulk_reader(client, chunk)
+                except NotImplementedError:
+                    break
+
+                for guildid in chunk:
+                    self.set(setting.attr_name, guildid, bulk_data.get(guildid, None), version=version)
+            else:
+                count += 1
+        return count
@@ -40,6 +40,14 @@ class _tableData:
         """
         raise NotImplementedError
 
+    @classmethod
+    def _bulk_reader(cls, client: cmdClient, guildids: List[int], **kwargs):
+        """
+        Read the setting for each of the provided guilds from storage.
+        Returns a dictionary of setting data indexed by guildid.
+        """
+        raise NotImplementedError
+
 
 class ListData(_tableData):
     """
@@ -60,6 +68,21 @@ class ListData(_tableData):
         data_rows = [row[cls._data_column] for row in rows]
         return data_rows if data_rows else None
 
+    @classmethod
+    def _bulk_reader(cls, client: cmdClient, guildids: List[int], **kwargs):
+        """
+        Read in all entries associated to each of the guilds.
+        """
+        table = cls._get_table_interface(client)  # type: tableInterface
+        params = {
+            "select_columns": [cls._guildid_column, cls._data_column],
+            cls._guildid_column: guildids
+        }
+        data = {}
+        for row in table.select_where(**params):
+            data.setdefault(row[cls._guildid_column], []).append(row[cls._data_column])
+        return data
+
     @classmethod
     def _writer(cls, client: cmdClient, guildid: int, data: List[Any], **kwargs):
         """
@@ -67,7 +90,6 @@ class ListData(_tableData):
         """
         # TODO: Accept kwargs for pure addition or removal of items
         # TODO: Compare existing values in table to avoid double-handling data
-        # TODO: Transaction lock on the table so this is atomic
 
         table = cls._get_table_interface(client)  # type: tableInterface
 
@@ -79,27 +101,29 @@ class ListData(_tableData):
             table.delete_where(**params)
             return
 
-        current = cls._reader(client, guildid, **kwargs)
-        if current is not None:
-            to_insert = [item for item in data if item not in current]
-            to_remove = [item for item in current if item not in data]
-        else:
-            to_insert = data
-            to_remove = None
-
-        # Handle required deletions
-        if to_remove:
-            params = {
-                cls._guildid_column: guildid,
-                cls._data_column: to_remove
-            }
-            table.delete_where(**params)
-
-        # Handle required insertions
-        if to_insert:
-            columns = (cls._guildid_column, cls._data_column)
-            values = [(guildid, value) for value in to_insert]
-            table.insert_many(*values, insert_keys=columns)
+        # Read and write in a single transaction so the update is atomic
+        with client.data.transaction():
+            current = cls._reader(client, guildid, **kwargs)
+            if current is not None:
+                to_insert = [item for item in data if item not in current]
+                to_remove = [item for item in current if item not in data]
+            else:
+                to_insert = data
+                to_remove = None
+
+            # Handle required deletions
+            if to_remove:
+                params = {
+                    cls._guildid_column: guildid,
+                    cls._data_column: to_remove
+                }
+                table.delete_where(**params)
+
+            # Handle required insertions
+            if to_insert:
+                columns = (cls._guildid_column, cls._data_column)
+                values = [(guildid, value) for value in to_insert]
+                table.insert_many(*values, insert_keys=columns)
 
 
 class ColumnData(_tableData):
@@ -126,6 +150,18 @@ class ColumnData(_tableData):
         rows = table.select_where(**params)
         return rows[0][cls._data_column] if rows else None
 
+    @classmethod
+    def _bulk_reader(cls, client: cmdClient, guildids: List[int], **kwargs):
+        """
+        Read in the requested entry associated to each of the guilds.
+        """
+        table = cls._get_table_interface(client)  # type: tableInterface
+        params = {
+            "select_columns": [cls._guildid_column, cls._data_column],
+            cls._guildid_column: guildids
+        }
+        return {row[cls._guildid_column]: row[cls._data_column] for row in table.select_where(**params)}
+
     @classmethod
     def _writer(cls, client: cmdClient, guildid: int, data: Any, **kwargs):
         """
@@ -165,6 +201,19 @@ class BoolData(_tableData):
         rows = table.select_where(**params)
         return len(rows) > 0
 
+    @classmethod
+    def _bulk_reader(cls, client: cmdClient, guildids: List[int], **kwargs):
+        """
+        Read the table and return whether each of the specified guildids exist.
+        """
+        table = cls._get_table_interface(client)  # type: tableInterface
+        params = {
+            "select_columns": [cls._guildid_column],
+            cls._guildid_column: guildids
+        }
+        present = set(row[cls._guildid_column] for row in table.select_where(**params))
+        return {guildid: guildid in present for guildid in guildids}
+
     @classmethod
     def _writer(cls, client: cmdClient, guildid: int, data: bool, **kwargs):
         """
@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import iso8601
 import re
@@ -384,3 +385,83 @@ def jumpto(guildid: int, channeldid: int, messageid: int):
         channeldid,
         messageid
     )
+
+
+# Maximum number of messages deleted by each request to the bulk-delete endpoint
+bulk_delete_limit = 100
+
+# Maximum message age accepted by the bulk-delete endpoint, with a safety margin
+bulk_delete_max_age = datetime.timedelta(days=14, minutes=-5)
+
+
+async def bulk_delete(channel, messageids, concurrency=2, on_deleted=None):
+    """
+    Delete messages from a channel by id.
+    Uses the bulk-delete endpoint in chunks of up to `bulk_delete_limit` messages,
+    falling back to single deletes for messages too old to bulk-delete.
+    Runs up to `concurrency` requests at once, leaving the rate limiting to the library.
+
+    Parameters
+    ----------
+    channel: discord.abc.Messageable
+        The channel (or thread) to delete the messages from.
+    messageids: List[int]
+        The ids of the messages to delete.
+        Messages which no longer exist are ignored.
+    concurrency: int
+        The maximum number of concurrent delete requests.
+    on_deleted: Optional[Callable[[int], Any]]
+        Called with the number of messages deleted after each successful request, e.g. for progress reporting.
+
+    Returns: int
+        The number of messages deleted.
+
+    Raises
+    ------
+    discord.Forbidden
+        If we do not have permission to delete the messages.
+    """
+    cutoff = discord.utils.time_snowflake(discord.utils.utcnow() - bulk_delete_max_age)
+    recent = [messageid for messageid in messageids if messageid > cutoff]
+    singles = [messageid for messageid in messageids if messageid <= cutoff]
+
+    chunks = [recent[i:i+bulk_delete_limit] for i in range(0, len(recent), bulk_delete_limit)]
+    if chunks and len(chunks[-1]) == 1:
+        # The bulk-delete endpoint requires at least two messages
+        singles.extend(chunks.pop())
+
+    semaphore = asyncio.Semaphore(concurrency)
+    deleted = 0
+
+    def record(count):
+        nonlocal deleted
+        deleted += count
+        if on_deleted is not None:
+            on_deleted(count)
+
+    async def delete_single(messageid):
+        async with semaphore:
+            try:
+                await channel.get_partial_message(messageid).delete()
+                record(1)
+            except discord.NotFound:
+                pass
+
+    async def delete_chunk(chunk):
+        async with semaphore:
+            try:
+                await channel.delete_messages([discord.Object(id=messageid) for messageid in chunk])
+                record(len(chunk))
+                return
+            except discord.Forbidden:
+                raise
+            except discord.HTTPException:
+                # E.g. some of the messages were already deleted
+                pass
+        await asyncio.gather(*(delete_single(messageid) for messageid in chunk))
+
+    await asyncio.gather(
+        *(delete_chunk(chunk) for chunk in chunks),
+        *(delete_single(messageid) for messageid in singles)
+    )
+    return deleted
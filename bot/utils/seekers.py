@@ -1,4 +1,6 @@
 import asyncio
+from collections import OrderedDict
+
 import discord
 from cmdClient import Context
 from cmdClient.lib import InvalidContext, UserCancelled, ResponseTimedOut, SafeCancellation
@@ -358,11 +360,55 @@ async def find_member(ctx, userstr, interactive=False, collection=None, collecti
     return member
 
 
+class RecentMessageIndex:
+    """
+    Bounded index of the channels of the most recently seen messages,
+    fed from the gateway message events once attached.
+    """
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+
+        self._channels = OrderedDict()  # messageid: channelid, oldest first
+        self._attached = False
+
+    def __len__(self):
+        return len(self._channels)
+
+    def attach(self, client):
+        if not self._attached:
+            client.add_after_event('message', self._add_message)
+            self._attached = True
+
+    async def _add_message(self, client, message):
+        if message.guild:
+            self.add(message.id, message.channel.id)
+
+    def add(self, messageid, channelid):
+        self._channels[messageid] = channelid
+        if len(self._channels) > self.maxsize:
+            self._channels.popitem(last=False)
+
+    def get(self, messageid):
+        return self._channels.get(messageid, None)
+
+
+recent_messages = RecentMessageIndex()
+
+# Maximum number of concurrent message fetches in a single search.
+# Message fetches are rate limited per channel, so this only bounds the share of the global rate limit used.
+find_message_concurrency = 5
+
+
 @Context.util
 async def find_message(ctx, msgid, chlist=None, ignore=[]):
     """
     Searches for the given message id in the guild channels.
 
+    Channels created after the message, or whose last message is older than the message, are skipped.
+    If the message was recently seen by the `recent_messages` index, its channel is searched first.
+    The remaining channels are searched concurrently, most recently active first,
+    returning as soon as the message is found.
+
     Parameters
     -------
     msgid: int
@@ -388,31 +434,51 @@ async def find_message(ctx, msgid, chlist=None, ignore=[]):
     if chlist is None:
         chlist = [ch for ch in ctx.guild.text_channels if ch.permissions_for(ctx.author).read_messages]
 
-    # Remove any channels we are ignoring
-    chlist = [ch for ch in chlist if ch.id not in ignore]
+    # Remove any channels we are ignoring, or which cannot contain the message
+    chlist = [ch for ch in chlist if ch.id not in ignore and _may_contain(ch, msgid)]
 
-    tasks = set()
+    # Check the channel the message was recently seen in
+    channelid = recent_messages.get(msgid)
+    if channelid is not None:
+        channel = next((ch for ch in chlist if ch.id == channelid), None)
+        if channel is not None:
+            message = await _search_in_channel(channel, msgid)
+            if message is not None:
+                return message
+            chlist.remove(channel)
 
-    i = 0
-    while True:
-        done = set((task for task in tasks if task.done()))
-        tasks = tasks.difference(done)
+    # Search the most recently active channels first
+    chlist.sort(key=lambda ch: ch.last_message_id or 0, reverse=True)
 
-        results = [task.result() for task in done]
+    semaphore = asyncio.Semaphore(find_message_concurrency)
 
-        result = next((result for result in results if result is not None), None)
-        if result:
-            [task.cancel() for task in tasks]
-            return result
+    async def search(channel):
+        async with semaphore:
+            return await _search_in_channel(channel, msgid)
+
+    tasks = set(asyncio.create_task(search(ch)) for ch in chlist)
+    try:
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            result = next((task.result() for task in done if task.result() is not None), None)
+            if result is not None:
+                return result
+    finally:
+        [task.cancel() for task in tasks]
+    return None
 
-        if i < len(chlist):
-            task = asyncio.create_task(_search_in_channel(chlist[i], msgid))
-            tasks.add(task)
-            i += 1
-        elif len(tasks) == 0:
-            return None
 
-        await asyncio.sleep(0.25)
+def _may_contain(channel, msgid: int):
+    """
+    Whether the snowflakes of the channel and its last message allow it to contain the given message.
+    """
+    if channel.id > msgid:
+        # Channel was created after the message
+        return False
+    if channel.last_message_id is not None and channel.last_message_id < msgid:
+        # Last message in the channel is older than the message
+        return False
+    return True
 
 
 async def _search_in_channel(channel: discord.TextChannel, msgid: int):
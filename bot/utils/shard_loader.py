@@ -0,0 +1,99 @@
+import asyncio
+
+"""
+Shard scoped loading of the per-guild caches built from guild keyed tables.
+
+On initialisation, each cache is loaded with a single query selecting only the rows of the guilds on this shard,
+so startup time and memory scale with the share of guilds on the shard.
+Afterwards, the cached rows of a guild are reloaded when the guild is joined,
+or becomes available again after an outage.
+"""
+
+
+class GuildCacheLoader:
+    """
+    Loader for a per-guild cache stored in `client.objects`.
+
+    Parameters
+    ----------
+    object_name: str
+        The name of the cache in `client.objects`, a dictionary keyed by guildid.
+    interface_name: str
+        The name of the data interface of the table to load from.
+        The table must have a `guildid` column.
+    build: Callable[[List[Row]], Dict[int, Any]]
+        Builds the cache entries from the given table rows, as a dictionary keyed by guildid.
+    """
+    # All created loaders, reloaded together on guild events
+    loaders = []
+
+    # Seconds to gather guild events before reloading the guilds together
+    gather_delay = 1
+
+    _attached = False
+    _pending = set()  # Guildids waiting to be reloaded
+    _reload_task = None
+
+    def __init__(self, object_name, interface_name, build):
+        self.object_name = object_name
+        self.interface_name = interface_name
+        self.build = build
+
+        self.loaders.append(self)
+
+    def load(self, client):
+        """
+        Load the cache for the guilds on this shard, returning the number of rows read.
+        """
+        rows = client.data.interfaces[self.interface_name].select_shard(client.shard_count, client.shard_id)
+        client.objects[self.object_name] = self.build(rows)
+
+        if not GuildCacheLoader._attached:
+            client.add_after_event('guild_join', _reload_guild)
+            client.add_after_event('guild_available', _reload_available_guild)
+            GuildCacheLoader._attached = True
+        return len(rows)
+
+    def reload(self, client, guildids):
+        """
+        Replace the cache entries of the given guilds with freshly loaded entries.
+        """
+        rows = client.data.interfaces[self.interface_name].select_where(guildid=list(guildids))
+        entries = self.build(rows)
+
+        cache = client.objects[self.object_name]
+        for guildid in guildids:
+            cache.pop(guildid, None)
+        cache.update(entries)
+
+    @classmethod
+    def request_reload(cls, client, guildid):
+        """
+        Schedule the caches of the given guild to be reloaded, along with any other guilds requested meanwhile.
+        """
+        cls._pending.add(guildid)
+        if cls._reload_task is None:
+            cls._reload_task = asyncio.create_task(cls._reload_pending(client))
+
+    @classmethod
+    async def _reload_pending(cls, client):
+        try:
+            await asyncio.sleep(cls.gather_delay)
+            guildids, cls._pending = cls._pending, set()
+            for loader in cls.loaders:
+                if loader.object_name in client.objects:
+                    await client.data.run_async(loader.reload, client, guildids)
+        finally:
+            cls._reload_task = None
+            if cls._pending:
+                cls._reload_task = asyncio.create_task(cls._reload_pending(client))
+
+
+async def _reload_guild(client, guild):
+    GuildCacheLoader.request_reload(client, guild.id)
+
+
+async def _reload_available_guild(client, guild):
+    # Guilds becoming available during the initial connection were loaded on initialisation
+    if client.is_ready():
+        GuildCacheLoader.request_reload(client, guild.id)
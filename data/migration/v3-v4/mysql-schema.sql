@@ -0,0 +1,102 @@
+INSERT INTO VERSION (version, updated_by) VALUES (4, 'v3-v4 Migration');
+
+
+ALTER TABLE guild_moderation_tickets ADD COLUMN ticketgid INT AFTER guildid;
+
+UPDATE
+    guild_moderation_tickets t
+JOIN (
+    SELECT
+        ticketid,
+        row_number() OVER (PARTITION BY guildid ORDER BY ticketid) AS ticketgid
+    FROM
+        guild_moderation_tickets
+) numbered ON t.ticketid = numbered.ticketid
+SET t.ticketgid = numbered.ticketgid;
+
+ALTER TABLE guild_moderation_tickets MODIFY ticketgid INT NOT NULL;
+
+CREATE UNIQUE INDEX guild_moderation_tickets_guild_ticketgid ON guild_moderation_tickets(guildid,ticketgid);
+CREATE INDEX guild_moderation_ticket_members_memberid ON guild_moderation_ticket_members(memberid);
+
+
+CREATE TABLE guild_moderation_ticket_counters(
+	guildid BIGINT NOT NULL,
+	last_ticketgid INT NOT NULL,
+	PRIMARY KEY (guildid)
+);
+
+INSERT INTO guild_moderation_ticket_counters
+    (guildid, last_ticketgid)
+SELECT
+    guildid,
+    MAX(ticketgid)
+FROM
+    guild_moderation_tickets
+GROUP BY guildid;
+
+
+DROP VIEW guild_moderation_tickets_combined;
+
+CREATE VIEW
+    guild_moderation_tickets_combined
+AS
+SELECT
+    t.ticketid AS ticketid,
+    t.ticket_type AS ticket_type,
+    t.guildid AS guildid,
+    t.ticketgid AS ticketgid,
+    t.modid AS modid,
+    t.agentid AS agentid,
+    t.app AS app,
+    t.msgid AS msgid,
+    t.auditid AS auditid,
+    t.reason AS reason,
+    t.created_at AS created_at,
+    timedmutes.duration AS tmute_duration,
+    timedmutes.roleid AS tmute_roleid,
+    timedmutes.unmute_timestamp AS tmute_unmute_timestamp
+FROM
+    guild_moderation_tickets t
+LEFT JOIN guild_timed_mute_tickets timedmutes ON t.ticketid = timedmutes.ticketid;
+
+
+CREATE TABLE scheduled_actions(
+	actionid INT AUTO_INCREMENT ,
+	app VARCHAR(64) NOT NULL,
+	action_type VARCHAR(64) NOT NULL,
+	guildid BIGINT NOT NULL,
+	targetid BIGINT,
+	due_at INT NOT NULL,
+	payload TEXT,
+	PRIMARY KEY (actionid)
+);
+CREATE INDEX scheduled_actions_guildid ON scheduled_actions(app,guildid);
+CREATE INDEX scheduled_actions_targetid ON scheduled_actions(action_type,targetid);
+
+INSERT INTO scheduled_actions
+    (app, action_type, guildid, targetid, due_at)
+SELECT DISTINCT
+    t.app,
+    'timed_unmute',
+    t.guildid,
+    t.ticketid,
+    timedmutes.unmute_timestamp
+FROM
+    guild_timed_mute_members members
+JOIN guild_moderation_tickets t ON members.ticketid = t.ticketid
+JOIN guild_timed_mute_tickets timedmutes ON members.ticketid = timedmutes.ticketid;
+
+
+CREATE TABLE cache_invalidations(
+	invalidationid INT AUTO_INCREMENT ,
+	app VARCHAR(64) NOT NULL,
+	shard INT NOT NULL,
+	cache VARCHAR(64) NOT NULL,
+	guildid BIGINT NOT NULL,
+	targetid BIGINT,
+	attr VARCHAR(64),
+	created_at INT NOT NULL,
+	PRIMARY KEY (invalidationid)
+);
+CREATE INDEX cache_invalidations_created_at ON cache_invalidations(created_at);
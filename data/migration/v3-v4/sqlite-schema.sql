@@ -0,0 +1,108 @@
+INSERT INTO VERSION (version, updated_by) VALUES (4, 'v3-v4 Migration');
+
+
+ALTER TABLE guild_moderation_tickets ADD COLUMN ticketgid INTEGER;
+
+CREATE TEMPORARY TABLE numbered_tickets(
+	ticketid INTEGER PRIMARY KEY,
+	ticketgid INTEGER NOT NULL
+);
+
+INSERT INTO numbered_tickets
+    (ticketid, ticketgid)
+SELECT
+    ticketid,
+    row_number() OVER (PARTITION BY guildid ORDER BY ticketid)
+FROM
+    guild_moderation_tickets;
+
+UPDATE
+    guild_moderation_tickets
+SET ticketgid = (
+    SELECT ticketgid FROM numbered_tickets WHERE numbered_tickets.ticketid = guild_moderation_tickets.ticketid
+);
+
+DROP TABLE numbered_tickets;
+
+CREATE UNIQUE INDEX guild_moderation_tickets_guild_ticketgid ON guild_moderation_tickets(guildid,ticketgid);
+CREATE INDEX guild_moderation_ticket_members_memberid ON guild_moderation_ticket_members(memberid);
+
+
+CREATE TABLE guild_moderation_ticket_counters(
+	guildid INTEGER NOT NULL,
+	last_ticketgid INTEGER NOT NULL,
+	PRIMARY KEY (guildid)
+);
+
+INSERT INTO guild_moderation_ticket_counters
+    (guildid, last_ticketgid)
+SELECT
+    guildid,
+    MAX(ticketgid)
+FROM
+    guild_moderation_tickets
+GROUP BY guildid;
+
+
+DROP VIEW guild_moderation_tickets_combined;
+
+CREATE VIEW
+    guild_moderation_tickets_combined
+AS
+SELECT
+    t.ticketid AS ticketid,
+    t.ticket_type AS ticket_type,
+    t.guildid AS guildid,
+    t.ticketgid AS ticketgid,
+    t.modid AS modid,
+    t.agentid AS agentid,
+    t.app AS app,
+    t.msgid AS msgid,
+    t.auditid AS auditid,
+    t.reason AS reason,
+    t.created_at AS created_at,
+    timedmutes.duration AS tmute_duration,
+    timedmutes.roleid AS tmute_roleid,
+    timedmutes.unmute_timestamp AS tmute_unmute_timestamp
+FROM
+    guild_moderation_tickets t
+LEFT JOIN guild_timed_mute_tickets timedmutes ON t.ticketid = timedmutes.ticketid;
+
+
+CREATE TABLE scheduled_actions(
+	actionid INTEGER PRIMARY KEY AUTOINCREMENT ,
+	app TEXT NOT NULL,
+	action_type TEXT NOT NULL,
+	guildid INTEGER NOT NULL,
+	targetid INTEGER,
+	due_at INTEGER NOT NULL,
+	payload TEXT
+);
+CREATE INDEX scheduled_actions_guildid ON scheduled_actions(app,guildid);
+CREATE INDEX scheduled_actions_targetid ON scheduled_actions(action_type,targetid);
+
+INSERT INTO scheduled_actions
+    (app, action_type, guildid, targetid, due_at)
+SELECT DISTINCT
+    t.app,
+    'timed_unmute',
+    t.guildid,
+    t.ticketid,
+    timedmutes.unmute_timestamp
+FROM
+    guild_timed_mute_members members
+JOIN guild_moderation_tickets t ON members.ticketid = t.ticketid
+JOIN guild_timed_mute_tickets timedmutes ON members.ticketid = timedmutes.ticketid;
+
+
+CREATE TABLE cache_invalidations(
+	invalidationid INTEGER PRIMARY KEY AUTOINCREMENT ,
+	app TEXT NOT NULL,
+	shard INTEGER NOT NULL,
+	cache TEXT NOT NULL,
+	guildid INTEGER NOT NULL,
+	targetid INTEGER,
+	attr TEXT,
+	created_at INTEGER NOT NULL
+);
+CREATE INDEX cache_invalidations_created_at ON cache_invalidations(created_at);